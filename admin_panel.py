@@ -17,6 +17,7 @@ from tradebot.infrastructure.db import (
     init_db, add_user, update_user, delete_user,
     list_users, get_user, set_master, UserAccount,
     list_traders, set_trader_enabled, delete_trader, upsert_trader, Trader,
+    list_replication_stats,
 )
 
 
@@ -354,10 +355,16 @@ class AdminPanel:
         self.notebook.add(traders_frame, text="  Traders  ")
         self._build_traders_tab(traders_frame)
 
+        # --- Replication tab ---
+        replication_frame = ttk.Frame(self.notebook)
+        self.notebook.add(replication_frame, text="  Replication  ")
+        self._build_replication_tab(replication_frame)
+
         self._build_statusbar()
 
         self.refresh()
         self.refresh_traders()
+        self.refresh_replication()
 
     # === USERS TAB ========================================================
 
@@ -795,6 +802,63 @@ class AdminPanel:
         self.refresh_traders()
         self._set_status(f"Deleted {len(ids)} trader(s)")
 
+    # === REPLICATION TAB ==================================================
+
+    REPL_COLUMNS = ("account", "name", "metric", "count", "p50", "p95",
+                    "p99", "max", "updated")
+    REPL_HEADINGS = {
+        "account": "Follower", "name": "Name", "metric": "Metric",
+        "count": "Samples", "p50": "p50", "p95": "p95", "p99": "p99",
+        "max": "Max", "updated": "Updated",
+    }
+    REPL_WIDTHS = {
+        "account": 90, "name": 150, "metric": 120, "count": 70, "p50": 80,
+        "p95": 80, "p99": 80, "max": 80, "updated": 160,
+    }
+
+    def _build_replication_tab(self, parent):
+        bar = ttk.Frame(parent, padding=(8, 6))
+        bar.pack(fill="x")
+        ttk.Button(bar, text="Refresh",
+                   command=self.refresh_replication).pack(side="left", padx=4)
+        ttk.Label(bar, text="  Lag: master change -> follower fill (ms).  "
+                            "Price diff: |follower - master| fill price.",
+                  foreground="gray").pack(side="left", padx=12)
+
+        frame = ttk.Frame(parent)
+        frame.pack(fill="both", expand=True, padx=8, pady=(0, 4))
+
+        self.repl_tree = ttk.Treeview(
+            frame, columns=self.REPL_COLUMNS, show="headings",
+            selectmode="browse",
+        )
+        for col in self.REPL_COLUMNS:
+            self.repl_tree.heading(col, text=self.REPL_HEADINGS[col])
+            anchor = "w" if col in ("name", "metric", "updated") else "e"
+            self.repl_tree.column(col, width=self.REPL_WIDTHS[col],
+                                  minwidth=40, anchor=anchor)
+
+        vsb = ttk.Scrollbar(frame, orient="vertical",
+                             command=self.repl_tree.yview)
+        self.repl_tree.configure(yscrollcommand=vsb.set)
+        self.repl_tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+    def refresh_replication(self):
+        for item in self.repl_tree.get_children():
+            self.repl_tree.delete(item)
+        names = {u.mt5_account: u.full_name for u in list_users()}
+        for r in list_replication_stats():
+            digits = 5 if r["metric"] == "price_diff" else 0
+            self.repl_tree.insert("", "end", values=(
+                r["follower_account"],
+                names.get(r["follower_account"], "?"),
+                r["metric"],
+                r["count"],
+                *(f"{r[k] or 0:.{digits}f}" for k in ("p50", "p95", "p99", "max")),
+                (r["updated_at"] or "")[:19].replace("T", " "),
+            ))
+
     # --- run --------------------------------------------------------------
     def run(self):
         self.root.mainloop()
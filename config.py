@@ -5,7 +5,7 @@ Reads environment variables or .env automatically.
 
 from pydantic import Field, BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 
 
 class MT5Account(BaseModel):
@@ -29,6 +29,52 @@ class Settings(BaseSettings):
     magic_number: int        = Field(32001)
     db_path: str             = Field("users.db")
 
+    # Threads that run blocking order execution off the Telegram event loop
+    order_workers: int       = Field(4, ge=1)
+
+    # One worker process per MT5 terminal path (parallel multi-account fan-out)
+    mt5_process_pool: bool   = Field(False)
+    mt5_call_timeout_sec: float = Field(30.0, gt=0)
+
+    # Symbol metadata cache (volume step, tick value, stops level, ...)
+    symbol_cache_ttl_sec: float = Field(3600.0, gt=0)
+    symbol_cache_warmup_days: int = Field(7, ge=0)   # 0 disables warm-up
+
+    # Ticks younger than this are reused instead of asking the terminal again
+    tick_max_age_ms: int = Field(250, ge=0)
+
+    # Background loops (copy sync, SL manager, pending expirer) poll every
+    # poll_min_sec after activity and back off to poll_max_sec when idle
+    poll_min_sec: float = Field(0.5, gt=0)
+    poll_max_sec: float = Field(30.0, gt=0)
+    # The SL manager backs off only this far: a TP fill must tighten the
+    # remaining legs within seconds
+    sl_poll_max_sec: float = Field(5.0, gt=0)
+    # Same for the copy syncer: a manual trade on the master reaches the
+    # followers within this (engine fills are pushed straight away)
+    copy_poll_max_sec: float = Field(5.0, gt=0)
+
+    # copy_map changes are kept in memory and flushed to SQLite this often
+    copy_map_flush_sec: float = Field(1.0, gt=0)
+    # With unchanged position/order/deal counts the copy syncer skips fetching
+    # the master's rows, except this often (SL/TP-only edits move no count);
+    # 0 = fetch on every poll
+    copy_full_poll_sec: float = Field(2.0, ge=0)
+    # Master SL/TP edits within this window are forwarded once (latest wins)
+    copy_sltp_coalesce_ms: int = Field(300, ge=0)
+    # Full copy_map reconciliation cadence after the start-up pass; 0 = start-up only
+    copy_reconcile_sec: float = Field(300.0, ge=0)
+    # Background services save warm-restart checkpoints this often (and on
+    # stop); 0 = off
+    checkpoint_sec: float = Field(30.0, ge=0)
+
+    # Rolling signal_traces table size (rows); 0 disables trace persistence
+    trace_max_rows: int = Field(50_000, ge=0)
+
+    # Signal symbol -> broker base symbol, tried when the name itself does
+    # not resolve, e.g. SYMBOL_ALIASES='{"GOLD": "XAUUSD"}'
+    symbol_aliases: Dict[str, str] = Field(default_factory=dict)
+
     model_config = SettingsConfigDict(
         env_file = ".env",
         extra    = "ignore"
@@ -40,7 +40,8 @@ from tradebot.infrastructure.sl_manager import SignalSLManager
 from tradebot.infrastructure.copy_syncer import CopyTradeSyncer
 from tradebot.infrastructure.pending_expirer import PendingOrderExpirer
 from tradebot.infrastructure.db import init_db, get_enabled_users, get_master_user
-from tradebot.infrastructure._mt5_utils import ensure_mt5
+from tradebot.infrastructure._mt5_utils import MT5LoginError, get_broker
+from tradebot.infrastructure._mt5_cache import warm_recent_symbols
 
 
 def bootstrap():
@@ -58,9 +59,10 @@ def bootstrap():
     order_generator  = SimpleOrderGenerator(risk_manager=risk_manager)
     notifier         = TelegramNotifier(settings.telegram_token,
                                         settings.signal_chat_id)
-    sl_manager       = SignalSLManager(interval_sec=5)
-    copy_syncer      = CopyTradeSyncer(interval_sec=5)
-    pending_expirer  = PendingOrderExpirer(interval_sec=30)
+    # Poll cadence adapts between settings.poll_min_sec and poll_max_sec
+    sl_manager       = SignalSLManager()
+    copy_syncer      = CopyTradeSyncer()
+    pending_expirer  = PendingOrderExpirer()
 
     # Validate that at least one enabled user exists and can log in
     users = get_enabled_users(settings.db_path)
@@ -74,17 +76,7 @@ def bootstrap():
     failed_names: list[str] = []
     for user in users:
         try:
-            ensure_mt5(user.mt5_path)
-            if not mt5.login(user.mt5_account, user.mt5_password,
-                             user.mt5_server):
-                logger.warning(
-                    f"MT5 login failed for {user.full_name} "
-                    f"(account {user.mt5_account}) on {user.mt5_server}: "
-                    f"{mt5.last_error()} — skipping")
-                failed_names.append(
-                    f"{user.full_name} ({user.mt5_account})")
-                continue
-            info = mt5.account_info()
+            info = get_broker().call(user, mt5.account_info)
             if not info:
                 logger.warning(
                     f"MT5 account_info() is None for {user.full_name} "
@@ -97,6 +89,16 @@ def bootstrap():
                 f"MT5 ready — {user.full_name} [{role}] | "
                 f"account {info.login} @ {info.server}")
             ready_count += 1
+            if settings.symbol_cache_warmup_days:
+                get_broker().call(user, warm_recent_symbols,
+                                  settings.symbol_cache_warmup_days)
+        except MT5LoginError as e:
+            logger.warning(
+                f"MT5 login failed for {user.full_name} "
+                f"(account {user.mt5_account}) on {user.mt5_server}: "
+                f"{e} — skipping")
+            failed_names.append(
+                f"{user.full_name} ({user.mt5_account})")
         except Exception as e:
             logger.warning(
                 f"MT5 init error for {user.full_name} "
@@ -144,6 +146,10 @@ def bootstrap():
         "🔄 Restart with: python -m main"
     )
 
+    if master:
+        # Master fills reach followers without waiting for the next poll
+        engine.on_master_fill = copy_syncer.push
+
     gateway = TelegramSignalListener(
         parser,
         engine,
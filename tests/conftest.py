@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# Infrastructure modules import MetaTrader5 at import time; tests must never
+# talk to a real terminal, so the fake is installed before anything else.
+import fake_mt5
+
+sys.modules["MetaTrader5"] = fake_mt5
+
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+os.environ.setdefault("SIGNAL_CHAT_ID", "1")
+
+
+def _clear_caches() -> None:
+    from tradebot.infrastructure import _mt5_symbol_resolver
+    from tradebot.infrastructure._mt5_cache import get_symbol_cache, get_tick_cache
+
+    get_symbol_cache().clear()
+    get_tick_cache().clear()
+    _mt5_symbol_resolver._resolvers.clear()
+
+
+@pytest.fixture
+def mt5():
+    """Fresh fake terminal (and empty symbol/tick caches) for each test."""
+    fake_mt5.reset()
+    _clear_caches()
+    yield fake_mt5
+    fake_mt5.reset()
+    _clear_caches()
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Private terminal broker installed as the process-wide one."""
+    from tradebot.infrastructure import _mt5_utils
+
+    b = _mt5_utils.MT5Broker()
+    monkeypatch.setattr(_mt5_utils, "_broker", b)
+    yield b
+    b.stop()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Empty users.db in a temp dir, used as both default and settings path."""
+    from config import settings
+    from tradebot.infrastructure import db
+
+    path = tmp_path / "users.db"
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(settings, "db_path", str(path))
+    db.init_db(path)
+    return path
@@ -0,0 +1,424 @@
+"""
+In-process stand-in for the ``MetaTrader5`` package.
+
+Only the calls the bot uses are implemented.  State lives in module-level
+``ACCOUNTS`` / ``SYMBOLS`` so tests (and worker processes that import this
+module by name) can seed a terminal, run the code under test and then inspect
+``CALLS`` to count round-trips.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, namedtuple
+from dataclasses import dataclass, field
+
+# ---------------------------------------------------------------------
+# Constants (values match the real package)
+# ---------------------------------------------------------------------
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+ORDER_TYPE_BUY_STOP_LIMIT = 6
+ORDER_TYPE_SELL_STOP_LIMIT = 7
+
+ORDER_TIME_GTC = 0
+
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+DEAL_REASON_CLIENT = 0
+DEAL_REASON_MOBILE = 1
+DEAL_REASON_WEB = 2
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_REJECT = 10006
+
+# ---------------------------------------------------------------------
+# Records
+# ---------------------------------------------------------------------
+
+AccountInfo = namedtuple("AccountInfo", "login server balance equity")
+TerminalInfo = namedtuple("TerminalInfo", "path connected")
+SymbolRow = namedtuple("SymbolRow", "name")
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    "name volume_step volume_min volume_max trade_tick_value "
+    "trade_tick_size point digits trade_stops_level")
+Tick = namedtuple("Tick", "time time_msc bid ask")
+Position = namedtuple(
+    "Position",
+    "ticket symbol type volume price_open sl tp comment magic "
+    "time time_msc time_update_msc identifier")
+PendingOrder = namedtuple(
+    "PendingOrder",
+    "ticket symbol type volume_current price_open sl tp comment magic "
+    "time_setup time_setup_msc type_time")
+Deal = namedtuple(
+    "Deal",
+    "ticket order position_id symbol type entry reason volume price "
+    "profit comment magic time time_msc")
+SendResult = namedtuple(
+    "SendResult", "retcode order deal volume price comment")
+
+
+@dataclass
+class Account:
+    login: int
+    password: str = "pw"
+    server: str = "Demo"
+    balance: float = 10_000.0
+    positions: dict = field(default_factory=dict)
+    orders: dict = field(default_factory=dict)
+    deals: list = field(default_factory=list)
+
+
+ACCOUNTS: dict[int, Account] = {}
+SYMBOLS: dict[str, SymbolInfo] = {}
+TICKS: dict[str, Tick] = {}
+CALLS: Counter = Counter()
+
+# Seconds each terminal call blocks for (simulates IPC round-trip).
+LATENCY = 0.0
+
+_state = threading.Lock()
+_initialized = False
+_current: int | None = None
+_next_ticket = 1000
+_last_error = (1, "Success")
+
+
+def reset() -> None:
+    """Forget every account, symbol and counter."""
+    global _initialized, _current, _next_ticket, _last_error, LATENCY
+    ACCOUNTS.clear()
+    SYMBOLS.clear()
+    TICKS.clear()
+    CALLS.clear()
+    LATENCY = 0.0
+    _initialized = False
+    _current = None
+    _next_ticket = 1000
+    _last_error = (1, "Success")
+
+
+def add_account(login: int, server: str = "Demo",
+                balance: float = 10_000.0, password: str = "pw") -> Account:
+    acc = Account(login=login, password=password, server=server,
+                  balance=balance)
+    ACCOUNTS[login] = acc
+    return acc
+
+
+def add_symbol(name: str, *, bid: float = 2000.0, ask: float = 2000.2,
+               volume_step: float = 0.01, volume_min: float = 0.01,
+               volume_max: float = 100.0, trade_tick_value: float = 1.0,
+               trade_tick_size: float = 0.01, point: float = 0.01,
+               digits: int = 2, trade_stops_level: int = 0) -> None:
+    SYMBOLS[name] = SymbolInfo(
+        name, volume_step, volume_min, volume_max, trade_tick_value,
+        trade_tick_size, point, digits, trade_stops_level)
+    set_tick(name, bid, ask)
+
+
+def seed(accounts=(), symbols=(), latency: float = 0.0) -> None:
+    """Populate a fresh terminal (usable as a worker-process initializer)."""
+    global LATENCY
+    reset()
+    for login in accounts:
+        add_account(login)
+    for name in symbols:
+        add_symbol(name)
+    LATENCY = latency
+
+
+def call_count(name: str) -> int:
+    return CALLS[name]
+
+
+def set_tick(name: str, bid: float, ask: float) -> None:
+    now = time.time()
+    TICKS[name] = Tick(int(now), int(now * 1000), bid, ask)
+
+
+def fill_pending(login: int, ticket: int) -> Position:
+    """Trigger a pending order; the position keeps the order's ticket."""
+    acc = ACCOUNTS[login]
+    o = acc.orders.pop(ticket)
+    now = time.time()
+    pos_type = (POSITION_TYPE_BUY if o.type in (ORDER_TYPE_BUY_LIMIT,
+                                                ORDER_TYPE_BUY_STOP)
+                else POSITION_TYPE_SELL)
+    pos = acc.positions[ticket] = Position(
+        ticket, o.symbol, pos_type, o.volume_current, o.price_open, o.sl,
+        o.tp, o.comment, o.magic, int(now), int(now * 1000),
+        int(now * 1000), ticket)
+    acc.deals.append(Deal(
+        new_ticket(), ticket, ticket, o.symbol, pos_type, DEAL_ENTRY_IN,
+        DEAL_REASON_EXPERT, o.volume_current, o.price_open, 0.0, o.comment,
+        o.magic, int(now), int(now * 1000)))
+    return pos
+
+
+def new_ticket() -> int:
+    global _next_ticket
+    with _state:
+        _next_ticket += 1
+        return _next_ticket
+
+
+def current_login() -> int | None:
+    return _current
+
+
+def _enter(name: str) -> None:
+    CALLS[name] += 1
+    if LATENCY:
+        time.sleep(LATENCY)
+
+
+def _account() -> Account | None:
+    return ACCOUNTS.get(_current) if _current is not None else None
+
+
+# ---------------------------------------------------------------------
+# Terminal API
+# ---------------------------------------------------------------------
+
+def initialize(path: str | None = None, **_kw) -> bool:
+    global _initialized
+    _enter("initialize")
+    _initialized = True
+    return True
+
+
+def shutdown() -> None:
+    global _initialized, _current
+    _enter("shutdown")
+    _initialized = False
+    _current = None
+
+
+def terminal_info():
+    _enter("terminal_info")
+    return TerminalInfo("fake", True) if _initialized else None
+
+
+def last_error():
+    return _last_error
+
+
+def login(login: int, password: str = "", server: str = "", **_kw) -> bool:
+    global _current, _last_error
+    _enter("login")
+    acc = ACCOUNTS.get(int(login))
+    if acc is None or acc.password != password:
+        _current = None
+        _last_error = (-6, "Authorization failed")
+        return False
+    _current = acc.login
+    _last_error = (1, "Success")
+    return True
+
+
+def account_info():
+    _enter("account_info")
+    acc = _account()
+    if acc is None:
+        return None
+    return AccountInfo(acc.login, acc.server, acc.balance, acc.balance)
+
+
+def symbols_get(*_a, **_kw):
+    _enter("symbols_get")
+    return tuple(SymbolRow(n) for n in SYMBOLS)
+
+
+def symbol_info(symbol: str):
+    _enter("symbol_info")
+    return SYMBOLS.get(symbol)
+
+
+def symbol_info_tick(symbol: str):
+    _enter("symbol_info_tick")
+    return TICKS.get(symbol)
+
+
+def symbol_select(symbol: str, enable: bool = True) -> bool:
+    _enter("symbol_select")
+    return symbol in SYMBOLS
+
+
+def positions_total() -> int:
+    _enter("positions_total")
+    acc = _account()
+    return len(acc.positions) if acc else 0
+
+
+def positions_get(symbol: str | None = None, ticket: int | None = None,
+                  **_kw):
+    _enter("positions_get")
+    acc = _account()
+    if acc is None:
+        return None
+    rows = list(acc.positions.values())
+    if symbol is not None:
+        rows = [p for p in rows if p.symbol == symbol]
+    if ticket is not None:
+        rows = [p for p in rows if p.ticket == ticket]
+    return tuple(rows)
+
+
+def orders_total() -> int:
+    _enter("orders_total")
+    acc = _account()
+    return len(acc.orders) if acc else 0
+
+
+def orders_get(symbol: str | None = None, ticket: int | None = None, **_kw):
+    _enter("orders_get")
+    acc = _account()
+    if acc is None:
+        return None
+    rows = list(acc.orders.values())
+    if symbol is not None:
+        rows = [o for o in rows if o.symbol == symbol]
+    if ticket is not None:
+        rows = [o for o in rows if o.ticket == ticket]
+    return tuple(rows)
+
+
+def _epoch(v) -> float:
+    return v.timestamp() if hasattr(v, "timestamp") else float(v)
+
+
+def history_select(date_from, date_to) -> bool:
+    _enter("history_select")
+    return True
+
+
+def history_deals_total(date_from, date_to) -> int:
+    _enter("history_deals_total")
+    acc = _account()
+    if acc is None:
+        return 0
+    lo, hi = _epoch(date_from), _epoch(date_to)
+    return sum(1 for d in acc.deals if lo <= d.time <= hi)
+
+
+def history_deals_get(*args, position: int | None = None, **_kw):
+    _enter("history_deals_get")
+    acc = _account()
+    if acc is None:
+        return None
+    if position is not None:
+        return tuple(d for d in acc.deals if d.position_id == position)
+    if len(args) >= 2:
+        lo, hi = _epoch(args[0]), _epoch(args[1])
+        return tuple(d for d in acc.deals if lo <= d.time <= hi)
+    return tuple(acc.deals)
+
+
+def order_send(request: dict):
+    _enter("order_send")
+    acc = _account()
+    if acc is None:
+        return None
+    action = request["action"]
+    if action == TRADE_ACTION_DEAL:
+        return _send_deal(acc, request)
+    if action == TRADE_ACTION_PENDING:
+        ticket = new_ticket()
+        now = time.time()
+        acc.orders[ticket] = PendingOrder(
+            ticket, request["symbol"], request["type"], request["volume"],
+            request["price"], request.get("sl", 0.0), request.get("tp", 0.0),
+            request.get("comment", ""), request.get("magic", 0),
+            int(now), int(now * 1000), request.get("type_time", 0))
+        return SendResult(TRADE_RETCODE_DONE, ticket, 0, request["volume"],
+                          request["price"], "placed")
+    if action == TRADE_ACTION_SLTP:
+        pos = acc.positions.get(request["position"])
+        if pos is None:
+            return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "no pos")
+        acc.positions[pos.ticket] = pos._replace(
+            sl=request.get("sl", pos.sl), tp=request.get("tp", pos.tp),
+            time_update_msc=int(time.time() * 1000))
+        return SendResult(TRADE_RETCODE_DONE, 0, 0, 0.0, 0.0, "modified")
+    if action == TRADE_ACTION_MODIFY:
+        ord_ = acc.orders.get(request["order"])
+        if ord_ is None:
+            return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "no order")
+        acc.orders[ord_.ticket] = ord_._replace(
+            price_open=request.get("price", ord_.price_open),
+            sl=request.get("sl", ord_.sl), tp=request.get("tp", ord_.tp))
+        return SendResult(TRADE_RETCODE_DONE, ord_.ticket, 0, 0.0, 0.0,
+                          "modified")
+    if action == TRADE_ACTION_REMOVE:
+        if acc.orders.pop(request["order"], None) is None:
+            return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "no order")
+        return SendResult(TRADE_RETCODE_DONE, request["order"], 0, 0.0, 0.0,
+                          "removed")
+    return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "bad action")
+
+
+def _send_deal(acc: Account, request: dict):
+    if request["symbol"] not in SYMBOLS:
+        return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "no symbol")
+    now = time.time()
+    price = float(request.get("price") or 0.0)
+    pos_ticket = request.get("position")
+    if pos_ticket:
+        pos = acc.positions.get(pos_ticket)
+        if pos is None:
+            return SendResult(TRADE_RETCODE_REJECT, 0, 0, 0.0, 0.0, "no pos")
+        left = round(pos.volume - float(request["volume"]), 8)
+        if left <= 0:
+            del acc.positions[pos_ticket]
+        else:
+            acc.positions[pos_ticket] = pos._replace(volume=left)
+        deal = new_ticket()
+        acc.deals.append(Deal(
+            deal, deal, pos_ticket, pos.symbol, request["type"],
+            DEAL_ENTRY_OUT, DEAL_REASON_EXPERT, float(request["volume"]),
+            price, 0.0, request.get("comment", ""), request.get("magic", 0),
+            int(now), int(now * 1000)))
+        return SendResult(TRADE_RETCODE_DONE, deal, deal,
+                          float(request["volume"]), price, "closed")
+
+    ticket = new_ticket()
+    pos_type = (POSITION_TYPE_BUY if request["type"] == ORDER_TYPE_BUY
+                else POSITION_TYPE_SELL)
+    acc.positions[ticket] = Position(
+        ticket, request["symbol"], pos_type, float(request["volume"]), price,
+        float(request.get("sl", 0.0) or 0.0),
+        float(request.get("tp", 0.0) or 0.0),
+        request.get("comment", ""), request.get("magic", 0),
+        int(now), int(now * 1000), int(now * 1000), ticket)
+    acc.deals.append(Deal(
+        ticket, ticket, ticket, request["symbol"], request["type"],
+        DEAL_ENTRY_IN, DEAL_REASON_EXPERT, float(request["volume"]), price,
+        0.0, request.get("comment", ""), request.get("magic", 0),
+        int(now), int(now * 1000)))
+    return SendResult(TRADE_RETCODE_DONE, ticket, ticket,
+                      float(request["volume"]), price, "done")
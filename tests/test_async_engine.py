@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from tradebot.application.order_generator import SimpleOrderGenerator
+from tradebot.application.parser import BasicSignalParser
+from tradebot.domain.models import Order, OrderResult
+from tradebot.domain.ports import NotificationPort, TradingEnginePort
+from tradebot.infrastructure.async_engine import ExecutorTradingEngine
+
+DELAY = 0.2
+
+
+class SlowEngine(TradingEnginePort):
+    """Blocking fake engine that takes DELAY seconds per batch.
+
+    With ``parties`` set, each batch also waits until that many batches
+    are running at once, and fails if they never are.
+    """
+
+    def __init__(self, parties: int = 0):
+        self.log: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._barrier = threading.Barrier(parties, timeout=5) if parties else None
+
+    def execute_order(self, order):
+        return self.execute_orders([order])[0]
+
+    def execute_orders(self, orders):
+        with self._lock:
+            self.log.append(("start", orders[0].comment))
+        if self._barrier is not None:
+            self._barrier.wait()
+        time.sleep(DELAY)
+        with self._lock:
+            self.log.append(("end", orders[0].comment))
+        return [[OrderResult(True, "executed", {"account_id": 1})]
+                for _ in orders]
+
+
+def order(symbol, comment):
+    return Order(symbol=symbol, side="buy", order_type="market", risk=0.01,
+                 price=None, sl=1.0, tp=2.0, comment=comment)
+
+
+def test_different_symbols_run_in_parallel():
+    engine = ExecutorTradingEngine(SlowEngine(parties=2), max_workers=4)
+
+    async def both():
+        return await asyncio.gather(
+            engine.execute_orders([order("XAUUSD", "a")]),
+            engine.execute_orders([order("EURUSD", "b")]))
+
+    results = asyncio.run(both())       # raises if they ran one by one
+    engine.close()
+    assert all(r[0][0].success for r in results)
+
+
+def test_same_lane_keeps_arrival_order():
+    slow = SlowEngine()
+    engine = ExecutorTradingEngine(slow, max_workers=4)
+
+    async def both():
+        await asyncio.gather(
+            engine.execute_orders([order("XAUUSD", "first")]),
+            engine.execute_orders([order("XAUUSD", "second")]))
+
+    asyncio.run(both())
+    engine.close()
+    assert slow.log == [("start", "first"), ("end", "first"),
+                        ("start", "second"), ("end", "second")]
+
+
+def test_idle_lanes_are_dropped():
+    engine = ExecutorTradingEngine(SlowEngine(), max_workers=4)
+
+    async def many():
+        await asyncio.gather(*(
+            engine.execute_orders([order("XAUUSD", str(i))],
+                                  lane=("Lily", i % 3))
+            for i in range(6)))
+        return len(engine._lanes)
+
+    assert asyncio.run(many()) == 0
+    engine.close()
+    assert [e for e, _ in engine.engine.log].count("start") == 6
+
+
+# ----------------------------------------------------------------------
+# Listener benchmark: two signals arriving together are handled in parallel
+# ----------------------------------------------------------------------
+
+SIGNAL = """
+{symbol} - BUY NOW
+Entry : 3213
+Targets :
+3216
+3220
+Stoploss : 3200
+@Zeno | Trader: {trader}
+"""
+
+
+class NullNotifier(NotificationPort):
+    async def notify(self, message: str) -> None:
+        pass
+
+
+def fake_update(text, replies):
+    async def reply_text(msg):
+        replies.append(msg)
+    message = SimpleNamespace(text=text, reply_text=reply_text)
+    return SimpleNamespace(effective_message=message)
+
+
+def test_listener_handles_simultaneous_signals_in_parallel(db_path):
+    from tradebot.infrastructure.db import list_traders, set_trader_enabled, upsert_trader
+    from tradebot.infrastructure.telegram_listener import TelegramSignalListener
+
+    for name in ("Lily", "Mirbaha"):
+        upsert_trader(name)
+    for t in list_traders():
+        set_trader_enabled(t.id, True)
+
+    slow = SlowEngine(parties=2)
+    listener = TelegramSignalListener(
+        BasicSignalParser(), slow, SimpleOrderGenerator(),
+        NullNotifier())
+    replies: list[str] = []
+
+    async def both():
+        await asyncio.gather(
+            listener._handle(fake_update(
+                SIGNAL.format(symbol="XAUUSD", trader="Lily"), replies), None),
+            listener._handle(fake_update(
+                SIGNAL.format(symbol="EURUSD", trader="Mirbaha"), replies), None))
+
+    asyncio.run(both())
+    listener.async_engine.close()
+    assert len(replies) == 2
+    assert all(": OK" in r for r in replies)
+    # both signals reached the engine before either finished
+    assert [e for e, _ in slow.log[:2]] == ["start", "start"]
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from tradebot.infrastructure._cadence import AdaptiveCadence, run_adaptive
+
+
+def test_backs_off_exponentially_and_resets_on_activity():
+    c = AdaptiveCadence(min_sec=0.5, max_sec=30)
+    assert [c.tick_done(0.0, active=False) for _ in range(8)] == [
+        1, 2, 4, 8, 16, 30, 30, 30]
+    assert c.tick_done(0.0, active=True) == 0.5
+
+    c.tick_done(0.0, active=False)
+    c.poke()
+    assert c.interval == 0.5
+    assert c.tick_done(0.0, active=False) == 0.5   # poke pending: no back-off
+
+
+def test_rejects_bad_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveCadence(min_sec=5, max_sec=1)
+
+
+def run_loop(cadence, step):
+    stop = threading.Event()
+    t = threading.Thread(target=run_adaptive,
+                         args=(step, cadence, stop, lambda exc: None))
+    t.start()
+    return stop, t
+
+
+def test_idle_loop_slows_down_and_poke_wakes_it():
+    cadence = AdaptiveCadence(min_sec=0.01, max_sec=5)
+    ticks = []
+    stop, t = run_loop(cadence, lambda: ticks.append(time.monotonic()))
+
+    time.sleep(0.6)
+    idle_ticks = len(ticks)
+    # Fixed min-rate polling would have ticked ~60 times
+    assert idle_ticks < 12
+    assert cadence.interval > 0.3
+
+    poked = time.monotonic()
+    cadence.poke()
+    time.sleep(0.1)
+    assert len(ticks) > idle_ticks
+    assert ticks[idle_ticks] - poked < 0.05
+    assert cadence.stats()["wake_latency"]["count"] == 1
+
+    stop.set()
+    cadence.wake()
+    t.join(1)
+    assert not t.is_alive()
+
+
+def test_active_loop_stays_fast_and_errors_are_quiet():
+    cadence = AdaptiveCadence(min_sec=0.01, max_sec=5)
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) % 2:
+            raise RuntimeError("boom")
+        return True
+
+    stop, t = run_loop(cadence, step)
+    time.sleep(0.3)
+    stop.set()
+    cadence.wake()
+    t.join(1)
+    stats = cadence.stats()
+    assert stats["ticks"] == len(calls) and len(calls) > 8
+    assert stats["active_ticks"] == len(calls) // 2
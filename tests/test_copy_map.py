@@ -0,0 +1,87 @@
+import sqlite3
+
+from tradebot.infrastructure import _copy_map
+from tradebot.infrastructure._copy_map import CopyMap
+from tradebot.infrastructure.db import apply_copy_map_changes, list_copy_map
+
+
+def test_two_way_index(db_path):
+    cmap = CopyMap(db_path)
+    cmap.put(1, 201, 11, "XAUUSD")
+    cmap.put(1, 202, 12, "XAUUSD")
+    cmap.put(2, 201, 21, "EURUSD")
+
+    assert sorted(cmap.followers(1)) == [(201, 11), (202, 12)]
+    assert cmap.master_of(202, 12) == 1
+    assert cmap.follower_ticket(2, 201) == 21
+
+    cmap.put(1, 201, 13)                    # re-mapped follower ticket
+    assert cmap.master_of(201, 11) is None
+    assert cmap.master_of(201, 13) == 1
+
+    cmap.put(3, 201, 0)                     # tombstone
+    assert cmap.for_account(201) == {1: 13, 2: 21, 3: 0}
+
+    cmap.remove_master(1)
+    assert cmap.followers(1) == []
+    assert cmap.master_of(202, 12) is None
+    assert cmap.for_account(202) == {}
+    assert len(cmap) == 1
+
+
+def test_write_behind_batches_into_one_transaction(db_path, monkeypatch):
+    calls = []
+    real = _copy_map.apply_copy_map_changes
+    monkeypatch.setattr(_copy_map, "apply_copy_map_changes",
+                        lambda u, d, p, t: (calls.append((u, d)),
+                                            real(u, d, p, t)))
+    cmap = CopyMap(db_path)
+    for t in range(50):
+        cmap.put(t, 201, 1000 + t, "XAUUSD")
+    cmap.put(7, 201, 2007, "XAUUSD")        # coalesced with the first put
+    cmap.remove(8, 201)
+
+    assert list_copy_map(db_path) == []     # nothing written yet
+    assert cmap.flush() == 50
+    assert len(calls) == 1
+    assert cmap.flush() == 0
+    rows = {m: (a, t) for m, a, t, _ in list_copy_map(db_path)}
+    assert rows[7] == (201, 2007)
+    assert 8 not in rows
+    assert cmap.stats()["pending"] == 0
+
+
+def test_flush_updates_the_symbol_of_existing_rows(db_path):
+    apply_copy_map_changes([(5, 201, 55, "")], [], db_path)
+    cmap = CopyMap(db_path)
+    cmap.put(5, 201, 56, "XAUUSDb")
+    cmap.flush()
+    assert list_copy_map(db_path) == [(5, 201, 56, "XAUUSDb")]
+
+
+def test_loads_existing_rows(db_path):
+    apply_copy_map_changes([(5, 201, 55, "XAUUSD")], [], db_path)
+    cmap = CopyMap(db_path)
+    assert cmap.followers(5) == [(201, 55)]
+    assert cmap.master_of(201, 55) == 5
+
+
+def test_failed_flush_is_retried(db_path, monkeypatch):
+    cmap = CopyMap(db_path)
+    cmap.put(1, 201, 11)
+
+    def boom(*a):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(_copy_map, "apply_copy_map_changes", boom)
+    assert cmap.flush() == 0
+    assert cmap.pending() == 1
+    monkeypatch.undo()
+    assert cmap.flush() == 1
+
+
+def test_stop_flushes(db_path):
+    cmap = CopyMap(db_path, flush_sec=60)
+    cmap.start()
+    cmap.put(1, 201, 11)
+    cmap.stop()
+    assert list_copy_map(db_path) == [(1, 201, 11, "")]
@@ -0,0 +1,619 @@
+import time
+
+import numpy as np
+import pytest
+
+from tradebot.infrastructure._copy_map import CopyMap
+from tradebot.infrastructure.copy_syncer import CopyTradeSyncer, _Diff, _Snapshot
+from tradebot.infrastructure.db import (
+    UserAccount, add_user, get_checkpoint, list_copy_map, set_master,
+)
+
+
+def make_user(acct):
+    return UserAccount(first_name="U", last_name=str(acct), mt5_account=acct,
+                       mt5_password="pw", mt5_server="Demo",
+                       mt5_path="t.exe")
+
+
+def stored_copies(master_ticket):
+    """(follower account, follower ticket) rows flushed for a master ticket."""
+    return [(a, t) for m, a, t, _ in list_copy_map() if m == master_ticket]
+
+
+@pytest.fixture
+def accounts(mt5, db_path, broker, monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "copy_sltp_coalesce_ms", 0)
+    monkeypatch.setattr(settings, "copy_full_poll_sec", 0)
+    mt5.add_symbol("XAUUSD")
+    users = {}
+    for acct in (101, 102):
+        mt5.add_account(acct)
+        users[acct] = make_user(acct)
+        uid = add_user(users[acct])
+        if acct == 101:
+            set_master(uid)
+    return mt5, broker, users[101]
+
+
+def master_send(broker, master, mt5, **req):
+    base = {"action": mt5.TRADE_ACTION_DEAL, "symbol": "XAUUSD",
+            "type": mt5.ORDER_TYPE_BUY, "price": 2000.2}
+    return broker.call(master, mt5.order_send, {**base, **req})
+
+
+def follower_positions(mt5):
+    return list(mt5.ACCOUNTS[102].positions.values())
+
+
+def test_replicates_open_modify_partial_and_close(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+
+    ticket = master_send(broker, master, mt5, volume=0.2, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    [pos] = follower_positions(mt5)
+    assert (pos.volume, pos.sl, pos.tp) == (0.2, 1990.0, 2010.0)
+    assert syncer.copy_map.followers(ticket) == [(102, pos.ticket)]
+    assert syncer.copy_map.master_of(102, pos.ticket) == ticket
+    syncer.copy_map.flush()
+    assert stored_copies(ticket) == [(102, pos.ticket)]
+
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    syncer._tick()
+    assert follower_positions(mt5)[0].sl == 1995.0
+
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert follower_positions(mt5)[0].volume == pytest.approx(0.1)
+
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert follower_positions(mt5) == []
+    assert syncer.copy_map.followers(ticket) == []
+    syncer.copy_map.flush()
+    assert stored_copies(ticket) == []
+
+
+def test_unchanged_master_skips_snapshot_and_diff(accounts):
+    mt5, broker, master = accounts
+    master_send(broker, master, mt5, volume=0.1, sl=1990.0, tp=2010.0)
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    opened = mt5.CALLS["order_send"]
+
+    for _ in range(5):
+        syncer._tick()
+    assert syncer.full_diffs == 1
+    assert syncer.skipped_diffs == 5
+    assert mt5.CALLS["order_send"] == opened
+
+
+def test_idle_tick_reads_only_the_counts(accounts, monkeypatch):
+    from config import settings
+    mt5, broker, master = accounts
+    monkeypatch.setattr(settings, "copy_full_poll_sec", 60)
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    assert syncer._tick() is True               # the counts moved
+
+    mt5.CALLS.clear()
+    assert syncer._tick() is False
+    assert mt5.CALLS["positions_get"] == mt5.CALLS["orders_get"] == 0
+    assert mt5.CALLS["positions_total"] == mt5.CALLS["orders_total"] == 1
+
+    # an SL-only edit moves no count: the periodic full poll picks it up
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    assert syncer._tick() is False
+    syncer._full_poll_at = 0.0
+    assert syncer._tick() is True
+    assert follower_positions(mt5)[0].sl == 1995.0
+
+
+def test_one_login_per_follower_per_tick(accounts):
+    mt5, broker, master = accounts
+    mt5.add_account(103)
+    add_user(make_user(103))
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    for _ in range(3):
+        master_send(broker, master, mt5, volume=0.1, sl=1990.0, tp=2010.0)
+
+    logins = mt5.CALLS["login"]
+    syncer._tick()
+    assert mt5.CALLS["login"] - logins == 2        # one per follower
+    assert len(follower_positions(mt5)) == 3
+    assert len(mt5.ACCOUNTS[103].positions) == 3
+    assert set(syncer.follower_stats()) == {102, 103}
+
+
+def test_engine_fill_is_pushed_to_followers(accounts):
+    from tradebot.domain.models import Order
+    from tradebot.infrastructure.mt5_engine import MetaTraderEngine
+
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    engine = MetaTraderEngine()
+    engine.on_master_fill = syncer.push
+    order = Order(symbol="XAUUSD", side="buy", order_type="market",
+                  risk=0.01, price=None, sl=1990.0, tp=2010.0, comment="c",
+                  correlation_id="cid-push")
+    [res] = engine.execute_order(order)
+    ticket = res.data["order"]
+
+    syncer._replicate_pushed(master)           # before any poll
+    [pos] = follower_positions(mt5)
+    assert (pos.sl, pos.tp, pos.comment) == (1990.0, 2010.0, f"copy-{ticket}")
+    assert syncer.copy_map.followers(ticket) == [(102, pos.ticket)]
+    assert syncer.pushed_opens == 1
+
+    syncer._tick()                             # poll sees it, opens nothing
+    assert len(follower_positions(mt5)) == 1
+
+
+def test_rapid_sltp_edits_are_coalesced(accounts, monkeypatch):
+    from config import settings
+    mt5, broker, master = accounts
+    mt5.add_account(103)
+    add_user(make_user(103))
+    monkeypatch.setattr(settings, "copy_sltp_coalesce_ms", 100)
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+
+    sends = mt5.CALLS["order_send"]
+    for sl in (1991.0, 1992.0, 1993.0):         # trader drags the SL
+        master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                    position=ticket, sl=sl, tp=2010.0)
+        assert syncer._tick() is True
+    assert mt5.CALLS["order_send"] - sends == 3  # master edits only
+    assert follower_positions(mt5)[0].sl == 1990.0
+
+    time.sleep(0.12)
+    syncer._tick()                               # unchanged master: forwards
+    assert mt5.CALLS["order_send"] - sends == 3 + 2
+    assert follower_positions(mt5)[0].sl == 1993.0
+    assert [p.sl for p in mt5.ACCOUNTS[103].positions.values()] == [1993.0]
+    assert syncer.sltp_saved == 2 * 2            # 2 superseded edits x 2
+    assert syncer._tick() is False
+
+
+def test_stop_forwards_held_sltp_edits(accounts, monkeypatch):
+    from config import settings
+    mt5, broker, master = accounts
+    monkeypatch.setattr(settings, "copy_sltp_coalesce_ms", 60_000)
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    syncer._tick()
+    assert follower_positions(mt5)[0].sl == 1990.0     # still held
+
+    syncer.stop()
+    assert follower_positions(mt5)[0].sl == 1995.0
+    assert not syncer._sltp_due
+
+
+def test_translates_symbols_per_follower_broker(accounts):
+    from tradebot.infrastructure import _mt5_symbol_resolver as res
+
+    mt5, broker, master = accounts
+    mt5.add_symbol("XAUUSD.m")
+    for acct, server, symbols in ((103, "Suffix", ["XAUUSD.m", "EURUSD.m"]),
+                                  (104, "NoGold", ["EURUSD"])):
+        mt5.add_account(acct, server=server)
+        add_user(UserAccount(first_name="U", last_name=str(acct),
+                             mt5_account=acct, mt5_password="pw",
+                             mt5_server=server, mt5_path="t.exe"))
+        res._resolvers[server] = res.SymbolResolver(
+            server, symbols=symbols, persist=False)
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+
+    ticket = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    [pos] = mt5.ACCOUNTS[103].positions.values()
+    assert (pos.symbol, pos.comment) == ("XAUUSD.m", f"copy-{ticket}")
+    assert mt5.ACCOUNTS[104].positions == {}
+    assert syncer.follower_stats()[104]["count"] == 1
+
+    # Known miss: no more round-trips to 104 for gold
+    master_send(broker, master, mt5, volume=0.1, sl=1990.0, tp=2010.0)
+    syncer._tick()
+    assert len(mt5.ACCOUNTS[103].positions) == 2
+    assert syncer.follower_stats()[104]["count"] == 1
+
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    syncer._tick()
+    assert mt5.ACCOUNTS[103].positions[pos.ticket].sl == 1995.0
+
+
+def test_records_replication_lag_per_follower(accounts):
+    from tradebot.infrastructure.db import list_replication_stats
+
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.2, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    syncer._tick()
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1, price=2000.1)
+    syncer._tick()
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1, price=2000.0)
+    syncer._tick()
+
+    stats = syncer.lag_stats()[102]
+    assert {k for k in stats} == {"open_lag_ms", "sltp_lag_ms",
+                                  "partial_lag_ms", "close_lag_ms",
+                                  "price_diff"}
+    assert all(st["count"] == 1 for k, st in stats.items() if "lag" in k)
+    assert 0 <= stats["open_lag_ms"]["max"] < 5000
+    # follower fills at the tick (ask 2000.2 / bid 2000.0); master partial
+    # was 0.1 better
+    assert stats["price_diff"]["count"] == 3
+    assert stats["price_diff"]["max"] == pytest.approx(0.1)
+
+    syncer.save_lag_stats()
+    rows = {r["metric"]: r for r in list_replication_stats()}
+    assert rows["close_lag_ms"]["follower_account"] == 102
+    assert rows["price_diff"]["count"] == 3
+
+
+def follower_orders(mt5):
+    return list(mt5.ACCOUNTS[102].orders.values())
+
+
+def test_mirrors_pending_orders(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_BUY_LIMIT, price=1995.0,
+                         volume=0.2, sl=1985.0, tp=2010.0).order
+    syncer._tick()
+    [order] = follower_orders(mt5)
+    assert (order.type, order.price_open, order.sl, order.tp, order.comment) \
+        == (mt5.ORDER_TYPE_BUY_LIMIT, 1995.0, 1985.0, 2010.0, f"copy-{ticket}")
+    assert syncer.pending_map.followers(ticket) == [(102, order.ticket)]
+
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_MODIFY,
+                order=ticket, price=1994.0, sl=1984.0, tp=2010.0)
+    syncer._tick()
+    assert follower_orders(mt5)[0].price_open == 1994.0
+    assert follower_orders(mt5)[0].sl == 1984.0
+
+    # Master fills; the follower's pending fills at its own level
+    mt5.fill_pending(101, ticket)
+    mt5.fill_pending(102, order.ticket)
+    sends = mt5.CALLS["order_send"]
+    syncer._tick()
+    assert mt5.CALLS["order_send"] == sends        # no market re-open
+    assert [p.ticket for p in follower_positions(mt5)] == [order.ticket]
+    assert syncer.pending_map.followers(ticket) == [(102, order.ticket)]
+
+    # reconcile sees the follower fill and moves the copy across maps
+    assert syncer.reconcile() == 1
+    assert mt5.CALLS["order_send"] == sends
+    assert syncer.copy_map.followers(ticket) == [(102, order.ticket)]
+    assert syncer.pending_map.followers(ticket) == []
+
+
+def test_cancelled_master_pending_removes_follower_copy(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_SELL_STOP, price=1990.0,
+                         volume=0.1, sl=2000.0, tp=1980.0).order
+    syncer._tick()
+    assert len(follower_orders(mt5)) == 1
+
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_REMOVE,
+                order=ticket)
+    syncer._tick()
+    assert follower_orders(mt5) == []
+    assert syncer.pending_map.followers(ticket) == []
+
+
+def test_master_closes_before_follower_pending_fills(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_BUY_LIMIT, price=1995.0,
+                         volume=0.1, sl=1985.0, tp=2010.0).order
+    syncer._tick()
+    mt5.fill_pending(101, ticket)
+    syncer._tick()
+    assert follower_positions(mt5) == [] and len(follower_orders(mt5)) == 1
+
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert follower_orders(mt5) == [] and follower_positions(mt5) == []
+
+
+def test_unfilled_copy_follows_a_filled_master(accounts, monkeypatch):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_BUY_LIMIT, price=1995.0,
+                         volume=0.1, sl=1985.0, tp=2010.0).order
+    syncer._tick()
+    mt5.fill_pending(101, ticket)
+    syncer._tick()
+    [order] = follower_orders(mt5)
+    assert syncer.pending_map.followers(ticket) == [(102, order.ticket)]
+    assert syncer.copy_map.followers(ticket) == []
+
+    # an SL move reaches the follower's order, not a position request
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1987.0, tp=2010.0)
+    syncer._tick()
+    [order] = follower_orders(mt5)
+    assert (order.price_open, order.sl) == (1995.0, 1987.0)
+
+    # a failed close keeps the mapping; reconcile retries it
+    remove = CopyTradeSyncer._remove_pending
+    monkeypatch.setattr(CopyTradeSyncer, "_remove_pending",
+                        staticmethod(lambda *a: False))
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert syncer.pending_map.followers(ticket) == [(102, order.ticket)]
+    monkeypatch.setattr(CopyTradeSyncer, "_remove_pending",
+                        staticmethod(remove))
+    assert syncer.reconcile() == 1
+    assert follower_orders(mt5) == []
+    assert syncer.pending_map.followers(ticket) == []
+
+
+def test_reconcile_keeps_a_copy_that_filled_before_the_master(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_SELL_LIMIT, price=2005.0,
+                         volume=0.1, sl=2015.0, tp=1990.0).order
+    syncer._tick()
+    [order] = follower_orders(mt5)
+    mt5.fill_pending(102, order.ticket)         # the follower fills first
+
+    sends = mt5.CALLS["order_send"]
+    assert syncer.reconcile() == 1              # moved, not closed
+    assert mt5.CALLS["order_send"] == sends
+    assert syncer.copy_map.followers(ticket) == [(102, order.ticket)]
+    assert syncer.pending_map.followers(ticket) == []
+
+    mt5.fill_pending(101, ticket)
+    syncer._tick()
+    assert mt5.CALLS["order_send"] == sends     # no second copy
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_BUY,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert follower_positions(mt5) == []
+
+
+def test_partial_close_keeps_unfilled_follower_pending(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5,
+                         action=mt5.TRADE_ACTION_PENDING,
+                         type=mt5.ORDER_TYPE_BUY_LIMIT, price=1995.0,
+                         volume=0.2, sl=1985.0, tp=2010.0).order
+    syncer._tick()
+    mt5.fill_pending(101, ticket)
+    syncer._tick()
+    [order] = follower_orders(mt5)
+
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert syncer.pending_map.followers(ticket) == [(102, order.ticket)]
+
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+    syncer._tick()
+    assert follower_orders(mt5) == [] and follower_positions(mt5) == []
+
+
+def test_restart_does_not_recopy_open_positions(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    master_send(broker, master, mt5, volume=0.1, sl=1990.0, tp=2010.0)
+    syncer._tick()
+    syncer.copy_map.flush()
+
+    restarted = CopyTradeSyncer()
+    restarted._tick()
+    assert len(follower_positions(mt5)) == 1
+
+
+def test_reconcile_repairs_lost_flush_window(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    [pos] = follower_positions(mt5)
+    # crash: the mapping never reached SQLite
+    assert stored_copies(ticket) == []
+
+    restarted = CopyTradeSyncer()
+    assert restarted.reconcile() == 1
+    assert restarted.copy_map.followers(ticket) == [(102, pos.ticket)]
+    restarted._tick()
+    assert len(follower_positions(mt5)) == 1
+
+    # a follower copy closed while the bot was down drops its mapping
+    mt5.ACCOUNTS[102].positions.clear()
+    assert restarted.reconcile() == 1
+    assert restarted.copy_map.followers(ticket) == []
+
+
+def test_restart_replays_edits_made_while_down(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    ticket = master_send(broker, master, mt5, volume=0.2, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    assert get_checkpoint("copy_syncer") is None    # not due yet
+    syncer.stop()                           # final checkpoint
+
+    # While the bot is down: SL moved and half the position closed
+    master_send(broker, master, mt5, action=mt5.TRADE_ACTION_SLTP,
+                position=ticket, sl=1995.0, tp=2010.0)
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=ticket, volume=0.1)
+
+    restarted = CopyTradeSyncer()
+    assert restarted.restore() is True
+    restarted.copy_map.load()
+    assert restarted.reconcile() == 0
+    restarted._tick()
+    [pos] = follower_positions(mt5)
+    assert pos.sl == 1995.0
+    assert pos.volume == pytest.approx(0.1)
+
+
+def test_reconcile_repairs_divergent_legs(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    kept = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                       tp=2010.0).order
+    closed = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    syncer.copy_map.flush()
+    by_master = {m: f for m in (kept, closed)
+                 for _, f in syncer.copy_map.followers(m)}
+
+    # While the bot is down: master closes one leg and opens another,
+    # the follower closes its copy of `kept` by hand
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=closed, volume=0.1)
+    fresh = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                        tp=2010.0).order
+    mt5.ACCOUNTS[102].positions.pop(by_master[kept])
+
+    restarted = CopyTradeSyncer()
+    assert restarted.reconcile() == 3
+    [pos] = follower_positions(mt5)
+    assert pos.comment == f"copy-{fresh}"               # missing leg opened
+    assert restarted.copy_map.followers(kept) == []     # tombstoned
+    assert restarted.copy_map.follower_ticket(kept, 102) == 0
+    assert restarted.copy_map.followers(closed) == []
+
+    sends = mt5.CALLS["order_send"]
+    restarted._tick()                                   # baseline was seeded
+    assert restarted.full_diffs == 0
+    assert restarted.reconcile() == 0
+    assert mt5.CALLS["order_send"] == sends
+
+
+def test_reconcile_keeps_copies_whose_comment_was_rewritten(accounts):
+    mt5, broker, master = accounts
+    syncer = CopyTradeSyncer()
+    syncer._tick()
+    kept = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                       tp=2010.0).order
+    closed = master_send(broker, master, mt5, volume=0.1, sl=1990.0,
+                         tp=2010.0).order
+    syncer._tick()
+    syncer.copy_map.flush()
+    by_master = {m: f for m in (kept, closed)
+                 for _, f in syncer.copy_map.followers(m)}
+
+    # the follower's broker replaced both copy comments
+    book = mt5.ACCOUNTS[102].positions
+    for f_ticket in by_master.values():
+        book[f_ticket] = book[f_ticket]._replace(comment="[sl 1990.0]")
+    master_send(broker, master, mt5, type=mt5.ORDER_TYPE_SELL,
+                position=closed, volume=0.1)
+
+    restarted = CopyTradeSyncer()
+    assert restarted.reconcile() == 1                   # closes `closed`
+    assert [p.ticket for p in follower_positions(mt5)] == [by_master[kept]]
+    assert restarted.copy_map.followers(kept) == [(102, by_master[kept])]
+
+
+def test_reconcile_is_one_call_per_account(mt5, db_path, broker, monkeypatch):
+    mt5.add_symbol("XAUUSD")
+    master = make_user(1)
+    mt5.add_account(1)
+    set_master(add_user(master))
+    followers = range(2, 22)
+    for acct in followers:
+        mt5.add_account(acct)
+        add_user(make_user(acct))
+    for _ in range(200):
+        master_send(broker, master, mt5, volume=0.1, sl=1990.0, tp=2010.0)
+    syncer = CopyTradeSyncer()
+    assert syncer.reconcile() == 200 * 20               # every leg opened
+
+    views = []
+    real = CopyMap.for_account
+    monkeypatch.setattr(CopyMap, "for_account",
+                        lambda self, acct: (views.append(acct),
+                                            real(self, acct))[1])
+    mt5.CALLS.clear()
+    assert syncer.reconcile() == 0                      # a join, no actions
+    assert mt5.CALLS["positions_get"] == 1 + 20
+    assert mt5.CALLS["orders_get"] == 1 + 20
+    assert mt5.CALLS["order_send"] == 0
+    # one copy-map view per follower and book, not one lookup per mapping
+    assert sorted(views) == sorted([*followers] * 2)
+
+
+def _positions(n, sl_shift=0.0):
+    from fake_mt5 import Position
+    return [Position(t, "XAUUSD", 0, 1.0, 2000.0, 1990.0 + sl_shift * (t % 2),
+                     2010.0, "c", 0, 0, 0, 0, t) for t in range(1, n + 1)]
+
+
+def test_array_diff_on_large_book():
+    prev = _Snapshot.from_positions(_positions(1000))
+    rows = _positions(1001, sl_shift=1.0)[1:]         # close #1, open #1001
+    rows[10] = rows[10]._replace(volume=0.25)
+    cur = _Snapshot.from_positions(rows)
+
+    diff = _Diff(prev, cur)
+    assert cur.tickets[diff.opened].tolist() == [1001]
+    assert diff.closed.tolist() == [1]
+    assert len(diff.modified) == 500 - 1               # odd tickets 3..999
+    assert cur.tickets[diff.reduced].tolist() == [12]
+    np.testing.assert_allclose(diff.reduced_ratio, [0.75])
@@ -0,0 +1,37 @@
+import pytest
+
+from tradebot.infrastructure._expiring import ExpiringDict
+
+
+def test_entries_expire_with_their_bucket():
+    d = ExpiringDict(resolution=10)
+    d.put("a", 1, stamp=5)
+    d.put("b", 2, stamp=15)
+    assert d.evict_before(8) == 0           # bucket 0..10 not over yet
+    assert "a" in d
+    assert d.evict_before(12) == 1
+    assert "a" not in d and d.get("b") == 2
+    assert d.stats() == {"size": 1, "buckets": 1, "evicted_age": 1,
+                         "evicted_size": 0}
+
+
+def test_restamp_moves_the_key():
+    d = ExpiringDict(resolution=10)
+    d.put("a", 1, stamp=5)
+    d.put("a", 2, stamp=25)
+    d.evict_before(20)
+    assert d.get("a") == 2
+    assert d.pop("a") == 2 and len(d) == 0 and d.stats()["buckets"] == 0
+
+
+def test_size_cap_drops_oldest_first():
+    d = ExpiringDict(max_size=3, resolution=10)
+    for i in range(5):
+        d.put(i, stamp=i * 10)
+    assert sorted(k for k, _ in d.items()) == [2, 3, 4]
+    assert d.evicted_size == 2
+
+
+def test_rejects_bad_bounds():
+    with pytest.raises(ValueError):
+        ExpiringDict(max_size=0)
@@ -0,0 +1,22 @@
+from tradebot.infrastructure._metrics import RollingStats
+
+
+def test_rolling_stats_percentiles():
+    st = RollingStats(maxlen=100)
+    for v in range(1, 101):
+        st.add(v)
+    summary = st.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == 50
+    assert summary["p95"] == 95
+    assert summary["p99"] == 99
+    assert summary["max"] == 100
+
+
+def test_rolling_stats_window_is_bounded():
+    st = RollingStats(maxlen=10)
+    for v in range(1000):
+        st.add(v)
+    assert st.count == 1000
+    assert st.percentile(0) == 990
+    assert st.summary()["mean"] == sum(range(990, 1000)) / 10
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+from tradebot.infrastructure._mt5_utils import MT5Broker, MT5LoginError, Priority
+from tradebot.infrastructure.db import UserAccount
+
+
+def make_user(account, password="pw", server="Demo"):
+    return UserAccount(mt5_account=account, mt5_password=password,
+                       mt5_server=server, mt5_path="terminal64.exe")
+
+
+def test_same_account_skips_login(mt5, broker):
+    mt5.add_account(1)
+    mt5.add_account(2)
+    u1, u2 = make_user(1), make_user(2)
+
+    for _ in range(3):
+        assert broker.call(u1, mt5.account_info).login == 1
+    assert broker.call(u2, mt5.account_info).login == 2
+
+    stats = broker.stats()
+    assert mt5.CALLS["login"] == 2
+    assert stats["logins"] == 2
+    assert stats["logins_avoided"] == 2
+    assert stats["jobs"] == 4
+
+
+def test_failed_login_raises_and_forgets_account(mt5, broker):
+    mt5.add_account(1)
+    broker.call(make_user(1), mt5.account_info)
+
+    with pytest.raises(MT5LoginError):
+        broker.call(make_user(9), mt5.account_info)
+    assert broker.current_account is None
+    assert broker.stats()["login_failures"] == 1
+
+    broker.call(make_user(1), mt5.account_info)
+    assert mt5.CALLS["login"] == 3
+
+
+def test_jobs_from_many_threads_never_interleave(mt5, broker):
+    users = [make_user(a) for a in (1, 2, 3)]
+    for u in users:
+        mt5.add_account(u.mt5_account)
+
+    def job(expected):
+        before = mt5.current_login()
+        time.sleep(0.001)
+        return before == expected == mt5.current_login()
+
+    results: list[bool] = []
+    lock = threading.Lock()
+
+    def worker(i):
+        for n in range(15):
+            u = users[(i + n) % len(users)]
+            ok = broker.call(u, job, u.mt5_account)
+            with lock:
+                results.append(ok)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 60 and all(results)
+    stats = broker.stats()
+    assert stats["logins"] + stats["logins_avoided"] == 60
+
+
+def test_queue_time_is_recorded(mt5, broker):
+    mt5.add_account(1)
+    u = make_user(1)
+    slow = broker.submit(u, time.sleep, 0.05)
+    fast = broker.submit(u, mt5.account_info)
+    slow.result()
+    fast.result()
+    assert broker.stats()["queued_sec_max"] >= 0.04
+
+
+def test_nested_submit_runs_inline(mt5, broker):
+    mt5.add_account(1)
+    mt5.add_account(2)
+    u1, u2 = make_user(1), make_user(2)
+
+    def outer():
+        inner = broker.call(u2, mt5.account_info).login
+        return inner, mt5.current_login()
+
+    assert broker.call(u1, outer) == (2, 2)
+
+
+def _gate(broker):
+    """Occupy the broker thread until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    fut = broker.submit(None, hold, priority=Priority.ORDER)
+    started.wait(5)
+    return release, fut
+
+
+def test_higher_priority_jobs_run_first(mt5, broker):
+    ran: list[str] = []
+    release, gate = _gate(broker)
+    futs = [
+        broker.submit(None, ran.append, "housekeeping",
+                      priority=Priority.HOUSEKEEPING),
+        broker.submit(None, ran.append, "sl", priority=Priority.SL),
+        broker.submit(None, ran.append, "copy", priority=Priority.COPY),
+        broker.submit(None, ran.append, "order", priority=Priority.ORDER),
+    ]
+    release.set()
+    for f in [gate] + futs:
+        f.result(5)
+    assert ran == ["order", "copy", "sl", "housekeeping"]
+
+
+def test_order_burst_defers_background_jobs(mt5, broker):
+    ran: list[str] = []
+    with broker.order_burst():
+        bg = broker.submit(None, ran.append, "sl", priority=Priority.SL)
+        time.sleep(0.05)
+        assert not bg.done()
+        broker.call(None, ran.append, "order", priority=Priority.ORDER)
+        assert ran == ["order"]
+    bg.result(5)
+    assert ran == ["order", "sl"]
+
+
+def test_burst_deferral_is_capped(mt5):
+    broker = MT5Broker(max_defer_sec=0.05)
+    try:
+        with broker.order_burst():
+            assert broker.call(None, lambda: 42, priority=Priority.SL,
+                               timeout=2) == 42
+    finally:
+        broker.stop()
+
+
+def test_expired_burst_does_not_spin(mt5):
+    broker = MT5Broker(max_defer_sec=0.01)
+    try:
+        with broker.order_burst():
+            assert broker._defer_left() > 0
+            time.sleep(0.02)
+            assert broker._defer_left() is None     # wait for a job
+            assert broker.call(None, lambda: 1, priority=Priority.SL,
+                               timeout=2) == 1
+    finally:
+        broker.stop()
+
+
+def test_stop_fails_jobs_left_in_the_queue(mt5):
+    broker = MT5Broker()
+    release, gate = _gate(broker)
+    queued = broker.submit(None, lambda: 1, priority=Priority.SL)
+    broker.stop(timeout=0.05)
+    with pytest.raises(RuntimeError, match="stopped"):
+        queued.result(1)
+    release.set()
+    gate.result(5)
+
+
+def test_queue_wait_is_reported_per_class(mt5, broker):
+    release, gate = _gate(broker)
+    sl = broker.submit(None, lambda: None, priority=Priority.SL)
+    time.sleep(0.03)
+    release.set()
+    gate.result(5)
+    sl.result(5)
+
+    waits = broker.stats()["queue_wait"]
+    assert waits["SL"]["count"] == 1
+    assert waits["SL"]["p99"] >= 0.02
+    assert waits["COPY"]["count"] == 0
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from tradebot.infrastructure._mt5_cache import (
+    SymbolInfoCache, TickCache, get_symbol_cache, warm_recent_symbols,
+)
+from tradebot.infrastructure.db import UserAccount
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(mt5):
+    mt5.add_symbol("XAUUSD")
+    mt5.add_symbol("EURUSD")
+    clock = Clock()
+    return SymbolInfoCache(ttl_sec=60, clock=clock), clock
+
+
+def test_hits_skip_the_terminal(cache, mt5):
+    c, _ = cache
+    assert c.get("XAUUSD", "Demo").volume_step == 0.01
+    assert c.get("XAUUSD", "Demo") is c.get("XAUUSD", "Demo")
+    assert mt5.CALLS["symbol_info"] == 1
+    assert c.stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def test_entries_are_per_server(cache, mt5):
+    c, _ = cache
+    c.get("XAUUSD", "Demo")
+    c.get("XAUUSD", "Live")
+    assert mt5.CALLS["symbol_info"] == 2
+
+
+def test_ttl_expiry_refetches(cache, mt5):
+    c, clock = cache
+    c.get("XAUUSD", "Demo")
+    clock.now = 59
+    c.get("XAUUSD", "Demo")
+    clock.now = 61
+    c.get("XAUUSD", "Demo")
+    assert mt5.CALLS["symbol_info"] == 2
+
+
+def test_invalidate_and_missing_symbols(cache, mt5):
+    c, _ = cache
+    c.get("XAUUSD", "Demo")
+    c.get("EURUSD", "Demo")
+    c.invalidate(symbol="XAUUSD")
+    assert c.stats()["size"] == 1
+    assert c.get("NOPE", "Demo") is None
+    assert c.get("NOPE", "Demo") is None
+    assert mt5.CALLS["symbol_info"] == 4    # 2 + NOPE twice (never cached)
+
+
+def test_warm_up_from_recent_deals(mt5, broker):
+    mt5.add_symbol("XAUUSD")
+    mt5.add_symbol("EURUSD")
+    mt5.add_account(101)
+    user = UserAccount(mt5_account=101, mt5_password="pw",
+                       mt5_server="Demo", mt5_path="terminal64.exe")
+    broker.call(user, mt5.order_send, {
+        "action": mt5.TRADE_ACTION_DEAL, "symbol": "XAUUSD", "volume": 0.1,
+        "type": mt5.ORDER_TYPE_BUY, "price": 2000.2})
+
+    assert broker.call(user, warm_recent_symbols, 7) == 1
+    broker.call(user, get_symbol_cache().get, "XAUUSD")
+    assert mt5.CALLS["symbol_info"] == 1
+    assert get_symbol_cache().stats()["hits"] == 1
+
+
+# ----------------------------------------------------------------------
+# Ticks
+# ----------------------------------------------------------------------
+
+def test_tick_reused_until_max_age(cache, mt5):
+    _, clock = cache
+    ticks = TickCache(max_age_sec=0.25, clock=clock)
+    tick, age = ticks.get_with_age("XAUUSD", "Demo")
+    assert tick.ask == 2000.2 and age == 0.0
+
+    mt5.set_tick("XAUUSD", 2001.0, 2001.2)
+    clock.now = 0.2
+    tick, age = ticks.get_with_age("XAUUSD", "Demo")
+    assert tick.ask == 2000.2 and age == pytest.approx(0.2)
+
+    clock.now = 0.3
+    assert ticks.get("XAUUSD", "Demo").ask == 2001.2
+    assert ticks.get("XAUUSD", "Demo", max_age=0).ask == 2001.2
+    assert mt5.CALLS["symbol_info_tick"] == 3
+
+
+def test_concurrent_misses_share_one_refresh(mt5):
+    mt5.add_symbol("XAUUSD")
+    mt5.LATENCY = 0.2
+    ticks = TickCache(max_age_sec=5)
+    start = threading.Barrier(4)
+    got = []
+
+    def reader():
+        start.wait()
+        got.append(ticks.get("XAUUSD", "Demo"))
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(got) == 4 and all(t is got[0] for t in got)
+    assert mt5.CALLS["symbol_info_tick"] == 1
+    assert ticks.stats()["shared"] == 3
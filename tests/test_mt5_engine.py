@@ -0,0 +1,85 @@
+import pytest
+
+from tradebot.domain.models import Order
+from tradebot.infrastructure.db import UserAccount, add_user
+from tradebot.infrastructure.mt5_engine import MetaTraderEngine
+
+
+def make_orders(n=4, symbol="XAUUSD"):
+    return [
+        Order(symbol=symbol, side="buy", order_type="market", risk=0.01,
+              price=None, sl=1990.0, tp=2000.0 + 5 * k,
+              comment=f"Lily {k}of{n}")
+        for k in range(1, n + 1)
+    ]
+
+
+@pytest.fixture
+def accounts(mt5, db_path, broker):
+    mt5.add_symbol("XAUUSDb")
+    mt5.add_symbol("EURUSD", bid=1.1, ask=1.1001, point=0.00001,
+                   digits=5, trade_tick_size=0.00001)
+    for acct in (101, 102):
+        mt5.add_account(acct)
+        add_user(UserAccount(first_name="U", last_name=str(acct),
+                             mt5_account=acct, mt5_password="pw",
+                             mt5_server="Demo", mt5_path="terminal64.exe"))
+    return mt5
+
+
+def test_batch_logs_in_once_per_account(accounts):
+    mt5 = accounts
+    results = MetaTraderEngine().execute_orders(make_orders(4))
+
+    assert len(results) == 4
+    assert all(len(per_acct) == 2 for per_acct in results)
+    assert all(r.success for per_acct in results for r in per_acct)
+
+    assert mt5.CALLS["login"] == 2
+    assert mt5.CALLS["account_info"] == 2
+    assert mt5.CALLS["symbols_get"] == 1     # one resolver per server
+    # Both accounts are on the same server: metadata is fetched once
+    assert mt5.CALLS["symbol_info"] == 1
+    assert mt5.CALLS["order_send"] == 8
+    assert mt5.CALLS["symbol_info_tick"] < 8     # legs share cached ticks
+
+
+def test_batch_results_follow_input_order(accounts):
+    mt5 = accounts
+    orders = make_orders(3)
+    results = MetaTraderEngine().execute_orders(orders)
+
+    for order, per_acct in zip(orders, results):
+        for res in per_acct:
+            acc = mt5.ACCOUNTS[res.data["account_id"]]
+            assert acc.positions[res.data["order"]].tp == order.tp
+
+
+def test_per_leg_api_wraps_batch(accounts):
+    mt5 = accounts
+    res = MetaTraderEngine().execute_order(make_orders(1)[0])
+    assert [r.success for r in res] == [True, True]
+    assert {r.data["account_id"] for r in res} == {101, 102}
+    # Every leg records the age of the tick it was priced on
+    assert all(r.data["tick_age_ms"] >= 0 for r in res)
+    assert all(r.data["tick_time_msc"] for r in res)
+
+
+def test_sizing_and_pricing_share_one_tick_read(accounts, monkeypatch):
+    from tradebot.infrastructure._mt5_cache import TickCache
+    reads = []
+    real = TickCache.get_with_age
+    monkeypatch.setattr(TickCache, "get_with_age",
+                        lambda self, *a, **kw: (reads.append(a[0]),
+                                                real(self, *a, **kw))[1])
+    results = MetaTraderEngine().execute_orders(make_orders(4))
+    assert all(r.success for per_acct in results for r in per_acct)
+    # One read per account and symbol, not one per leg for sizing + pricing
+    assert len(reads) == 2
+
+
+def test_failing_leg_does_not_abort_batch(accounts):
+    orders = make_orders(2) + make_orders(1, symbol="NOPE")
+    results = MetaTraderEngine().execute_orders(orders)
+    assert all(r.success for r in results[0] + results[1])
+    assert not any(r.success for r in results[2])
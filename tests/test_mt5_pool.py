@@ -0,0 +1,103 @@
+import os
+import time
+from concurrent.futures import wait
+
+import pytest
+
+import fake_mt5
+from tradebot.infrastructure._mt5_pool import TerminalPool
+from tradebot.infrastructure._mt5_utils import Priority
+from tradebot.infrastructure.db import UserAccount
+
+LATENCY = 0.3
+
+
+@pytest.fixture
+def terminals(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        exe = tmp_path / name / "terminal64.exe"
+        exe.parent.mkdir()
+        exe.write_text("")
+        paths.append(str(exe))
+    return paths
+
+
+@pytest.fixture
+def pool():
+    p = TerminalPool(mt5_module="fake_mt5", call_timeout=10,
+                     initializer=fake_mt5.seed,
+                     initargs=([101, 102], ["XAUUSD"], LATENCY))
+    yield p
+    p.stop()
+
+
+def user(account, path):
+    return UserAccount(mt5_account=account, mt5_password="pw",
+                       mt5_server="Demo", mt5_path=path)
+
+
+def test_one_process_per_terminal_and_logins_stick(pool, terminals):
+    a, b = user(101, terminals[0]), user(102, terminals[1])
+
+    pid_a = pool.call(a, os.getpid)
+    pid_b = pool.call(b, os.getpid)
+    assert pid_a != pid_b != os.getpid()
+
+    for _ in range(3):
+        assert pool.call(a, fake_mt5.current_login) == 101
+        assert pool.call(a, os.getpid) == pid_a
+    # Worker A logged in once and stayed on its account
+    assert pool.call(a, fake_mt5.call_count, "login") == 1
+
+
+def test_fan_out_runs_terminals_in_parallel(pool, terminals):
+    a, b = user(101, terminals[0]), user(102, terminals[1])
+    pool.call(a, os.getpid)          # warm both workers
+    pool.call(b, os.getpid)
+
+    t0 = time.perf_counter()
+    futs = [pool.submit(u, fake_mt5.account_info, priority=Priority.ORDER)
+            for u in (a, b)]
+    wait(futs)
+    elapsed = time.perf_counter() - t0
+
+    assert [f.result().login for f in futs] == [101, 102]
+    assert elapsed < LATENCY * 1.8
+
+
+def test_hung_worker_is_killed_and_respawned(pool, terminals):
+    a = user(101, terminals[0])
+    pid = pool.call(a, os.getpid)
+
+    with pytest.raises(TimeoutError):
+        pool.call(a, time.sleep, 30, timeout=0.5)
+
+    new_pid = pool.call(a, os.getpid)
+    assert new_pid != pid
+    stats = pool.stats()[os.path.normcase(os.path.abspath(terminals[0]))]
+    assert stats["timeouts"] == 1
+    assert stats["spawns"] == 2
+
+
+def test_worker_errors_propagate(pool, terminals):
+    with pytest.raises(Exception, match="Login failed"):
+        pool.call(user(999, terminals[0]), os.getpid)
+
+
+def test_missing_path_and_no_user_share_the_default_terminal(pool, terminals):
+    pid = pool.call(user(101, None), os.getpid)
+    assert pool.call(user(102, ""), os.getpid) == pid
+    assert pool.call(None, os.getpid) == pid
+    assert pool.call(user(101, terminals[0]), os.getpid) != pid
+
+
+def test_burst_holds_back_workers_spawned_inside_it(pool, terminals):
+    a = user(101, terminals[0])
+    with pool.order_burst():
+        fut = pool.submit(a, os.getpid)
+        assert not fut.done()
+        assert pool.call(a, fake_mt5.current_login,
+                         priority=Priority.ORDER) == 101
+        assert not fut.done()
+    assert fut.result(timeout=10) != os.getpid()
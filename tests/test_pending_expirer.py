@@ -0,0 +1,65 @@
+import pytest
+
+from tradebot.infrastructure import pending_expirer
+from tradebot.infrastructure.db import UserAccount, add_user, update_user
+from tradebot.infrastructure.pending_expirer import PendingOrderExpirer
+
+
+@pytest.fixture
+def user(mt5, db_path, broker):
+    mt5.add_symbol("XAUUSD")
+    mt5.add_account(101)
+    u = UserAccount(first_name="U", last_name="101", mt5_account=101,
+                    mt5_password="pw", mt5_server="Demo", mt5_path="t.exe",
+                    pending_expire_minutes=60)
+    u.id = add_user(u)
+    return u
+
+
+def add_pending(mt5, comment="TT|sig 1of2"):
+    ticket = mt5.new_ticket()
+    mt5.ACCOUNTS[101].orders[ticket] = mt5.PendingOrder(
+        ticket, "XAUUSD", mt5.ORDER_TYPE_BUY_LIMIT, 0.1, 1990.0, 1980.0,
+        2010.0, comment, 0, 0, 0, mt5.ORDER_TIME_GTC)   # no time_setup
+    return ticket
+
+
+def test_first_seen_kept_for_live_orders_only(user, mt5):
+    expirer = PendingOrderExpirer()
+    ticket = add_pending(mt5)
+    assert expirer.run_once() is False
+    assert (101, ticket) in expirer._first_seen
+
+    del mt5.ACCOUNTS[101].orders[ticket]
+    expirer.run_once()
+    assert len(expirer._first_seen) == 0
+
+
+def test_first_seen_of_unvisited_account_ages_out(user, mt5, monkeypatch):
+    expirer = PendingOrderExpirer()
+    add_pending(mt5)
+    expirer.run_once()
+    assert len(expirer._first_seen) == 1
+
+    user.pending_expire_minutes = 0         # account no longer visited
+    update_user(user)
+    expirer.run_once()
+    assert len(expirer._first_seen) == 1
+
+    monkeypatch.setattr(pending_expirer, "_FIRST_SEEN_TTL_SEC", -120.0)
+    expirer.run_once()
+    assert len(expirer._first_seen) == 0
+    assert expirer._first_seen.stats()["evicted_age"] == 1
+
+
+def test_first_seen_survives_a_restart(user, mt5):
+    expirer = PendingOrderExpirer()
+    ticket = add_pending(mt5)
+    expirer.run_once()
+    first = expirer._first_seen.get((101, ticket))
+    expirer.checkpoint()
+
+    restarted = PendingOrderExpirer()
+    assert restarted.restore() == 1
+    restarted.run_once()
+    assert restarted._first_seen.get((101, ticket)) == first
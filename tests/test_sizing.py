@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from tradebot.application.sizing import (
+    AccountSizing, SymbolSpec, clamp_volumes, volume_matrix,
+)
+from tradebot.domain.models import Order
+from tradebot.infrastructure.mt5_engine import MetaTraderEngine
+
+GOLD = SymbolSpec(volume_step=0.01, volume_min=0.01, volume_max=50.0,
+                  trade_tick_value=1.0, trade_tick_size=0.01, point=0.01)
+EURUSD = SymbolSpec(volume_step=0.01, volume_min=0.01, volume_max=100.0,
+                    trade_tick_value=1.0, trade_tick_size=0.00001,
+                    point=0.00001)
+
+
+def scalar_volume(account, risk, entry, sl, spec, global_risk):
+    """The per-leg formula the engine used before vectorization."""
+    if account.risk_mode == "fixed_lot":
+        return MetaTraderEngine._clamp_volume(account.fixed_lot, spec)
+    order = Order(symbol="X", side="buy", order_type="limit", risk=risk,
+                  price=entry, sl=sl, tp=None, comment="")
+    if global_risk > 0:
+        order = MetaTraderEngine._scale_order_risk(order, account.risk_per_trade)
+    return MetaTraderEngine._calc_volume(order, None, account.balance, spec)
+
+
+@pytest.mark.parametrize("spec, entry", [(GOLD, 2000.0), (EURUSD, 1.1)])
+def test_matrix_matches_scalar_formula(spec, entry, monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "risk_per_trade", 0.01)
+
+    rng = random.Random(7)
+    accounts = [
+        AccountSizing(balance=rng.choice([0, 500, 10_000, 250_000.5]),
+                      risk_mode=rng.choice(["risk_pct", "risk_pct", "fixed_lot"]),
+                      risk_per_trade=rng.choice([0.005, 0.01, 0.02]),
+                      fixed_lot=rng.choice([0.001, 0.07, 0.333, 80.0]))
+        for _ in range(40)
+    ]
+    risks = [0.004, 0.003, 0.002, 0.001]
+    sls = [entry * (1 - rng.uniform(0.0005, 0.02)) for _ in risks]
+    sls[-1] = None                                    # leg without SL
+
+    got = volume_matrix(accounts, risks,
+                        [abs(entry - sl) if sl else 0.0 for sl in sls],
+                        spec, global_risk=0.01)
+
+    expected = [[scalar_volume(a, r, entry, sl, spec, 0.01)
+                 for r, sl in zip(risks, sls)] for a in accounts]
+    np.testing.assert_allclose(got, expected, atol=1e-9)
+
+
+def test_clamp_volumes_rounds_and_clamps():
+    assert clamp_volumes([0.004, 0.126, 99.0], GOLD).tolist() == [0.01, 0.13, 50.0]
+
+
+def test_empty_inputs():
+    assert volume_matrix([], [0.01], [1.0], GOLD, 0.01).shape == (0, 1)
+    assert volume_matrix([AccountSizing(1000)], [], [], GOLD, 0.01).shape == (1, 0)
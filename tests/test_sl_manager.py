@@ -0,0 +1,274 @@
+import time
+
+import pytest
+
+from tradebot.infrastructure.db import UserAccount, add_user, set_master
+from tradebot.infrastructure import sl_manager as sl_mod
+from tradebot.infrastructure.sl_manager import SignalSLManager
+
+
+@pytest.fixture
+def master(mt5, db_path, broker):
+    mt5.add_symbol("XAUUSD", bid=2005.0, ask=2005.2)
+    mt5.add_account(101)
+    user = UserAccount(first_name="M", last_name="101", mt5_account=101,
+                       mt5_password="pw", mt5_server="Demo",
+                       mt5_path="t.exe")
+    set_master(add_user(user))
+    return user
+
+
+def add_deal(mt5, when: float, comment: str = "", *, tp: bool = False,
+             position: int = 0):
+    ticket = mt5.new_ticket()
+    entry = mt5.DEAL_ENTRY_OUT if tp else mt5.DEAL_ENTRY_IN
+    reason = mt5.DEAL_REASON_TP if tp else mt5.DEAL_REASON_EXPERT
+    mt5.ACCOUNTS[101].deals.append(mt5.Deal(
+        ticket, ticket, position or ticket, "XAUUSD", mt5.DEAL_TYPE_SELL,
+        entry, reason, 0.1, 2000.0, 5.0 if tp else 0.0, comment, 0,
+        int(when), int(when * 1000)))
+    return ticket
+
+
+def add_leg(mt5, comment: str, sl: float = 1990.0):
+    ticket = mt5.new_ticket()
+    now = time.time()
+    mt5.ACCOUNTS[101].positions[ticket] = mt5.Position(
+        ticket, "XAUUSD", mt5.POSITION_TYPE_BUY, 0.1, 2001.0, sl, 2010.0,
+        comment, 0, int(now), int(now * 1000), int(now * 1000), ticket)
+    return ticket
+
+
+def test_tp_leg_tightens_higher_legs_once(master, mt5):
+    old_tp = add_deal(mt5, time.time() - 3600, "sig 1of3", tp=True)
+    manager = SignalSLManager()
+    assert manager.run_once() is False          # warm-up marks history
+    assert (101, old_tp) in manager._processed_tp_deals
+
+    leg2 = add_leg(mt5, "sig 2of3")
+    leg3 = add_leg(mt5, "sig 3of3")
+    add_deal(mt5, time.time() - 1, "sig 1of3", tp=True)
+    assert manager.run_once() is True
+    positions = mt5.ACCOUNTS[101].positions
+    assert positions[leg2].sl == positions[leg3].sl == 2000.0
+
+    sends = mt5.CALLS["order_send"]
+    assert manager.run_once() is False
+    assert mt5.CALLS["order_send"] == sends
+
+
+def test_legs_closing_together_share_one_book_fetch(master, mt5):
+    add_deal(mt5, time.time() - 3600)
+    manager = SignalSLManager()
+    manager.run_once()
+
+    leg3 = add_leg(mt5, "sig 3of4")
+    leg4 = add_leg(mt5, "sig 4of4")
+    other = mt5.new_ticket()
+    mt5.ACCOUNTS[101].orders[other] = mt5.PendingOrder(
+        other, "XAUUSD", mt5.ORDER_TYPE_BUY_LIMIT, 0.1, 2001.0, 1980.0,
+        2010.0, "TT|other 2of2", 0, 0, 0, mt5.ORDER_TIME_GTC)
+    add_deal(mt5, time.time() - 2, "sig 1of4", tp=True)
+    add_deal(mt5, time.time() - 1, "sig 2of4", tp=True)
+    add_deal(mt5, time.time() - 1, "other 1of2", tp=True)
+
+    mt5.CALLS.clear()
+    assert manager.run_once() is True
+    assert mt5.CALLS["positions_get"] == 1
+    assert mt5.CALLS["orders_get"] == 1
+    assert mt5.CALLS["order_send"] == 3         # one per sibling leg
+    positions = mt5.ACCOUNTS[101].positions
+    assert positions[leg3].sl == positions[leg4].sl == 2000.0
+    assert mt5.ACCOUNTS[101].orders[other].sl == 2000.0
+
+
+def test_index_groups_legs_by_signal_and_side(mt5):
+    mt5.add_symbol("XAUUSD")
+    pos = [mt5.Position(t, "XAUUSD", side, 0.1, 2000.0, 0.0, 0.0, c, 0, 0,
+                        0, 0, t)
+           for t, side, c in ((1, 0, "sig 3of3"), (2, 0, "sig 2of3"),
+                              (3, 1, "sig 2of3"), (4, 0, "manual"))]
+    index = SignalSLManager._index_legs(pos, ())
+    assert [(k, row.ticket) for k, row, _ in
+            index[("XAUUSD", "sig", 3, "buy")]] == [(2, 2), (3, 1)]
+    assert len(index[("XAUUSD", "sig", 3, "sell")]) == 1
+    assert len(index) == 2
+
+
+def test_blocked_tp_deal_is_retried_past_the_watermark(master, mt5,
+                                                       monkeypatch):
+    add_deal(mt5, time.time() - 3600)
+    manager = SignalSLManager()
+    manager.run_once()
+    leg2 = add_leg(mt5, "sig 2of2")
+    tp = add_deal(mt5, time.time() - 2, "sig 1of2", tp=True)
+    later = add_deal(mt5, time.time() - 1)
+
+    clamp = SignalSLManager._clamp_sl_to_symbol_rules
+    monkeypatch.setattr(SignalSLManager, "_clamp_sl_to_symbol_rules",
+                        staticmethod(lambda *a: None))
+    assert manager.run_once() is False
+    assert manager._watermarks[101][1] == later
+    assert (101, tp) in manager._tp_retry
+
+    mt5.CALLS.clear()
+    assert manager.run_once() is False          # retried, history not read
+    assert mt5.CALLS["history_deals_get"] == 0
+    assert manager._tp_retry.get((101, tp))[2] == 2
+    manager.checkpoint()                        # the retry set survives
+    manager = SignalSLManager()
+    assert manager.restore() is True
+    assert manager._tp_retry.get((101, tp))[2] == 2
+
+    monkeypatch.setattr(SignalSLManager, "_clamp_sl_to_symbol_rules", clamp)
+    assert manager.run_once() is True
+    assert mt5.ACCOUNTS[101].positions[leg2].sl == 2000.0
+    assert len(manager._tp_retry) == 0
+
+
+def test_tp_deal_that_stays_blocked_is_dropped(master, mt5, monkeypatch):
+    add_deal(mt5, time.time() - 3600)
+    manager = SignalSLManager()
+    manager.run_once()
+    add_leg(mt5, "sig 2of2")
+    tp = add_deal(mt5, time.time() - 1, "sig 1of2", tp=True)
+    monkeypatch.setattr(SignalSLManager, "_clamp_sl_to_symbol_rules",
+                        staticmethod(lambda *a: None))
+
+    for _ in range(sl_mod._TP_RETRY_SCANS - 1):
+        manager.run_once()
+    assert (101, tp) in manager._tp_retry
+    manager.run_once()
+    assert len(manager._tp_retry) == 0
+    mt5.CALLS.clear()
+    manager.run_once()                          # back to the idle count check
+    assert mt5.CALLS["positions_get"] == 0
+    assert mt5.CALLS["history_deals_get"] == 0
+
+
+def test_unreliable_deal_count_never_hides_tp_deals(master, mt5,
+                                                    monkeypatch):
+    add_deal(mt5, time.time() - 3600)
+    manager = SignalSLManager()
+    manager.run_once()
+
+    monkeypatch.setattr(mt5, "history_deals_total", lambda *a: 0)
+    leg2 = add_leg(mt5, "sig 2of2")
+    add_deal(mt5, time.time() - 2, "sig 1of2", tp=True)
+    assert manager.run_once() is True
+    assert mt5.ACCOUNTS[101].positions[leg2].sl == 2000.0
+
+    # a stale count equal to the watermark: a real fetch still comes
+    monkeypatch.setattr(mt5, "history_deals_total",
+                        lambda *a: manager._watermarks[101][2])
+    leg3 = add_leg(mt5, "sig2 2of2")
+    add_deal(mt5, time.time() - 1, "sig2 1of2", tp=True)
+    scans = 1
+    while not manager.run_once():
+        scans += 1
+    assert scans == sl_mod._FORCE_FETCH_SCANS + 1
+    assert mt5.ACCOUNTS[101].positions[leg3].sl == 2000.0
+
+
+def test_scan_cost_tracks_new_deals_not_history(master, mt5):
+    now = time.time()
+    month = 86400 * 30
+    for i in range(50_000):
+        add_deal(mt5, now - 60 - (month - 3600) * i / 50_000)
+    manager = SignalSLManager()
+
+    manager.run_once()
+    assert manager.scan_deals.max == 50_000
+
+    mt5.CALLS.clear()
+    manager.run_once()
+    assert mt5.CALLS["history_deals_total"] == 1
+    assert mt5.CALLS["history_deals_get"] == 0
+
+    for i in range(5):
+        add_deal(mt5, now - 30 + i)
+    manager.run_once()
+    # the new deals plus the one at the watermark second
+    assert manager.scan_deals.summary()["p50"] == 6
+    assert manager.scan_deals.max == 50_000     # the cold scan only
+    assert mt5.CALLS["history_deals_get"] == 1
+
+
+def test_processed_deals_stay_flat_over_a_simulated_month(master, mt5,
+                                                          monkeypatch):
+    clock = {"now": time.time() - 86400 * 60}
+    monkeypatch.setattr(sl_mod, "server_now_epoch", lambda: clock["now"])
+    manager = SignalSLManager()
+    manager.run_once()
+
+    sizes = []
+    for step in range(4 * 60):              # every 6 h for 60 days
+        clock["now"] += 6 * 3600
+        for i in range(20):
+            add_deal(mt5, clock["now"] - 60 + i, "sig 1of2", tp=True)
+        manager.run_once()
+        sizes.append(len(manager._processed_tp_deals))
+
+    month = sizes[4 * 30:]
+    assert max(month) - min(month) <= 20 * 4 + 20   # one bucket of slack
+    assert max(month) <= 20 * 4 * 31
+    stats = manager._processed_tp_deals.stats()
+    assert stats["evicted_age"] >= 20 * 4 * 28
+    assert stats["evicted_size"] == 0
+
+
+def test_warm_restart_skips_the_history_scan(master, mt5):
+    now = time.time()
+    for i in range(50_000):
+        add_deal(mt5, now - 120 - (86400 * 29) * i / 50_000,
+                 "sig 1of2" if i % 100 == 0 else "", tp=i % 100 == 0)
+    first = SignalSLManager()
+    first.run_once()
+    assert first.scan_deals.max == 50_000
+    first.checkpoint()
+
+    # while the bot is down a TP leg closes
+    leg2 = add_leg(mt5, "sig2 2of2")
+    add_deal(mt5, now - 60, "sig2 1of2", tp=True)
+
+    mt5.CALLS.clear()
+    restarted = SignalSLManager()
+    assert restarted.restore() is True
+    assert restarted.run_once() is True
+    assert mt5.ACCOUNTS[101].positions[leg2].sl == 2000.0
+    # only the deals since the checkpoint are read, not the month
+    assert restarted.scan_deals.max <= 2
+    assert mt5.CALLS["history_deals_get"] == 1
+
+
+def test_leg_memo_replaces_per_position_history_queries(master, mt5):
+    now = time.time()
+    closes = []
+    for i in range(200):
+        opened = add_deal(mt5, now - 7200 + i, f"sig{i} 1of2")
+        # the broker rewrote the close comment ("[tp 2010.0]")
+        closes.append(add_deal(mt5, now - 3600 + i, "", tp=True,
+                               position=opened))
+    deals = mt5.ACCOUNTS[101].deals
+
+    mt5.CALLS.clear()
+    for d in deals:
+        SignalSLManager._parse_multi_leg_tp_close(d)
+    before = mt5.CALLS["history_deals_get"]
+    assert before == 200                    # one position query per close
+
+    manager = SignalSLManager()
+    mt5.CALLS.clear()
+    manager.run_once()
+    assert mt5.CALLS["history_deals_get"] == 1      # the window fetch only
+    assert all((101, t) in manager._processed_tp_deals for t in closes)
+
+    # a leg opened before the watermark closes later with a bare comment
+    opened = add_deal(mt5, now - 1800, "late 1of2")
+    manager.run_once()
+    leg2 = add_leg(mt5, "late 2of2")
+    add_deal(mt5, now - 30, "", tp=True, position=opened)
+    mt5.CALLS.clear()
+    assert manager.run_once() is True
+    assert mt5.CALLS["history_deals_get"] == 1
+    assert mt5.ACCOUNTS[101].positions[leg2].sl == 2000.0
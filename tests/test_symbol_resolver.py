@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from tradebot.infrastructure._mt5_symbol_resolver import SymbolResolver, get_resolver
+from tradebot.infrastructure.db import get_symbol_map
+
+BROKER = ["XAUUSDb", "EURUSD.m", "#US30", "GBPUSD", "GBPUSDmicro", "XAGUSD"]
+
+
+def resolver(symbols=BROKER, **kw):
+    return SymbolResolver("Demo", symbols=symbols, persist=False, **kw)
+
+
+@pytest.mark.parametrize("base, expected", [
+    ("GBPUSD", "GBPUSD"),          # exact wins over decorated variant
+    ("XAUUSD", "XAUUSDb"),
+    ("EURUSD", "EURUSD.m"),
+    ("US30", "#US30"),
+    ("AGUSD", "XAGUSD"),           # substring fallback still works
+])
+def test_resolves_broker_variants(base, expected):
+    assert resolver().resolve(base) == expected
+
+
+def test_unknown_symbol_raises():
+    with pytest.raises(ValueError):
+        resolver().resolve("BTCUSD")
+
+
+def test_alias_is_tried_when_name_does_not_resolve():
+    r = resolver(aliases={"GOLD": "XAUUSD", "GBPUSD": "XAUUSD"})
+    assert r.resolve("GOLD") == "XAUUSDb"
+    assert r.resolve("GBPUSD") == "GBPUSD"
+
+
+def test_translates_other_broker_names():
+    r = SymbolResolver("Other", symbols=["XAUUSD.m", "EURUSD", "#US30"],
+                       persist=False)
+    assert r.translate("XAUUSDb") == "XAUUSD.m"
+    assert r.translate("EURUSD.pro") == "EURUSD"
+    assert r.translate("US30") == "#US30"
+
+
+def test_translate_caches_misses(mt5, monkeypatch):
+    mt5.add_symbol("EURUSD")
+    r = SymbolResolver("Demo", persist=False)
+    assert r.translate("XAUUSDb") is None
+    lookups = []
+    monkeypatch.setattr(r, "_lookup", lambda b: lookups.append(b))
+    assert r.translate("XAUUSDb") is None
+    assert lookups == []
+    monkeypatch.undo()
+
+    mt5.add_symbol("XAUUSD")                    # broker adds gold
+    r.refresh()
+    assert r.translate("XAUUSDb") == "XAUUSD"
+
+
+def test_mappings_persist_per_server(mt5, db_path):
+    mt5.add_symbol("XAUUSDb")
+    get_resolver("Demo").resolve("XAUUSD")
+    assert get_symbol_map("Demo") == {"XAUUSD": "XAUUSDb"}
+    assert get_symbol_map("Live") == {}
+
+    # A new process reuses the mapping without listing broker symbols
+    fresh = SymbolResolver("Demo")
+    assert fresh.resolve("XAUUSD") == "XAUUSDb"
+    assert mt5.CALLS["symbols_get"] == 1
+
+    fresh.forget("XAUUSD")
+    assert get_symbol_map("Demo") == {}
+
+
+def _resolve_cost(n_symbols: int, n_lookups: int = 500) -> float:
+    symbols = [f"S{i:05d}USD{'b' if i % 2 else '.m'}" for i in range(n_symbols)]
+    bases = [f"S{i:05d}USD" for i in range(0, n_symbols, n_symbols // n_lookups)]
+    best = float("inf")
+    for _ in range(3):
+        r = resolver(symbols)
+        t0 = time.perf_counter()
+        for b in bases:
+            r.resolve(b)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(bases)
+
+
+def test_resolve_cost_does_not_grow_with_symbol_list():
+    small, large = _resolve_cost(500), _resolve_cost(5_000)
+    # A linear scan would be ~10x slower on the larger list
+    assert large < small * 3
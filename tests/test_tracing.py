@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from tradebot.application.order_generator import SimpleOrderGenerator
+from tradebot.application.parser import BasicSignalParser
+from tradebot.domain.ports import NotificationPort
+from tradebot.infrastructure import tracing
+from tradebot.infrastructure.db import (
+    UserAccount, add_trace_stages, add_user, get_trace, list_traders,
+    set_master, set_trader_enabled, upsert_trader,
+)
+from tradebot.infrastructure.mt5_engine import MetaTraderEngine
+
+SIGNAL = """
+XAUUSD - BUY NOW
+Entry : 2000
+Targets :
+2005
+2010
+Stoploss : 1990
+@Zeno | Trader: Lily
+"""
+
+
+class NullNotifier(NotificationPort):
+    async def notify(self, message: str) -> None:
+        pass
+
+
+@pytest.fixture
+def setup(mt5, db_path, broker):
+    mt5.add_symbol("XAUUSDb")
+    for acct in (101, 102):
+        mt5.add_account(acct)
+        uid = add_user(UserAccount(first_name="U", last_name=str(acct),
+                                   mt5_account=acct, mt5_password="pw",
+                                   mt5_server="Demo", mt5_path="t.exe"))
+        if acct == 101:
+            set_master(uid)
+    upsert_trader("Lily")
+    set_trader_enabled(list_traders()[0].id, True)
+    return mt5
+
+
+def handle(text):
+    from tradebot.infrastructure.telegram_listener import TelegramSignalListener
+
+    listener = TelegramSignalListener(
+        BasicSignalParser(), MetaTraderEngine(), SimpleOrderGenerator(),
+        NullNotifier())
+    replies = []
+
+    async def reply_text(msg):
+        replies.append(msg)
+
+    upd = SimpleNamespace(effective_message=SimpleNamespace(
+        text=text, reply_text=reply_text))
+    asyncio.run(listener._handle(upd, None))
+    listener.async_engine.close()
+    return replies
+
+
+def test_signal_trace_covers_every_stage(setup):
+    replies = handle(SIGNAL)
+    assert len(replies) == 1
+    summary = replies[0].splitlines()[-1]
+    assert summary.startswith("⏱ ")
+    cid = summary.split()[1]
+
+    stages = {stage for stage, _, _ in get_trace(cid)}
+    assert stages == {"parse", "trader_check", "orders", "login", "resolve",
+                      "sizing", "send", "total"}
+    sends = [acct for stage, acct, _ in get_trace(cid) if stage == "send"]
+    assert sends == [101, 101]
+
+    pct = tracing.stage_percentiles()
+    assert pct["send"]["count"] == 2
+    assert pct["total"]["p50"] >= pct["send"]["p99"]
+
+
+def test_results_carry_correlation_id(setup):
+    from tradebot.domain.models import Order
+
+    order = Order(symbol="XAUUSD", side="buy", order_type="market",
+                  risk=0.01, price=None, sl=1990.0, tp=2010.0, comment="c",
+                  correlation_id="abc")
+    [res] = MetaTraderEngine().execute_order(order)
+    assert res.correlation_id == "abc"
+
+
+def test_replication_joins_the_signal_trace(setup):
+    from tradebot.infrastructure.copy_syncer import (
+        CopyTradeSyncer, _Action, _PosSnap)
+    from tradebot.infrastructure.db import get_master_user, get_follower_users
+
+    tracing.link_ticket(5555, "cid-1")
+    snap = _PosSnap(5555, "XAUUSDb", 0, 0.1, 1990.0, 2010.0, 2000.0, "c")
+    CopyTradeSyncer()._apply_batch(
+        get_master_user(), get_follower_users()[0],
+        [_Action("open", 5555, snap)])
+
+    [(stage, account, ms)] = get_trace("cid-1")
+    assert (stage, account) == ("replicate", 102) and ms > 0
+
+
+def test_trace_table_is_rolling(db_path):
+    rows = [(f"c{i}", "send", None, float(i)) for i in range(10)]
+    add_trace_stages(rows, keep=3)
+    assert [get_trace(f"c{i}") != [] for i in range(10)] == [False] * 7 + [True] * 3
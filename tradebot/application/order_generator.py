@@ -39,6 +39,7 @@ class BaseOrderGenerator(OrderPort):
                     sl           = signal.stop_loss,
                     tp           = tgt.price,
                     comment      = tgt_comment,
+                    correlation_id = signal.correlation_id,
                 )
             )
         return orders
@@ -67,6 +68,7 @@ class SimpleOrderGenerator(OrderPort):
                     sl         = signal.stop_loss,
                     tp         = tgt.price,
                     comment    = comment,
+                    correlation_id = signal.correlation_id,
                 )
             )
         return orders
@@ -114,6 +116,7 @@ class PropOrderManager(OrderPort):
                     sl         = signal.stop_loss,
                     tp         = tgt.price,
                     comment    = comment,
+                    correlation_id = signal.correlation_id,
                 )
             )
         return orders
\ No newline at end of file
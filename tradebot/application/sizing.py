@@ -0,0 +1,107 @@
+# tradebot/application/sizing.py
+
+"""
+Vectorized lot sizing: every account x every leg of a signal in one pass.
+
+Inputs are the per-leg risks from ``RiskManagerPort.per_target_risks``, each
+leg's stop distance in price units and each account's balance and risk mode;
+the result is an ``(accounts, legs)`` volume matrix.  The maths mirrors the
+scalar ``MetaTraderEngine._calc_volume`` / ``_clamp_volume``:
+
+* ``risk_pct``  - volume = balance * risk / (money_per_point * stop_points),
+  rounded to ``volume_step`` and raised to ``volume_min`` (not capped at
+  ``volume_max``; the broker rejects oversize legs as before)
+* ``fixed_lot`` - the user's lot, rounded to step and clamped to min/max
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SymbolSpec:
+    """The static ``symbol_info`` fields sizing depends on."""
+    volume_step: float
+    volume_min: float
+    volume_max: float
+    trade_tick_value: float
+    trade_tick_size: float
+    point: float
+
+    @classmethod
+    def from_info(cls, info) -> "SymbolSpec":
+        return cls(float(info.volume_step), float(info.volume_min),
+                   float(info.volume_max), float(info.trade_tick_value),
+                   float(info.trade_tick_size), float(info.point))
+
+    @property
+    def money_per_point(self) -> float:
+        return self.trade_tick_value / self.trade_tick_size * self.point
+
+
+@dataclass(frozen=True)
+class AccountSizing:
+    """Per-account inputs: balance plus the user's risk settings."""
+    balance: float
+    risk_mode: str = "risk_pct"       # "risk_pct" or "fixed_lot"
+    risk_per_trade: float = 0.01
+    fixed_lot: float = 0.01
+
+    @classmethod
+    def from_user(cls, user, balance: float) -> "AccountSizing":
+        return cls(float(balance or 0), user.risk_mode,
+                   float(user.risk_per_trade), float(user.fixed_lot))
+
+
+def clamp_volumes(raw, spec: SymbolSpec) -> np.ndarray:
+    """Round lots to ``volume_step`` and clamp them to ``[min, max]``."""
+    raw = np.asarray(raw, dtype=float)
+    vol = np.round(raw / spec.volume_step) * spec.volume_step
+    vol = np.clip(vol, spec.volume_min, spec.volume_max)
+    return np.round(vol, 8)
+
+
+def volume_matrix(accounts: Sequence[AccountSizing],
+                  leg_risks: Sequence[float],
+                  stop_distances: Sequence[float],
+                  spec: SymbolSpec,
+                  global_risk: float) -> np.ndarray:
+    """
+    Return the ``(len(accounts), len(leg_risks))`` volume matrix.
+
+    ``stop_distances`` is ``|entry - sl|`` in price units per leg (0 for a leg
+    without SL, which sizes to 0 under ``risk_pct``).  Each ``risk_pct``
+    account scales the leg risks by ``risk_per_trade / global_risk``.
+    """
+    n_acc, n_leg = len(accounts), len(leg_risks)
+    out = np.zeros((n_acc, n_leg))
+    if n_acc == 0 or n_leg == 0:
+        return out
+
+    risks = np.asarray(leg_risks, dtype=float)
+    stop_points = np.asarray(stop_distances, dtype=float) / spec.point
+    balance = np.array([a.balance for a in accounts])
+    fixed = np.array([a.risk_mode == "fixed_lot" for a in accounts])
+
+    if global_risk > 0:
+        scale = np.array([a.risk_per_trade for a in accounts]) / global_risk
+        leg_risk = np.round(risks[None, :] * scale[:, None], 6)
+    else:
+        leg_risk = np.broadcast_to(risks, (n_acc, n_leg))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = (balance[:, None] * leg_risk
+               / (spec.money_per_point * stop_points[None, :]))
+    vol = np.round(raw / spec.volume_step) * spec.volume_step
+    vol = np.round(np.maximum(vol, spec.volume_min), 2)
+    sized = (balance[:, None] != 0) & (stop_points[None, :] != 0)
+    out = np.where(sized, vol, 0.0)
+
+    if fixed.any():
+        lots = clamp_volumes([a.fixed_lot for a in accounts], spec)
+        out[fixed] = lots[fixed, None]
+    return out
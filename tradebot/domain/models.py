@@ -18,6 +18,7 @@ class Order:
     sl: float | None      # stop loss price or None
     tp: float | None      # take profit price or None
     comment: str          # free-text comment extracted from signal
+    correlation_id: str = ""   # trace ID of the originating signal
 
 @dataclass(frozen=True)
 class Signal:
@@ -30,6 +31,7 @@ class Signal:
     stop_loss: float | None
     comment: str            # free-text comment from signal
     raw_source: str         # original message
+    correlation_id: str = ""   # assigned when the message is received
 
 @dataclass(frozen=True)
 class OrderResult:
@@ -37,3 +39,4 @@ class OrderResult:
     success: bool
     message: str
     data: dict | None = None
+    correlation_id: str = ""
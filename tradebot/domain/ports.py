@@ -1,6 +1,7 @@
 # domain\ports.py
 
 from abc import ABC, abstractmethod
+from typing import Hashable, Sequence
 from .models import Signal, Order, OrderResult
 
 class SignalParserPort(ABC):
@@ -19,7 +20,18 @@ class RiskManagerPort(ABC):
 
 class TradingEnginePort(ABC):
     @abstractmethod
-    def execute_order(self, order: Order) -> OrderResult: ...
+    def execute_order(self, order: Order) -> list[OrderResult]: ...
+
+    def execute_orders(self, orders: Sequence[Order]) -> list[list[OrderResult]]:
+        """Execute all legs of one signal; results follow input order."""
+        return [self.execute_order(o) for o in orders]
+
+class AsyncTradingEnginePort(ABC):
+    """Awaitable engine so order execution never blocks the event loop."""
+    @abstractmethod
+    async def execute_orders(self, orders: Sequence[Order],
+                             lane: Hashable | None = None
+                             ) -> list[list[OrderResult]]: ...
 
 class NotificationPort(ABC):
     """Port for sending notifications (e.g. on shutdown or errors)."""
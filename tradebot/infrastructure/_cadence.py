@@ -0,0 +1,120 @@
+# tradebot/infrastructure/_cadence.py
+
+"""
+Adaptive polling cadence for the background loops.
+
+A loop polls every ``min_sec`` right after activity (a signal, a fill, a
+detected change) and doubles its interval on every quiet tick up to
+``max_sec``.  :meth:`AdaptiveCadence.poke` also wakes a loop that is in the
+middle of a long idle sleep.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+from ._metrics import RollingStats
+
+
+class AdaptiveCadence:
+    """
+    Exponential back-off poll interval:
+
+        cadence = AdaptiveCadence(min_sec=0.5, max_sec=30)
+        run_adaptive(poll_once, cadence, stop, on_error=logger.error)
+        ...
+        cadence.poke()      # e.g. a signal was just executed
+
+    ``stats()`` reports tick counts, the interval distribution and how
+    quickly a poke was answered (``wake_latency``).
+    """
+
+    def __init__(self, min_sec: float, max_sec: float, factor: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if min_sec <= 0 or max_sec < min_sec:
+            raise ValueError(f"bad cadence bounds {min_sec}..{max_sec}")
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self.factor = factor
+        self._clock = clock
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.interval = min_sec
+        self._poked_at: float | None = None
+
+        self.ticks = 0
+        self.active_ticks = 0
+        self.pokes = 0
+        self.intervals = RollingStats()
+        self.tick_sec = RollingStats()
+        self.wake_latency = RollingStats()
+
+    # ------------------------------------------------------------------
+    def poke(self) -> None:
+        """Activity outside the loop: poll again as soon as possible."""
+        with self._lock:
+            self.pokes += 1
+            self.interval = self.min_sec
+            if self._poked_at is None:
+                self._poked_at = self._clock()
+        self._wake.set()
+
+    def tick_started(self) -> None:
+        with self._lock:
+            poked_at, self._poked_at = self._poked_at, None
+        if poked_at is not None:
+            self.wake_latency.add(self._clock() - poked_at)
+
+    def tick_done(self, duration: float, active: bool) -> float:
+        """Record one poll; return the interval until the next one."""
+        with self._lock:
+            self.ticks += 1
+            if active:
+                self.active_ticks += 1
+                self.interval = self.min_sec
+            elif self._poked_at is None:
+                self.interval = min(self.interval * self.factor, self.max_sec)
+            interval = self.interval
+        self.tick_sec.add(duration)
+        self.intervals.add(interval)
+        return interval
+
+    def wait(self, stop: threading.Event) -> bool:
+        """Sleep for the current interval or until woken; True if stopping."""
+        self._wake.wait(self.interval)
+        self._wake.clear()
+        return stop.is_set()
+
+    def wake(self) -> None:
+        """Interrupt :meth:`wait` without counting activity (e.g. on stop)."""
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "active_ticks": self.active_ticks,
+            "pokes": self.pokes,
+            "interval": self.interval,
+            "intervals": self.intervals.summary(),
+            "tick_sec": self.tick_sec.summary(),
+            "wake_latency": self.wake_latency.summary(),
+        }
+
+
+def run_adaptive(step: Callable[[], bool],
+                 cadence: AdaptiveCadence, stop: threading.Event,
+                 on_error: Callable[[Exception], None]) -> None:
+    """Drive ``step`` (returns True on activity) until ``stop`` is set."""
+    while not stop.is_set():
+        cadence.tick_started()
+        t0 = time.monotonic()
+        try:
+            active = bool(step())
+        except Exception as exc:
+            on_error(exc)
+            active = False
+        cadence.tick_done(time.monotonic() - t0, active)
+        if cadence.wait(stop):
+            break
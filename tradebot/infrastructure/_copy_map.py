@@ -0,0 +1,219 @@
+# tradebot/infrastructure/_copy_map.py
+
+"""
+In-memory master <-> follower ticket index backed by the ``copy_map`` table.
+
+Lookups never touch SQLite.  Mutations are applied to memory immediately and
+queued; a background flusher writes them in one transaction every
+``copy_map_flush_sec``.  A crash therefore loses at most one flush window,
+which :meth:`CopyTradeSyncer.reconcile` repairs from the follower positions'
+``copy-<master ticket>`` comments at start-up.
+
+The same class backs the pending-order map (``table="pending_map"``).
+Follower ticket ``0`` is a tombstone: the follower closed its copy by hand,
+so the master ticket is not copied to that account again.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+from loguru import logger
+
+from .db import apply_copy_map_changes, list_copy_map
+
+
+class CopyMap:
+    """
+    Two-way ticket index:
+
+        cmap = CopyMap(db_path, flush_sec=1.0)
+        cmap.put(master_ticket, follower_account, follower_ticket)
+        cmap.followers(master_ticket)        # [(account, ticket), ...]
+        cmap.master_of(account, ticket)      # master ticket or None
+    """
+
+    def __init__(self, db_path=None, flush_sec: float = 1.0,
+                 table: str = "copy_map"):
+        self.db_path = db_path
+        self.flush_sec = flush_sec
+        self.table = table
+        self._lock = threading.RLock()
+        self._loaded = False
+        # master ticket -> {follower account: (follower ticket, symbol)}
+        self._by_master: dict[int, dict[int, tuple[int, str]]] = {}
+        # (follower account, follower ticket) -> master ticket
+        self._by_follower: dict[tuple[int, int], int] = {}
+        # follower account -> {master ticket: follower ticket}, tombstones too
+        self._by_account: dict[int, dict[int, int]] = {}
+        # (master, account) -> (ticket, symbol) to upsert, or None to delete
+        self._pending: dict[tuple[int, int], tuple[int, str] | None] = {}
+        self._stop = threading.Event()
+        self._worker: threading.Thread | None = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def followers(self, master_ticket: int) -> list[tuple[int, int]]:
+        """(follower_account, follower_ticket) pairs for a master ticket."""
+        with self._lock:
+            self._ensure_loaded()
+            rows = self._by_master.get(int(master_ticket), {})
+            return [(acct, t) for acct, (t, _) in rows.items() if t]
+
+    def entry(self, master_ticket: int,
+              follower_account: int) -> tuple[int, str] | None:
+        """(follower_ticket, symbol) or None."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_master.get(int(master_ticket), {}).get(
+                int(follower_account))
+
+    def follower_ticket(self, master_ticket: int,
+                        follower_account: int) -> int | None:
+        row = self.entry(master_ticket, follower_account)
+        return row[0] if row else None
+
+    def master_of(self, follower_account: int,
+                  follower_ticket: int) -> int | None:
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_follower.get(
+                (int(follower_account), int(follower_ticket)))
+
+    def for_account(self, follower_account: int) -> dict[int, int]:
+        """master ticket -> follower ticket (0 = tombstone) for one account."""
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._by_account.get(int(follower_account), {}))
+
+    def masters(self) -> list[int]:
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_master)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._by_follower)
+
+    # ------------------------------------------------------------------
+    # Writes (memory now, SQLite on the next flush)
+    # ------------------------------------------------------------------
+
+    def put(self, master_ticket: int, follower_account: int,
+            follower_ticket: int, symbol: str = "") -> None:
+        m, a, t = int(master_ticket), int(follower_account), int(follower_ticket)
+        with self._lock:
+            self._ensure_loaded()
+            old = self._by_master.setdefault(m, {}).get(a)
+            if old is not None:
+                self._by_follower.pop((a, old[0]), None)
+            self._by_master[m][a] = (t, symbol)
+            self._by_account.setdefault(a, {})[m] = t
+            if t:
+                self._by_follower[(a, t)] = m
+            self._pending[(m, a)] = (t, symbol)
+
+    def remove(self, master_ticket: int, follower_account: int) -> None:
+        m, a = int(master_ticket), int(follower_account)
+        with self._lock:
+            self._ensure_loaded()
+            rows = self._by_master.get(m)
+            old = rows.pop(a, None) if rows is not None else None
+            if rows is not None and not rows:
+                del self._by_master[m]
+            if old is not None:
+                self._by_follower.pop((a, old[0]), None)
+                own = self._by_account.get(a)
+                if own is not None:
+                    own.pop(m, None)
+                    if not own:
+                        del self._by_account[a]
+            self._pending[(m, a)] = None
+
+    def remove_master(self, master_ticket: int, keep=()) -> None:
+        """Drop the master ticket's rows, except for ``keep`` accounts."""
+        with self._lock:
+            self._ensure_loaded()
+            for acct in list(self._by_master.get(int(master_ticket), {})):
+                if acct not in keep:
+                    self.remove(master_ticket, acct)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def load(self) -> None:
+        """(Re)load the index from ``copy_map``; drops unflushed changes."""
+        rows = list_copy_map(self.db_path, self.table)
+        with self._lock:
+            self._by_master.clear()
+            self._by_follower.clear()
+            self._by_account.clear()
+            self._pending.clear()
+            for m, a, t, sym in rows:
+                self._by_master.setdefault(m, {})[a] = (t, sym)
+                self._by_account.setdefault(a, {})[m] = t
+                if t:
+                    self._by_follower[(a, t)] = m
+            self._loaded = True
+
+    def flush(self) -> int:
+        """Write queued changes in one transaction; return rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        upserts = [(m, a, v[0], v[1]) for (m, a), v in pending.items()
+                   if v is not None]
+        deletes = [k for k, v in pending.items() if v is None]
+        try:
+            apply_copy_map_changes(upserts, deletes, self.db_path, self.table)
+        except sqlite3.Error as e:
+            logger.error(f"{self.table} flush failed, will retry: {e}")
+            with self._lock:
+                for k, v in pending.items():
+                    self._pending.setdefault(k, v)
+            return 0
+        self.flushes += 1
+        self.rows_written += len(pending)
+        return len(pending)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self) -> None:
+        if self._worker and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._flush_loop, name=f"{self.table}-flush", daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._worker and self._worker.is_alive():
+            self._worker.join(timeout=max(self.flush_sec, 2))
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mappings": len(self._by_follower),
+                    "pending": len(self._pending),
+                    "flushes": self.flushes,
+                    "rows_written": self.rows_written}
+
+    # ------------------------------------------------------------------
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
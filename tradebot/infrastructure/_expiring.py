@@ -0,0 +1,119 @@
+# tradebot/infrastructure/_expiring.py
+
+"""
+Bounded dedupe memory for the background loops.
+
+Long-running loops remember keys they already handled (TP deals, first
+sightings of pending orders).  :class:`ExpiringDict` stamps each key with a
+time and drops it once the stamp falls out of the loop's window, or once the
+size cap is reached, so the state stays flat over weeks of uptime.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Hashable, Iterator
+
+
+class ExpiringDict:
+    """
+    Dict whose entries expire by stamp, with a hard size cap:
+
+        seen = ExpiringDict(max_size=100_000)
+        seen.put((acct, ticket), True, stamp=deal_time)
+        seen.evict_before(window_start)
+        (acct, ticket) in seen
+
+    Entries are grouped in ``resolution``-second buckets by stamp, so
+    eviction only looks at bucket ids and stamps need not arrive in order.
+    A bucket goes once all of it is older than the cut-off; over
+    ``max_size`` the oldest buckets go regardless of age.
+    """
+
+    def __init__(self, max_size: int = 100_000, resolution: float = 3600.0):
+        if max_size <= 0 or resolution <= 0:
+            raise ValueError(f"bad bounds max_size={max_size} "
+                             f"resolution={resolution}")
+        self.max_size = max_size
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._data: dict[Hashable, tuple[Any, int]] = {}   # key -> (value, bucket)
+        self._buckets: dict[int, set[Hashable]] = {}
+        self.evicted_age = 0
+        self.evicted_size = 0
+
+    # ------------------------------------------------------------------
+    def put(self, key: Hashable, value: Any = True, *, stamp: float) -> None:
+        bucket = int(stamp // self.resolution)
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None and old[1] != bucket:
+                self._discard(key, old[1])
+            self._data[key] = (value, bucket)
+            self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._data) > self.max_size:
+                self.evicted_size += self._drop(min(self._buckets),
+                                                len(self._data) - self.max_size)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+        return default if entry is None else entry[0]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._discard(key, entry[1], popped=True)
+        return entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def items(self) -> Iterator[tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs."""
+        with self._lock:
+            rows = [(k, v) for k, (v, _) in self._data.items()]
+        return iter(rows)
+
+    def evict_before(self, stamp: float) -> int:
+        """Drop every bucket that ends before ``stamp``; return the count."""
+        cutoff = int(stamp // self.resolution)
+        dropped = 0
+        with self._lock:
+            for bucket in [b for b in self._buckets if b < cutoff]:
+                dropped += self._drop(bucket)
+            self.evicted_age += dropped
+        return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "buckets": len(self._buckets),
+                    "evicted_age": self.evicted_age,
+                    "evicted_size": self.evicted_size}
+
+    # ------------------------------------------------------------------
+    def _discard(self, key: Hashable, bucket: int,
+                 popped: bool = False) -> None:
+        keys = self._buckets.get(bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._buckets[bucket]
+        if not popped:
+            self._data.pop(key, None)
+
+    def _drop(self, bucket: int, limit: int | None = None) -> int:
+        keys = self._buckets[bucket]
+        n = len(keys) if limit is None else min(limit, len(keys))
+        for _ in range(n):
+            del self._data[keys.pop()]
+        if not keys:
+            del self._buckets[bucket]
+        return n
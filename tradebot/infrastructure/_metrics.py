@@ -0,0 +1,64 @@
+# tradebot/infrastructure/_metrics.py
+
+"""
+Small in-process metrics helpers (no external deps).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+
+
+class RollingStats:
+    """
+    Rolling window of numeric samples with percentile summaries.
+
+        waits = RollingStats(maxlen=512)
+        waits.add(0.003)
+        waits.summary()   # {"count": 1, "mean": 0.003, "p50": 0.003, ...}
+
+    ``count``/``max`` cover every sample ever added; percentiles and the mean
+    cover the last ``maxlen`` samples only.
+    """
+
+    def __init__(self, maxlen: int = 1024):
+        self._samples: deque[float] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(float(value))
+            self.count += 1
+            if value > self.max:
+                self.max = float(value)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (``q`` in 0..100) of the window."""
+        with self._lock:
+            data = sorted(self._samples)
+        return _nearest_rank(data, q)
+
+    def summary(self) -> dict:
+        with self._lock:
+            data = sorted(self._samples)
+            count, mx = self.count, self.max
+        mean = sum(data) / len(data) if data else 0.0
+        return {
+            "count": count,
+            "mean": mean,
+            "p50": _nearest_rank(data, 50),
+            "p95": _nearest_rank(data, 95),
+            "p99": _nearest_rank(data, 99),
+            "max": mx,
+        }
+
+
+def _nearest_rank(data: list[float], q: float) -> float:
+    if not data:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(data)))
+    return data[min(rank, len(data)) - 1]
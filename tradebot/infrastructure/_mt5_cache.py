@@ -0,0 +1,265 @@
+# tradebot\infrastructure\_mt5_cache.py
+
+"""
+Process-wide caches of MT5 symbol metadata and ticks.
+
+``symbol_info`` fields used for lot sizing and SL clamping (volume step/min/
+max, tick value/size, point, digits, stops level) are effectively static, so
+they are fetched once per (server, symbol) and reused by every account on the
+same server until the TTL expires or the entry is invalidated.
+
+Ticks are cached the same way but only for ``tick_max_age_ms``; concurrent
+misses on one key share a single ``symbol_info_tick`` call.
+
+Lookups must run on the terminal owner (inside a broker job): a miss calls
+the terminal for the account that is logged in right now.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+import MetaTrader5 as mt5
+from loguru import logger
+
+from config import settings
+from . import _mt5_utils
+
+
+class SymbolInfoCache:
+    """
+    TTL cache of ``mt5.symbol_info`` results keyed by (server, symbol):
+
+        cache = SymbolInfoCache(ttl_sec=3600)
+        info = cache.get("XAUUSDb")          # terminal call on first use only
+        cache.invalidate(symbol="XAUUSDb")   # e.g. after a contract change
+
+    ``server`` defaults to the broker's logged-in server.  Missing symbols are
+    not cached.
+    """
+
+    def __init__(self, ttl_sec: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_sec = ttl_sec
+        self._clock = clock
+        self._entries: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    def get(self, symbol: str, server: str | None = None):
+        key = (_current_server(server), symbol)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_sec:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        info = mt5.symbol_info(symbol)
+        if info is not None:
+            with self._lock:
+                self._entries[key] = (now, info)
+        return info
+
+    def warm(self, symbols: Iterable[str], server: str | None = None) -> int:
+        """Prefetch ``symbols`` for ``server``; returns how many were loaded."""
+        server = _current_server(server)
+        loaded = 0
+        for symbol in set(symbols):
+            with self._lock:
+                if (server, symbol) in self._entries:
+                    continue
+            info = mt5.symbol_info(symbol)
+            if info is None:
+                continue
+            with self._lock:
+                self._entries[(server, symbol)] = (self._clock(), info)
+            loaded += 1
+        return loaded
+
+    def invalidate(self, server: str | None = None,
+                   symbol: str | None = None) -> None:
+        """Drop entries matching ``server`` and/or ``symbol`` (all if neither)."""
+        with self._lock:
+            for key in list(self._entries):
+                if ((server is None or key[0] == server)
+                        and (symbol is None or key[1] == symbol)):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries)}
+
+
+class TickCache:
+    """
+    Short-lived cache of ``mt5.symbol_info_tick`` keyed by (server, symbol):
+
+        ticks = TickCache(max_age_sec=0.25)
+        tick, age = ticks.get_with_age("XAUUSDb")   # age in seconds
+
+    A tick older than ``max_age_sec`` (or the per-call ``max_age``) is
+    refreshed; callers that miss while a refresh is in flight wait for it
+    instead of issuing their own terminal call.
+    """
+
+    def __init__(self, max_age_sec: float = 0.25,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_age_sec = max_age_sec
+        self._clock = clock
+        self._entries: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    # ------------------------------------------------------------------
+    def get(self, symbol: str, server: str | None = None,
+            max_age: float | None = None):
+        return self.get_with_age(symbol, server, max_age)[0]
+
+    def get_with_age(self, symbol: str, server: str | None = None,
+                     max_age: float | None = None) -> tuple[Any, float]:
+        """Return ``(tick, seconds since it was read from the terminal)``."""
+        key = (_current_server(server), symbol)
+        limit = self.max_age_sec if max_age is None else max_age
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < limit:
+                self.hits += 1
+                return entry[1], now - entry[0]
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                self.misses += 1
+                owner = True
+            else:
+                self.shared += 1
+                owner = False
+
+        if not owner:
+            tick, fetched = pending.result()
+            return tick, max(0.0, self._clock() - fetched)
+
+        try:
+            tick = mt5.symbol_info_tick(symbol)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            pending.set_exception(exc)
+            raise
+        fetched = self._clock()
+        with self._lock:
+            if tick is not None:
+                self._entries[key] = (fetched, tick)
+            del self._inflight[key]
+        pending.set_result((tick, fetched))
+        return tick, 0.0
+
+    def invalidate(self, server: str | None = None,
+                   symbol: str | None = None) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                if ((server is None or key[0] == server)
+                        and (symbol is None or key[1] == symbol)):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.shared = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "shared": self.shared, "size": len(self._entries)}
+
+
+def _current_server(server: str | None) -> str:
+    """``server`` or, if None, the server the broker is logged into."""
+    if server is not None:
+        return server
+    broker = _mt5_utils._broker
+    return (broker.current_server if broker else None) or ""
+
+
+_cache: SymbolInfoCache | None = None
+_ticks: TickCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_symbol_cache() -> SymbolInfoCache:
+    """Return the process-wide symbol metadata cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SymbolInfoCache(ttl_sec=settings.symbol_cache_ttl_sec)
+    return _cache
+
+
+def get_tick_cache() -> TickCache:
+    """Return the process-wide tick cache."""
+    global _ticks
+    if _ticks is None:
+        with _cache_lock:
+            if _ticks is None:
+                _ticks = TickCache(
+                    max_age_sec=settings.tick_max_age_ms / 1000.0)
+    return _ticks
+
+
+def symbol_info(symbol: str):
+    """Cached ``mt5.symbol_info`` for the logged-in account's server."""
+    return get_symbol_cache().get(symbol)
+
+
+def symbol_tick(symbol: str):
+    """Cached ``mt5.symbol_info_tick`` no older than ``tick_max_age_ms``."""
+    return get_tick_cache().get(symbol)
+
+
+def server_now_epoch() -> float | None:
+    """Best-effort current broker/server Unix seconds from the tick stream."""
+    tick = symbol_tick("XAUUSD")
+    if tick:
+        t = getattr(tick, "time", None)
+        if isinstance(t, (int, float)) and float(t) > 0:
+            return float(t)
+        tm = getattr(tick, "time_msc", None)
+        if isinstance(tm, (int, float)) and float(tm) > 0:
+            return float(tm) / 1000.0
+    return None
+
+
+def log_cache_stats() -> None:
+    """Log this process's cache hit/miss counters (on shutdown)."""
+    logger.info(f"MT5 caches — symbol_info {get_symbol_cache().stats()}, "
+                f"ticks {get_tick_cache().stats()}")
+
+
+def warm_recent_symbols(days: int) -> int:
+    """Broker job: prefetch symbols traded on this account in the last ``days``."""
+    now = datetime.now()
+    deals = mt5.history_deals_get(now - timedelta(days=days),
+                                  now + timedelta(days=1)) or ()
+    symbols = {d.symbol for d in deals if getattr(d, "symbol", "")}
+    loaded = get_symbol_cache().warm(symbols)
+    if loaded:
+        logger.info(f"Symbol cache warmed with {loaded} symbol(s)")
+    return loaded
@@ -0,0 +1,230 @@
+# tradebot\infrastructure\_mt5_pool.py
+
+"""
+Process pool with one MetaTrader5 terminal per worker process.
+
+The ``MetaTrader5`` package binds a process to a single terminal, so accounts
+with different ``mt5_path`` values can only run side by side in separate
+processes.  :class:`TerminalPool` keeps one worker per terminal path; each
+worker initializes its terminal once, stays logged in between jobs and runs
+the same account-tagged callables as :class:`MT5Broker`.  Work for different
+terminals therefore fans out in parallel.
+
+Jobs cross the process boundary by pickling, so ``fn`` must be a module-level
+function, a static/class method or a bound method of a picklable object, and
+its return value must be picklable too.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Sequence
+
+from loguru import logger
+
+from ._mt5_utils import MT5Broker, Priority, _Job
+from ._mt5_worker import _worker_main
+
+# Pool key of the worker owning the default terminal (no ``mt5_path``)
+_DEFAULT_TERMINAL = "default"
+
+
+class _TerminalWorker(MT5Broker):
+    """Parent-side priority queue feeding one terminal worker process."""
+
+    def __init__(self, path: str | None, pool: "TerminalPool"):
+        super().__init__(max_defer_sec=pool.max_defer_sec)
+        self.path = path
+        self._pool = pool
+        self._proc: mp.process.BaseProcess | None = None
+        self._conn = None
+        self.spawns = 0
+        self.timeouts = 0
+
+    @property
+    def pid(self) -> int | None:
+        return self._proc.pid if self._proc else None
+
+    def _spawn(self) -> None:
+        ctx = self._pool._ctx
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(
+            target=_worker_main,
+            args=(self.path, child_conn, self._pool.mt5_module,
+                  self._pool.initializer, self._pool.initargs),
+            name=f"mt5-worker:{os.path.basename(self.path or _DEFAULT_TERMINAL)}",
+            daemon=True)
+        proc.start()
+        child_conn.close()
+        self._proc, self._conn = proc, parent_conn
+        self.spawns += 1
+
+        # Terminal start-up is not charged to the first job's timeout
+        if not parent_conn.poll(self._pool.start_timeout):
+            self._kill()
+            raise TimeoutError(f"MT5 worker for {self.path} failed to start")
+        try:
+            ok, payload = parent_conn.recv()
+        except (EOFError, OSError) as exc:
+            self._kill()
+            raise RuntimeError(f"MT5 worker for {self.path} died: {exc}")
+        if not ok:
+            self._kill()
+            raise payload
+        logger.info(f"MT5 worker started for {self.path} (pid {proc.pid})")
+
+    def _kill(self) -> None:
+        proc, conn = self._proc, self._conn
+        self._proc = self._conn = None
+        if conn is not None:
+            conn.close()
+        if proc is not None and proc.is_alive():
+            proc.kill()
+            proc.join(5)
+
+    def _execute(self, job: _Job):
+        if self._proc is None or not self._proc.is_alive():
+            self._kill()
+            self._spawn()
+
+        timeout = job.timeout or self._pool.call_timeout
+        try:
+            self._conn.send((job.user, job.fn, job.args, job.kwargs))
+            ready = self._conn.poll(timeout)
+        except (EOFError, OSError) as exc:
+            self._kill()
+            raise RuntimeError(f"MT5 worker for {self.path} died: {exc}")
+        if not ready:
+            self.timeouts += 1
+            logger.error(
+                f"MT5 worker for {self.path} (pid {self.pid}) did not answer "
+                f"within {timeout}s — killing it")
+            self._kill()
+            try:
+                self._spawn()
+            except Exception as exc:
+                logger.error(f"MT5 worker respawn failed for {self.path}: {exc}")
+            raise TimeoutError(
+                f"MT5 call {getattr(job.fn, '__qualname__', job.fn)} timed "
+                f"out after {timeout}s on {self.path}")
+
+        try:
+            ok, payload = self._conn.recv()
+        except (EOFError, OSError) as exc:
+            self._kill()
+            raise RuntimeError(f"MT5 worker for {self.path} died: {exc}")
+        if ok:
+            return payload
+        raise payload
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out.update(pid=self.pid, spawns=self.spawns, timeouts=self.timeouts)
+        return out
+
+    def stop(self, timeout: float = 5.0) -> None:
+        super().stop(timeout)
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (EOFError, OSError):
+                pass
+        if self._proc is not None:
+            self._proc.join(timeout)
+        self._kill()
+
+
+class TerminalPool:
+    """
+    Drop-in replacement for :class:`MT5Broker` that routes each job to the
+    worker process owning ``user.mt5_path``:
+
+        pool = TerminalPool(call_timeout=30)
+        info = pool.call(user, mt5.account_info, priority=Priority.ORDER)
+
+    A worker that does not answer within the per-call timeout is killed and
+    respawned; the job fails with :class:`TimeoutError`.
+    """
+
+    def __init__(self, mt5_module: str = "MetaTrader5",
+                 call_timeout: float = 30.0,
+                 max_defer_sec: float = 30.0,
+                 start_timeout: float = 60.0,
+                 initializer: Callable | None = None,
+                 initargs: Sequence = (),
+                 start_method: str = "spawn"):
+        self.mt5_module = mt5_module
+        self.call_timeout = call_timeout
+        self.max_defer_sec = max_defer_sec
+        self.start_timeout = start_timeout
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self._ctx = mp.get_context(start_method)
+        self._workers: dict[str, _TerminalWorker] = {}
+        self._lock = threading.Lock()
+        # Open order bursts, replayed onto workers spawned while they last
+        self._bursts = 0
+        self._burst_since = 0.0
+
+    # ------------------------------------------------------------------
+    def submit(self, user, fn: Callable, *args,
+               priority: Priority = Priority.HOUSEKEEPING,
+               timeout: float | None = None, **kwargs) -> Future:
+        job = _Job(user, fn, args, kwargs, Priority(priority), timeout)
+        return self._worker_for(user)._enqueue(job)
+
+    def call(self, user, fn: Callable, *args,
+             priority: Priority = Priority.HOUSEKEEPING,
+             timeout: float | None = None, **kwargs) -> Any:
+        """Run ``fn`` on ``user``'s terminal; ``timeout`` bounds the IPC wait."""
+        return self.submit(user, fn, *args, priority=priority,
+                           timeout=timeout, **kwargs).result()
+
+    @contextmanager
+    def order_burst(self):
+        with self._lock:
+            if self._bursts == 0:
+                self._burst_since = time.monotonic()
+            self._bursts += 1
+            for w in self._workers.values():
+                w._enter_burst(self._burst_since)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._bursts -= 1
+                for w in self._workers.values():
+                    w._leave_burst()
+
+    def invalidate(self) -> None:
+        for w in list(self._workers.values()):
+            w.invalidate()
+
+    def stats(self) -> dict:
+        return {path: w.stats() for path, w in list(self._workers.items())}
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            workers, self._workers = list(self._workers.values()), {}
+        for w in workers:
+            w.stop(timeout)
+
+    # ------------------------------------------------------------------
+    def _worker_for(self, user) -> _TerminalWorker:
+        """Worker owning ``user``'s terminal; no user or no path means the
+        default terminal."""
+        path = getattr(user, "mt5_path", None) or None
+        key = (os.path.normcase(os.path.abspath(path)) if path
+               else _DEFAULT_TERMINAL)
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = self._workers[key] = _TerminalWorker(path, self)
+                if self._bursts:
+                    worker._enter_burst(self._burst_since, self._bursts)
+            return worker
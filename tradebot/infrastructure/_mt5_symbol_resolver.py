@@ -2,50 +2,185 @@
 
 """
 Resolve broker-specific symbol names (prefix/suffix) and cache them.
+
+One resolver exists per broker server for the life of the process (see
+:func:`get_resolver`); resolved names are persisted in the ``symbol_map``
+table so a restart does not need the broker symbol list at all.
 """
 
+from __future__ import annotations
+
 import re
-from typing import Dict
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+
 import MetaTrader5 as mt5
 from loguru import logger
-from ._mt5_utils import ensure_mt5
+
+from config import settings
+from .db import delete_symbol_map, get_symbol_map, upsert_symbol_map
+
+_SEPARATORS = re.compile(r"[^A-Za-z0-9]+")
+_AFFIX = re.compile(r"^[a-z]*(.*?)[a-z]*$")
+
+
+def _core(symbol: str) -> str:
+    """Strip typical broker decorations: ``XAUUSD.m``, ``#XAUUSD``, ``XAUUSDb``."""
+    parts = [p for p in _SEPARATORS.split(symbol) if p]
+    if not parts:
+        return symbol
+    longest = max(parts, key=len)
+    return _AFFIX.match(longest).group(1) or longest
 
 
 class SymbolResolver:
     """
-    Fast symbol lookup:
+    Fast symbol lookup for one broker server:
 
-        resolver = SymbolResolver()
+        resolver = get_resolver(user.mt5_server)
         full_sym = resolver.resolve("XAUUSD")   # e.g. returns "XAUUSDb"
+
+    Broker names are indexed by their undecorated core, so the usual suffix
+    and prefix variants resolve in constant time; anything else falls back to
+    the substring/regex scan.  ``mt5.symbols_get()`` is only called on the
+    first cache miss (or after :meth:`refresh`), so that call must run on a
+    terminal logged into ``server``.
     """
 
-    def __init__(self, path: str):
-        ensure_mt5(path)
-        self._all = [s.name for s in mt5.symbols_get()]
-        self._cache: Dict[str, str] = {}
+    def __init__(self, server: str, symbols: Iterable[str] | None = None,
+                 aliases: Dict[str, str] | None = None,
+                 persist: bool = True):
+        self.server = server
+        self.aliases = dict(settings.symbol_aliases if aliases is None
+                            else aliases)
+        self._persist = persist
+        self._lock = threading.Lock()
+        self._all: list[str] | None = None
+        self._exact: set[str] = set()
+        self._by_core: Dict[str, list[str]] = {}
+        self._cache: Dict[str, str] = self._load() if persist else {}
+        # Other brokers' names -> ours; misses expire (monotonic deadline)
+        self._translated: Dict[str, str] = {}
+        self._missing: Dict[str, float] = {}
+        if symbols is not None:
+            self._index(symbols)
 
     # -----------------------------------------------------------------
     def resolve(self, base: str) -> str:
-        """Return the first broker symbol that contains `base` (case-sens)."""
-        if base in self._cache:
-            return self._cache[base]
+        """Return the broker symbol for ``base`` (aliases tried second)."""
+        with self._lock:
+            if base in self._cache:
+                return self._cache[base]
+            if self._all is None:
+                self._index(s.name for s in (mt5.symbols_get() or ()))
+
+            best = self._lookup(base)
+            alias = self.aliases.get(base)
+            if best is None and alias:
+                best = self._cache.get(alias) or self._lookup(alias)
+            if best is None:
+                raise ValueError(f"Symbol '{base}' not found in broker list")
+
+            self._cache[base] = best
+        self._save(base, best)
+        logger.info(f"Resolved {base} -> {best} on {self.server}")
+        return best
+
+    def translate(self, symbol: str) -> str | None:
+        """Map another broker's exact name (``XAUUSDb``) onto this server.
+
+        Tries the name itself, then its undecorated core.  Returns None if
+        the broker does not offer it; that answer is cached for
+        ``symbol_cache_ttl_sec`` so callers skip guaranteed rejections.
+        """
+        with self._lock:
+            hit = self._translated.get(symbol)
+            if hit is not None:
+                return hit
+            if self._missing.get(symbol, 0.0) > time.monotonic():
+                return None
+        for cand in dict.fromkeys((symbol, _core(symbol))):
+            try:
+                found = self.resolve(cand)
+            except ValueError:
+                continue
+            with self._lock:
+                self._translated[symbol] = found
+            return found
+        with self._lock:
+            self._missing[symbol] = (time.monotonic()
+                                     + settings.symbol_cache_ttl_sec)
+        logger.warning(f"{symbol} is not offered on {self.server}")
+        return None
 
+    def forget(self, base: str) -> None:
+        """Drop a (possibly stale) mapping, e.g. after symbol_select fails."""
+        with self._lock:
+            self._cache.pop(base, None)
+            self._translated.clear()
+        if self._persist:
+            try:
+                delete_symbol_map(self.server, base)
+            except sqlite3.Error as e:
+                logger.warning(f"symbol_map delete failed for {base}: {e}")
+
+    def refresh(self) -> None:
+        """Re-read the broker symbol list on the next miss."""
+        with self._lock:
+            self._all = None
+            self._missing.clear()
+
+    # -----------------------------------------------------------------
+    def _index(self, symbols: Iterable[str]) -> None:
+        self._all = list(symbols)
+        self._exact = set(self._all)
+        self._by_core = {}
+        for s in self._all:
+            self._by_core.setdefault(_core(s), []).append(s)
+
+    def _lookup(self, base: str) -> str | None:
         # 1) Exact match
-        if base in self._all:
-            self._cache[base] = base
+        if base in self._exact:
             return base
 
-        # 2) Fast substring filter (XAUUSD -> XAUUSDb or bXAUUSD etc.)
-        cands = [s for s in self._all if base in s]
+        # 2) Indexed prefix/suffix variants (XAUUSD -> XAUUSDb, XAUUSD.m)
+        cands = self._by_core.get(base)
+        if not cands:
+            # 3) Substring scan, then regex  [a-z]* + base + [a-z]*
+            cands = [s for s in self._all if base in s]
         if not cands:
-            # 3) Regex fallback  [a-z]* + base + [a-z]*
             pat = re.compile(rf"[a-z]*{re.escape(base)}[a-z]*", re.I)
             cands = [s for s in self._all if pat.fullmatch(s)]
-
         if not cands:
-            raise ValueError(f"Symbol '{base}' not found in broker list")
+            return None
+        return min(cands, key=len)        # shortest readable variant
 
-        best = min(cands, key=len)        # shortest readable variant
-        self._cache[base] = best
-        logger.info("Resolved %s -> %s", base, best)
-        return best
+    def _load(self) -> Dict[str, str]:
+        try:
+            return get_symbol_map(self.server)
+        except sqlite3.Error as e:
+            logger.warning(f"symbol_map load failed for {self.server}: {e}")
+            return {}
+
+    def _save(self, base: str, symbol: str) -> None:
+        if not self._persist:
+            return
+        try:
+            upsert_symbol_map(self.server, base, symbol)
+        except sqlite3.Error as e:
+            logger.warning(f"symbol_map save failed for {base}: {e}")
+
+
+_resolvers: Dict[str, SymbolResolver] = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_resolver(server: str) -> SymbolResolver:
+    """Return the process-wide resolver for broker ``server``."""
+    with _resolvers_lock:
+        resolver = _resolvers.get(server)
+        if resolver is None:
+            resolver = _resolvers[server] = SymbolResolver(server)
+        return resolver
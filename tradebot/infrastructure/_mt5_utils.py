@@ -2,7 +2,16 @@
 import MetaTrader5 as mt5
 from loguru import logger
 import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable
+
+from ._metrics import RollingStats
 
 def ensure_mt5(path: str | None = None):
     """
@@ -61,4 +70,278 @@ def _initialize_with_retries(path: str, attempts: int = 3, delay_sec: float = 2.
     raise RuntimeError(f"MT5 initialization failed after {attempts} attempts: {mt5.last_error()}")
 
 
+# ---------------------------------------------------------------------
+# Terminal broker
+# ---------------------------------------------------------------------
+
+class MT5LoginError(RuntimeError):
+    """Raised when the terminal cannot be switched to the requested account."""
+
+
+class Priority(IntEnum):
+    """Scheduling class of a terminal job; lower runs first."""
+    ORDER = 0           # live signal order placement
+    COPY = 1            # copy-trade replication to followers
+    SL = 2              # SL protection (SignalSLManager)
+    HOUSEKEEPING = 3    # pending expiry, validation, history pulls
+
+
+@dataclass
+class _Job:
+    user: Any                       # UserAccount-like, or None for "any account"
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    priority: Priority = Priority.HOUSEKEEPING
+    timeout: float | None = None    # honoured by out-of-process executors
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class MT5Broker:
+    """
+    Single owner of the process-global MetaTrader5 terminal.
+
+    Every piece of terminal work is submitted as an account-tagged callable and
+    runs on one dedicated thread, so logins from the engine and the background
+    services can no longer interleave.  The broker remembers which account the
+    terminal is on and skips ``mt5.login`` when the next job targets it again:
+
+        broker = get_broker()
+        info = broker.call(user, mt5.account_info, priority=Priority.ORDER)
+
+    Jobs are picked strictly by :class:`Priority` (FIFO within a class), so a
+    signal order never waits behind a queued history scan.  While an
+    :meth:`order_burst` is open only ``ORDER`` jobs are dispatched; background
+    classes are deferred until the burst ends or ``max_defer_sec`` passes.
+
+    ``user`` may be ``None`` for work that does not care about the account.
+    Jobs submitted from inside a running job execute inline.
+    """
+
+    def __init__(self, max_defer_sec: float = 30.0):
+        self.max_defer_sec = max_defer_sec
+        self._queues: dict[Priority, deque[_Job]] = {
+            p: deque() for p in Priority}
+        self._cv = threading.Condition()
+        self._stopping = False
+        self._bursts = 0
+        self._burst_since = 0.0
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._current: tuple[int, str] | None = None
+        # Login time paid by the job now running (0 when login was skipped)
+        self.last_switch_sec = 0.0
+
+        self.jobs = 0
+        self.logins = 0
+        self.logins_avoided = 0
+        self.login_failures = 0
+        self.queued_sec_total = 0.0
+        self.queued_sec_max = 0.0
+        self.queue_wait: dict[Priority, RollingStats] = {
+            p: RollingStats() for p in Priority}
+
+    # ------------------------------------------------------------------
+    def submit(self, user, fn: Callable, *args,
+               priority: Priority = Priority.HOUSEKEEPING, **kwargs) -> Future:
+        """Queue ``fn(*args, **kwargs)`` to run while logged in as ``user``."""
+        return self._enqueue(_Job(user, fn, args, kwargs, Priority(priority)))
+
+    def call(self, user, fn: Callable, *args,
+             priority: Priority = Priority.HOUSEKEEPING,
+             timeout: float | None = None, **kwargs):
+        """Like :meth:`submit` but wait for and return the result."""
+        return self.submit(
+            user, fn, *args, priority=priority, **kwargs).result(timeout)
+
+    @contextmanager
+    def order_burst(self):
+        """Hold back non-``ORDER`` jobs while the block runs."""
+        self._enter_burst()
+        try:
+            yield
+        finally:
+            self._leave_burst()
+
+    def _enter_burst(self, since: float | None = None, depth: int = 1) -> None:
+        with self._cv:
+            if self._bursts == 0:
+                self._burst_since = time.monotonic() if since is None else since
+            self._bursts += depth
+
+    def _leave_burst(self) -> None:
+        with self._cv:
+            self._bursts -= 1
+            self._cv.notify()
+
+    def invalidate(self) -> None:
+        """Forget the logged-in account so the next job logs in again."""
+        self._current = None
 
+    @property
+    def current_account(self) -> int | None:
+        return self._current[0] if self._current else None
+
+    @property
+    def current_server(self) -> str | None:
+        return self._current[1] if self._current else None
+
+    def stats(self) -> dict:
+        with self._cv:
+            depth = {p.name: len(q) for p, q in self._queues.items()}
+        with self._stats_lock:
+            return {
+                "jobs": self.jobs,
+                "logins": self.logins,
+                "logins_avoided": self.logins_avoided,
+                "login_failures": self.login_failures,
+                "queued_sec_total": round(self.queued_sec_total, 6),
+                "queued_sec_max": round(self.queued_sec_max, 6),
+                "queue_depth": depth,
+                "queue_wait": {p.name: s.summary()
+                               for p, s in self.queue_wait.items()},
+            }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Run what is queued (up to ``timeout``), then fail the rest."""
+        thread = self._thread
+        if thread and thread.is_alive():
+            with self._cv:
+                self._stopping = True
+                self._cv.notify()
+            thread.join(timeout)
+            logger.info(f"MT5Broker stopped — {self.stats()}")
+        with self._cv:
+            left = [job for q in self._queues.values() for job in q]
+            for q in self._queues.values():
+                q.clear()
+        for job in left:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(RuntimeError("MT5 broker stopped"))
+        self._thread = None
+        self._stopping = False
+
+    # ------------------------------------------------------------------
+    def _enqueue(self, job: _Job) -> Future:
+        if threading.current_thread() is self._thread:
+            self._run(job)
+            return job.future
+        self._ensure_thread()
+        with self._cv:
+            self._queues[job.priority].append(job)
+            self._cv.notify()
+        return job.future
+
+    def _ensure_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._loop, name="mt5-broker", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cv:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._cv.wait(self._defer_left())
+                    job = self._next_job()
+                if job is None:
+                    return
+            self._run(job)
+
+    def _defer_left(self) -> float | None:
+        """Seconds until an open burst stops deferring background jobs.
+
+        None once nothing is deferred (no burst, or it outlived
+        ``max_defer_sec``): the loop then sleeps until a job arrives.
+        """
+        if not self._bursts:
+            return None
+        left = self._burst_since + self.max_defer_sec - time.monotonic()
+        return left + 0.001 if left > 0 else None
+
+    def _next_job(self) -> _Job | None:
+        deferring = (self._bursts > 0
+                     and time.monotonic() - self._burst_since
+                     < self.max_defer_sec)
+        for prio, q in self._queues.items():
+            if deferring and prio != Priority.ORDER:
+                break
+            if q:
+                return q.popleft()
+        return None
+
+    def _run(self, job: _Job) -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        waited = time.monotonic() - job.enqueued
+        with self._stats_lock:
+            self.jobs += 1
+            self.queued_sec_total += waited
+            self.queued_sec_max = max(self.queued_sec_max, waited)
+        self.queue_wait[job.priority].add(waited)
+        try:
+            result = self._execute(job)
+        except BaseException as exc:
+            job.future.set_exception(exc)
+        else:
+            job.future.set_result(result)
+
+    def _execute(self, job: _Job):
+        if job.user is not None:
+            self._switch(job.user)
+        return job.fn(*job.args, **job.kwargs)
+
+    def _switch(self, user) -> None:
+        """Make ``user`` the logged-in account, skipping redundant logins."""
+        key = (int(user.mt5_account), str(user.mt5_server))
+        self.last_switch_sec = 0.0
+        if key == self._current:
+            with self._stats_lock:
+                self.logins_avoided += 1
+            return
+
+        t0 = time.monotonic()
+        self._current = None
+        ensure_mt5(user.mt5_path)
+        if not mt5.login(user.mt5_account, user.mt5_password,
+                         user.mt5_server):
+            with self._stats_lock:
+                self.login_failures += 1
+            raise MT5LoginError(
+                f"Login failed for account {user.mt5_account}: "
+                f"{mt5.last_error()}")
+        self._current = key
+        self.last_switch_sec = time.monotonic() - t0
+        with self._stats_lock:
+            self.logins += 1
+
+
+_broker: MT5Broker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> MT5Broker:
+    """Return the process-wide terminal broker.
+
+    With ``settings.mt5_process_pool`` this is a :class:`TerminalPool` that
+    runs each terminal path in its own worker process.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                from config import settings
+                if settings.mt5_process_pool:
+                    from ._mt5_pool import TerminalPool
+                    _broker = TerminalPool(
+                        call_timeout=settings.mt5_call_timeout_sec)
+                else:
+                    _broker = MT5Broker()
+    return _broker
@@ -0,0 +1,61 @@
+# tradebot\infrastructure\_mt5_worker.py
+
+"""
+Entry point of a :class:`~tradebot.infrastructure._mt5_pool.TerminalPool`
+worker process.
+
+Kept free of module-level ``MetaTrader5`` imports: a spawned child unpickles
+its target before running it, and the terminal module may need swapping in
+first.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import sys
+from typing import Callable, Sequence
+
+
+def _worker_main(path: str | None, conn, mt5_module: str,
+                 initializer: Callable | None, initargs: Sequence) -> None:
+    """Child entry point: own the terminal at ``path`` and serve jobs."""
+    if mt5_module != "MetaTrader5":
+        sys.modules["MetaTrader5"] = importlib.import_module(mt5_module)
+    from tradebot.infrastructure import _mt5_utils
+
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+        if path:
+            _mt5_utils._initialize_with_retries(path)
+        else:
+            _mt5_utils.ensure_mt5()
+    except BaseException as exc:
+        conn.send((False, exc))
+        return
+    conn.send((True, os.getpid()))
+    broker = _mt5_utils.MT5Broker()
+    _mt5_utils._broker = broker     # nested get_broker() stays in-process
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+        user, fn, args, kwargs = msg
+        try:
+            reply = (True, broker.call(user, fn, *args, **kwargs))
+        except BaseException as exc:
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception as exc:
+            conn.send((False, RuntimeError(f"Unpicklable job outcome: {exc!r}")))
+
+    from tradebot.infrastructure._mt5_cache import log_cache_stats
+    log_cache_stats()
+    broker.stop()
+    sys.modules["MetaTrader5"].shutdown()
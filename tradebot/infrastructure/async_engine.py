@@ -0,0 +1,57 @@
+# tradebot/infrastructure/async_engine.py
+
+"""
+Async adapter that runs a blocking trading engine on a bounded thread pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Sequence
+
+from loguru import logger
+
+from tradebot.domain.models import Order, OrderResult
+from tradebot.domain.ports import AsyncTradingEnginePort, TradingEnginePort
+
+
+class ExecutorTradingEngine(AsyncTradingEnginePort):
+    """
+    Await ``engine.execute_orders`` without blocking the event loop:
+
+        engine = ExecutorTradingEngine(MetaTraderEngine(), max_workers=4)
+        results = await engine.execute_orders(orders, lane=("Lily", "XAUUSD"))
+
+    Batches that share a ``lane`` (default: the first order's symbol) run one
+    after another in arrival order; different lanes run concurrently, up to
+    ``max_workers`` at a time.
+    """
+
+    def __init__(self, engine: TradingEnginePort, max_workers: int = 4):
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="order-exec")
+        # A lane's lock lives only while a batch holds or waits on it
+        self._lanes: weakref.WeakValueDictionary[Hashable, asyncio.Lock] = (
+            weakref.WeakValueDictionary())
+
+    async def execute_orders(self, orders: Sequence[Order],
+                             lane: Hashable | None = None
+                             ) -> list[list[OrderResult]]:
+        orders = list(orders)
+        if not orders:
+            return []
+        key = lane if lane is not None else orders[0].symbol
+        lock = self._lanes.get(key)
+        if lock is None:
+            lock = self._lanes[key] = asyncio.Lock()
+        async with lock:
+            logger.debug(f"Executing {len(orders)} order(s) on lane {key}")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self.engine.execute_orders, orders)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -3,27 +3,52 @@ Copy-trade synchronizer.
 
 Monitors all positions on the master account and replicates every change
 (open, SL/TP modify, partial close, full close) to follower accounts.
+Master pending orders are mirrored as follower pending orders (place, modify
+price/SL/TP, remove); when the master's pending fills, the follower's copy is
+left to fill at the same level.  It stays in the pending map (position
+actions reach it as an order) until reconcile sees it filled and moves it to
+the position map.
+
+The master -> follower ticket map lives in memory (:class:`CopyMap`) and is
+written behind to SQLite; :meth:`CopyTradeSyncer.reconcile` rebuilds any
+mapping lost in a crash from the followers' ``copy-<ticket>`` comments.
+The diff baseline (last master book) is checkpointed every ``checkpoint_sec``
+and on stop, so a restart replicates SL/TP edits and partial closes made
+while the bot was down.
+
+Master fills executed by the bot are also pushed in by the engine
+(:meth:`CopyTradeSyncer.push`) and replicated on the next wake-up instead of
+after the next poll; polling remains the fallback for everything else.
 """
 
 from __future__ import annotations
 
+import queue
+import sqlite3
 import threading
-from dataclasses import dataclass
-from typing import Dict
+import time
+from dataclasses import astuple, dataclass, replace
+from datetime import datetime, timedelta
+from typing import Callable
 
 import MetaTrader5 as mt5
+import numpy as np
 from loguru import logger
 
 from config import settings
-from ._mt5_utils import ensure_mt5
+from ._cadence import AdaptiveCadence, run_adaptive
+from ._copy_map import CopyMap
+from ._metrics import RollingStats
+from ._mt5_utils import MT5LoginError, Priority, get_broker
+from ._mt5_cache import symbol_info, symbol_tick
+from ._mt5_symbol_resolver import get_resolver
+from . import tracing
 from .db import (
+    get_checkpoint,
     get_master_user,
     get_follower_users,
-    upsert_copy_map,
-    get_follower_ticket,
-    get_follower_tickets_for_master,
-    delete_copy_map,
-    delete_copy_map_by_master,
+    put_checkpoint,
+    upsert_replication_stats,
     UserAccount,
 )
 
@@ -39,16 +64,215 @@ class _PosSnap:
     tp: float
     price_open: float
     comment: str
+    time_msc: int = 0   # last master change, local epoch ms (0 = unknown)
+
+
+@dataclass
+class _Snapshot:
+    """All master positions as parallel arrays, sorted by ticket."""
+    tickets: np.ndarray       # int64
+    types: np.ndarray         # int8
+    volume: np.ndarray
+    sl: np.ndarray
+    tp: np.ndarray
+    price_open: np.ndarray
+    symbols: list[str]
+    comments: list[str]
+    changed_msc: np.ndarray   # int64, master server time of the last change
+    offset_ms: float = 0.0    # master server clock minus local clock
+
+    @classmethod
+    def from_positions(cls, positions, offset_ms: float = 0.0) -> "_Snapshot":
+        rows = sorted(positions, key=lambda p: p.ticket)
+        return cls(
+            tickets=np.fromiter((p.ticket for p in rows), np.int64, len(rows)),
+            types=np.fromiter((p.type for p in rows), np.int8, len(rows)),
+            volume=np.fromiter((p.volume for p in rows), float, len(rows)),
+            sl=np.fromiter((p.sl for p in rows), float, len(rows)),
+            tp=np.fromiter((p.tp for p in rows), float, len(rows)),
+            price_open=np.fromiter(
+                (p.price_open for p in rows), float, len(rows)),
+            symbols=[p.symbol for p in rows],
+            comments=[getattr(p, "comment", "") or "" for p in rows],
+            changed_msc=np.fromiter(
+                (getattr(p, "time_update_msc", 0)
+                 or getattr(p, "time_msc", 0) for p in rows),
+                np.int64, len(rows)),
+            offset_ms=offset_ms,
+        )
+
+    @classmethod
+    def empty(cls) -> "_Snapshot":
+        return cls.from_positions(())
+
+    def to_state(self) -> dict:
+        return {
+            "tickets": self.tickets.tolist(), "types": self.types.tolist(),
+            "volume": self.volume.tolist(), "sl": self.sl.tolist(),
+            "tp": self.tp.tolist(), "price_open": self.price_open.tolist(),
+            "symbols": self.symbols, "comments": self.comments,
+            "changed_msc": self.changed_msc.tolist(),
+            "offset_ms": self.offset_ms,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "_Snapshot":
+        return cls(
+            tickets=np.array(state["tickets"], np.int64),
+            types=np.array(state["types"], np.int8),
+            volume=np.array(state["volume"], float),
+            sl=np.array(state["sl"], float),
+            tp=np.array(state["tp"], float),
+            price_open=np.array(state["price_open"], float),
+            symbols=list(state["symbols"]),
+            comments=list(state["comments"]),
+            changed_msc=np.array(state["changed_msc"], np.int64),
+            offset_ms=float(state["offset_ms"]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def snap(self, i: int) -> _PosSnap:
+        return _PosSnap(
+            ticket=int(self.tickets[i]), symbol=self.symbols[i],
+            pos_type=int(self.types[i]), volume=float(self.volume[i]),
+            sl=float(self.sl[i]), tp=float(self.tp[i]),
+            price_open=float(self.price_open[i]), comment=self.comments[i],
+            time_msc=(int(self.changed_msc[i] - self.offset_ms)
+                      if self.changed_msc[i] else 0))
+
+
+# _run_batch outcome: the follower's broker does not offer the symbol
+_NO_SYMBOL = -1
+
+# Replicated events whose lag (master change -> follower DONE) is measured
+_LAGGED = ("open", "sltp", "partial", "close")
+_LAG_PERSIST_SEC = 10.0
+
+_CHECKPOINT = "copy_syncer"
+
+# Pending order types mirrored to followers
+_PENDING_TYPES = frozenset((
+    mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT,
+    mt5.ORDER_TYPE_BUY_STOP, mt5.ORDER_TYPE_SELL_STOP,
+))
+
+
+@dataclass
+class _PendSnap:
+    """Lightweight snapshot of one MT5 pending order."""
+    ticket: int
+    symbol: str
+    order_type: int
+    volume: float
+    price: float
+    sl: float
+    tp: float
+
+    @classmethod
+    def from_order(cls, o) -> "_PendSnap":
+        return cls(int(o.ticket), o.symbol, int(o.type),
+                   float(o.volume_current), float(o.price_open),
+                   float(o.sl), float(o.tp))
+
+    def levels(self) -> tuple[float, float, float]:
+        return self.price, self.sl, self.tp
+
+
+@dataclass
+class _Action:
+    """One replication step on a follower (shipped to the broker as-is)."""
+    # "open" | "close" | "sltp" | "partial" | "place" | "modify" | "remove"
+    kind: str
+    master_ticket: int
+    snap: _PosSnap | _PendSnap | None = None
+    f_ticket: int | None = None
+    ratio: float = 0.0
+    # Master exit deal (close/partial): local epoch ms and price
+    event_msc: int = 0
+    event_price: float = 0.0
+    # The copy is tracked in pending_map, so it may still be an order
+    pending_copy: bool = False
+
+
+class _Diff:
+    """Vectorized diff of two snapshots (indices point into ``cur``)."""
+
+    def __init__(self, prev: _Snapshot, cur: _Snapshot):
+        self.opened = np.flatnonzero(
+            ~np.isin(cur.tickets, prev.tickets, assume_unique=True))
+        self.closed = prev.tickets[
+            ~np.isin(prev.tickets, cur.tickets, assume_unique=True)]
+        _, ci, pi = np.intersect1d(
+            cur.tickets, prev.tickets, assume_unique=True,
+            return_indices=True)
+        moved = (cur.sl[ci] != prev.sl[pi]) | (cur.tp[ci] != prev.tp[pi])
+        self.modified = ci[moved]
+        reduced = cur.volume[ci] < prev.volume[pi]
+        self.reduced = ci[reduced]
+        self.reduced_ratio = ((prev.volume[pi] - cur.volume[ci])
+                              / prev.volume[pi])[reduced]
+
+
+class _PendingDiff:
+    """Diff of two pending-order books (ticket -> _PendSnap)."""
+
+    def __init__(self, prev: dict[int, _PendSnap],
+                 cur: dict[int, _PendSnap]):
+        self.placed = [p for t, p in cur.items() if t not in prev]
+        self.modified = [p for t, p in cur.items()
+                         if t in prev and p.levels() != prev[t].levels()]
+        # Gone from the book: filled (now a position) or cancelled/expired
+        self.gone = [t for t in prev if t not in cur]
 
 
 class CopyTradeSyncer:
     """Background thread that keeps follower accounts in sync with master."""
 
-    def __init__(self, interval_sec: int = 5):
-        self.interval_sec = interval_sec
+    def __init__(self, interval_sec: float | None = None):
+        # Idle interval; after activity polls speed up to poll_min_sec
+        self.interval_sec = interval_sec or settings.copy_poll_max_sec
+        self.cadence = AdaptiveCadence(
+            min(settings.poll_min_sec, self.interval_sec), self.interval_sec)
+        # Called after every master change (e.g. to wake the SL manager)
+        self.on_change: Callable[[], None] | None = None
         self._stop = threading.Event()
         self._worker: threading.Thread | None = None
-        self._prev: Dict[int, _PosSnap] = {}
+        self._prev = _Snapshot.empty()
+        # (positions_total, orders_total, deals watermark, book hash) of _prev
+        self._fingerprint: tuple | None = None
+        # Next poll that fetches the rows even if the counts did not move
+        self._full_poll_at = 0.0
+        # _prev came from a checkpoint: reconcile() must not re-seed it
+        self._restored = False
+        self._checkpoint_at = time.monotonic()
+        self._checkpoint_dirty = False      # _prev changed since last save
+        self.full_diffs = 0
+        self.skipped_diffs = 0
+        self.copy_map = CopyMap(settings.db_path, settings.copy_map_flush_sec)
+        self.pending_map = CopyMap(settings.db_path,
+                                   settings.copy_map_flush_sec, "pending_map")
+        self._prev_pending: dict[int, _PendSnap] = {}
+        # follower account -> seconds per applied batch
+        self.follower_sec: dict[int, RollingStats] = {}
+        # (follower account, event kind) -> ms from master change to DONE
+        self.lag_ms: dict[tuple[int, str], RollingStats] = {}
+        # follower account -> |follower fill - master fill| in price units
+        self.price_diff: dict[int, RollingStats] = {}
+        self._lag_saved_at = 0.0
+        # Master fills pushed by the engine, replicated before the next poll
+        self._intents: queue.SimpleQueue[_PosSnap] = queue.SimpleQueue()
+        self.pushed_opens = 0
+        # master ticket -> [forward-at (monotonic), latest snap]
+        self._sltp_due: dict[int, list] = {}
+        self.sltp_saved = 0             # follower SLTP requests not sent
+        # (follower account, master symbol) -> retry-after (monotonic) for
+        # symbols the follower's broker does not offer
+        self._no_symbol: dict[tuple[int, str], float] = {}
+        # Next periodic reconcile (monotonic); set by the first reconcile()
+        self._next_reconcile: float | None = None
+        self.reconciles = 0
 
     # ------------------------------------------------------------------
     # Lifecycle
@@ -58,6 +282,9 @@ class CopyTradeSyncer:
         if self._worker and self._worker.is_alive():
             return
         self._stop.clear()
+        self.copy_map.start()
+        self.pending_map.start()
+        self.restore()
         self._worker = threading.Thread(
             target=self._loop, name="copy-syncer", daemon=True)
         self._worker.start()
@@ -65,263 +292,899 @@ class CopyTradeSyncer:
 
     def stop(self) -> None:
         self._stop.set()
+        self.cadence.wake()
         if self._worker and self._worker.is_alive():
             self._worker.join(timeout=max(self.interval_sec, 2))
-        logger.info("CopyTradeSyncer stopped")
+        self._flush_sltp()
+        self.checkpoint()
+        self.copy_map.stop()
+        self.pending_map.stop()
+        self.save_lag_stats()
+        logger.info(f"CopyTradeSyncer stopped — loop stats "
+                    f"{self.cadence.stats()}, copy_map {self.copy_map.stats()}, "
+                    f"per follower {self.follower_stats()}, "
+                    f"SLTP requests coalesced away {self.sltp_saved}")
+
+    def checkpoint(self) -> None:
+        """Persist the diff baseline (master positions and pendings)."""
+        self._checkpoint_at = time.monotonic()
+        self._checkpoint_dirty = False
+        if settings.checkpoint_sec <= 0:
+            return
+        state = {"prev": self._prev.to_state(),
+                 "pending": [astuple(p) for p in self._prev_pending.values()]}
+        try:
+            put_checkpoint(_CHECKPOINT, state, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"CopySyncer: checkpoint not saved: {e}")
+
+    def restore(self) -> bool:
+        """Load the diff baseline saved before the last shutdown."""
+        if settings.checkpoint_sec <= 0:
+            return False
+        try:
+            state = get_checkpoint(_CHECKPOINT, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"CopySyncer: checkpoint not loaded: {e}")
+            return False
+        if not state:
+            return False
+        self._prev = _Snapshot.from_state(state["prev"])
+        self._prev_pending = {int(row[0]): _PendSnap(*row)
+                              for row in state["pending"]}
+        self._fingerprint = None
+        self._restored = True
+        logger.info(f"CopySyncer: resumed from checkpoint with "
+                    f"{len(self._prev)} master position(s) and "
+                    f"{len(self._prev_pending)} pending order(s)")
+        return True
+
+    def follower_stats(self) -> dict[int, dict]:
+        """Batch time per follower account (seconds)."""
+        return {acct: st.summary() for acct, st in self.follower_sec.items()}
+
+    def lag_stats(self) -> dict[int, dict[str, dict]]:
+        """account -> {"<kind>_lag_ms" | "price_diff": percentile summary}."""
+        out: dict[int, dict[str, dict]] = {}
+        for (acct, kind), st in self.lag_ms.items():
+            out.setdefault(acct, {})[f"{kind}_lag_ms"] = st.summary()
+        for acct, st in self.price_diff.items():
+            out.setdefault(acct, {})["price_diff"] = st.summary()
+        return out
+
+    def save_lag_stats(self) -> None:
+        """Persist the rolling summaries (one row per follower and metric)."""
+        self._lag_saved_at = time.monotonic()
+        rows = [(acct, metric, st["count"], st["p50"], st["p95"], st["p99"],
+                 st["max"])
+                for acct, metrics in self.lag_stats().items()
+                for metric, st in metrics.items()]
+        if not rows:
+            return
+        try:
+            upsert_replication_stats(rows, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"Replication stats not saved: {e}")
+
+    def poke(self) -> None:
+        """Poll the master promptly (a signal was just executed)."""
+        self.cadence.poke()
+
+    def push(self, ticket: int, fill: dict, correlation_id: str = "") -> None:
+        """Replicate a master fill without waiting for the poll to see it.
+
+        ``fill`` carries symbol, type, volume, price, sl, tp and time_msc
+        (local epoch ms) as published by ``MetaTraderEngine.on_master_fill``.
+        """
+        if correlation_id:
+            tracing.link_ticket(ticket, correlation_id)
+        self._intents.put(_PosSnap(
+            ticket=int(ticket), symbol=fill["symbol"],
+            pos_type=int(fill["type"]), volume=float(fill["volume"]),
+            sl=float(fill.get("sl") or 0), tp=float(fill.get("tp") or 0),
+            price_open=float(fill.get("price") or 0), comment="",
+            time_msc=int(fill.get("time_msc") or 0)))
+        self.cadence.poke()
 
     def _loop(self) -> None:
-        while not self._stop.is_set():
-            try:
-                self._tick()
-            except Exception as exc:
-                logger.error(f"CopyTradeSyncer error: {exc}")
-            self._stop.wait(self.interval_sec)
+        try:
+            self.reconcile()
+        except Exception as exc:
+            logger.error(f"CopyTradeSyncer reconcile error: {exc}")
+        run_adaptive(self._tick, self.cadence, self._stop,
+                     lambda exc: logger.error(f"CopyTradeSyncer error: {exc}"))
 
     # ------------------------------------------------------------------
     # Main tick
     # ------------------------------------------------------------------
 
-    def _tick(self) -> None:
+    def _tick(self) -> bool:
+        """Sync followers once; return True if the master book changed."""
         master = get_master_user()
         if not master:
-            return
+            return False
+        if (self._next_reconcile is not None
+                and time.monotonic() >= self._next_reconcile):
+            self.reconcile()
+        pushed = self._replicate_pushed(master)
 
-        ensure_mt5(master.mt5_path)
-        if not mt5.login(master.mt5_account, master.mt5_password,
-                         master.mt5_server):
+        full = time.monotonic() >= self._full_poll_at
+        try:
+            fingerprint, current, pending = get_broker().call(
+                master, self._poll_master, self._fingerprint, full,
+                priority=Priority.COPY)
+        except MT5LoginError:
             logger.warning("CopyTradeSyncer: master login failed")
-            return
+            return pushed
+        if full:
+            self._full_poll_at = (time.monotonic()
+                                  + settings.copy_full_poll_sec)
 
-        raw = mt5.positions_get() or []
-        current: Dict[int, _PosSnap] = {}
-        for p in raw:
-            current[p.ticket] = _PosSnap(
-                ticket=p.ticket,
-                symbol=p.symbol,
-                pos_type=int(p.type),
-                volume=float(p.volume),
-                sl=float(p.sl),
-                tp=float(p.tp),
-                price_open=float(p.price_open),
-                comment=getattr(p, "comment", "") or "",
-            )
-
-        prev = self._prev
+        if current is None:             # nothing moved since last tick
+            self.skipped_diffs += 1
+            if self._sltp_due:
+                self._forward_due_sltp(master)
+            self._checkpoint_if_due()
+            return pushed or bool(self._sltp_due)
+        self.full_diffs += 1
+        if self.on_change is not None:
+            self.on_change()
+
+        prev, prev_pending = self._prev, self._prev_pending
+        self._prev, self._prev_pending = current, pending
+        self._fingerprint = fingerprint
+        self._checkpoint_dirty = True
         followers = get_follower_users()
         if not followers:
-            self._prev = current
+            self._checkpoint_if_due()
+            return True
+
+        diff = _Diff(prev, current)
+        pdiff = _PendingDiff(prev_pending, pending)
+        # A filled master pending shows up as a position with the order's
+        # ticket; the follower's copy stays in pending_map until it fills too
+        filled = (set(pdiff.gone) & set(current.tickets.tolist())
+                  if pdiff.gone else set())
+
+        batches = self._plan(diff, current, followers)
+        self._plan_pending(pdiff, filled, batches)
+        self._stamp_exits(master, batches, current.offset_ms)
+        closing: dict[int, set[int]] = {}
+        for acct, actions in batches.items():
+            for a in actions:
+                if a.kind in ("close", "remove"):
+                    closing.setdefault(a.master_ticket, set()).add(acct)
+        for follower in followers:
+            actions = batches[follower.mt5_account]
+            if actions:
+                self._apply_batch(master, follower, actions)
+        # Copies sent a close leave their map once it succeeded; failed
+        # ones stay mapped so reconcile retries them
+        for tk in [*diff.closed.tolist(), *pdiff.gone]:
+            if tk in filled:
+                continue
+            keep = closing.get(tk, ())
+            self.copy_map.remove_master(tk, keep)
+            self.pending_map.remove_master(tk, keep)
+        self._checkpoint_if_due()
+        return True
+
+    def _checkpoint_if_due(self) -> None:
+        """Save a changed baseline every ``checkpoint_sec``, off the fan-out."""
+        if (self._checkpoint_dirty and settings.checkpoint_sec > 0
+                and time.monotonic() - self._checkpoint_at
+                >= settings.checkpoint_sec):
+            self.checkpoint()
+
+    def _flush_sltp(self) -> None:
+        """Forward held SL/TP edits now; the checkpoint already has them."""
+        if not self._sltp_due:
             return
+        try:
+            master = get_master_user()
+            if master:
+                self._forward_due_sltp(master, flush=True)
+        except Exception as exc:
+            logger.error(f"CopyTradeSyncer SL/TP flush error: {exc}")
+
+    def _forward_due_sltp(self, master: UserAccount,
+                          flush: bool = False) -> None:
+        """Send coalesced SL/TP edits whose window has elapsed (all if flush)."""
+        followers = get_follower_users()
+        batches: dict[int, list[_Action]] = {
+            f.mt5_account: [] for f in followers}
+        self._plan_due_sltp(batches, flush)
+        for follower in followers:
+            actions = batches[follower.mt5_account]
+            if actions:
+                self._apply_batch(master, follower, actions)
 
-        prev_tickets = set(prev.keys())
-        curr_tickets = set(current.keys())
+    def _replicate_pushed(self, master: UserAccount) -> bool:
+        """Open copies of the fills queued by :meth:`push`.
 
-        # --- new positions (open on followers) ---
-        for tk in curr_tickets - prev_tickets:
-            snap = current[tk]
-            for f in followers:
-                self._open_on_follower(master, f, snap)
+        The mapping is recorded right away, so when the poll later sees the
+        new master position it has nothing left to open.
+        """
+        snaps: list[_PosSnap] = []
+        while True:
+            try:
+                snaps.append(self._intents.get_nowait())
+            except queue.Empty:
+                break
+        if not snaps:
+            return False
+        self.pushed_opens += len(snaps)
+        for follower in get_follower_users():
+            acct = follower.mt5_account
+            actions = [_Action("open", s.ticket, s) for s in snaps
+                       if self._should_copy(acct, s)]
+            if actions:
+                self._apply_batch(master, follower, actions)
+        return True
 
-        # --- closed positions (close on followers) ---
-        for tk in prev_tickets - curr_tickets:
-            self._close_on_followers(tk)
+    @classmethod
+    def _poll_master(cls, prev_fingerprint: tuple | None, full: bool = True
+                     ) -> tuple[tuple, _Snapshot | None,
+                                dict[int, _PendSnap] | None]:
+        """Fingerprint the master's book; snapshot it only on change.
 
-        # --- still-open positions: check modifications ---
-        for tk in curr_tickets & prev_tickets:
-            cur = current[tk]
-            old = prev[tk]
+        Runs logged into the master.  The fingerprint combines
+        ``positions_total``, ``orders_total``, the 24h ``history_deals_total``
+        watermark and a hash over position ticket/volume/SL/TP and pending
+        ticket/price/SL/TP.  Unless ``full``, unchanged counts end the poll
+        before any rows are fetched; SL/TP-only edits move no count, so the
+        caller asks for a ``full`` poll every ``copy_full_poll_sec``.
+        """
+        now = datetime.now()
+        counts = (mt5.positions_total(), mt5.orders_total(),
+                  mt5.history_deals_total(
+                      now - timedelta(days=1), now + timedelta(days=1)))
+        if (not full and prev_fingerprint is not None
+                and counts == prev_fingerprint[:3]):
+            return prev_fingerprint, None, None
+        positions = mt5.positions_get() or ()
+        orders = [o for o in (mt5.orders_get() or ())
+                  if o.type in _PENDING_TYPES]
+        digest = hash((
+            tuple((p.ticket, p.volume, p.sl, p.tp) for p in positions),
+            tuple((o.ticket, o.volume_current, o.price_open, o.sl, o.tp)
+                  for o in orders)))
+        fingerprint = (*counts, digest)
+        if fingerprint == prev_fingerprint:
+            return fingerprint, None, None
+        offset_ms = cls._server_offset_ms(p.symbol for p in positions)
+        return (fingerprint, _Snapshot.from_positions(positions, offset_ms),
+                {int(o.ticket): _PendSnap.from_order(o) for o in orders})
 
-            sl_changed = cur.sl != old.sl
-            tp_changed = cur.tp != old.tp
-            if sl_changed or tp_changed:
-                self._modify_sltp_on_followers(tk, cur)
+    @staticmethod
+    def _server_offset_ms(symbols) -> float:
+        """Server clock minus local clock, snapped to the 30-minute TZ grid."""
+        for symbol in symbols:
+            tick = symbol_tick(symbol)
+            if tick and getattr(tick, "time", 0):
+                return round((tick.time - time.time()) / 1800.0) * 1_800_000.0
+        return 0.0
 
-            if cur.volume < old.volume:
-                ratio = (old.volume - cur.volume) / old.volume
-                self._partial_close_on_followers(tk, cur, ratio)
+    def _stamp_exits(self, master: UserAccount,
+                     batches: dict[int, list[_Action]],
+                     offset_ms: float) -> None:
+        """Attach the master's exit deal (time, price) to close/partial actions."""
+        exits = [a for actions in batches.values() for a in actions
+                 if a.kind in ("close", "partial")]
+        if not exits:
+            return
+        try:
+            deals = get_broker().call(
+                master, self._exit_deals,
+                sorted({a.master_ticket for a in exits}),
+                priority=Priority.COPY)
+        except Exception as exc:
+            logger.warning(f"CopySyncer: master exit deals unavailable: {exc}")
+            return
+        for a in exits:
+            if a.master_ticket in deals:
+                msc, price = deals[a.master_ticket]
+                a.event_msc, a.event_price = int(msc - offset_ms), price
 
-        self._prev = current
+    @staticmethod
+    def _exit_deals(tickets: list[int]) -> dict[int, tuple[int, float]]:
+        """Latest exit deal (server time ms, price) per master position."""
+        out: dict[int, tuple[int, float]] = {}
+        for ticket in tickets:
+            deals = [d for d in (mt5.history_deals_get(position=ticket) or ())
+                     if d.entry == mt5.DEAL_ENTRY_OUT]
+            if deals:
+                last = max(deals, key=lambda d: d.time_msc)
+                out[ticket] = (int(last.time_msc), float(last.price))
+        return out
 
     # ------------------------------------------------------------------
-    # Open
+    # Reconciliation
     # ------------------------------------------------------------------
 
-    def _open_on_follower(self, master: UserAccount,
-                          follower: UserAccount, snap: _PosSnap) -> None:
-        try:
-            ensure_mt5(follower.mt5_path)
-            if not mt5.login(follower.mt5_account, follower.mt5_password,
-                             follower.mt5_server):
-                logger.warning(
-                    f"CopySyncer open: login failed for {follower.mt5_account}")
-                return
-
-            if follower.risk_mode == "fixed_lot":
-                volume = self._round_volume(follower.fixed_lot, snap.symbol)
-            else:
-                volume = self._scale_volume(
-                    snap.volume, snap.symbol,
-                    master.risk_per_trade, follower.risk_per_trade)
-            if volume <= 0:
-                return
-
-            side_buy = snap.pos_type == int(mt5.POSITION_TYPE_BUY)
-            tick = mt5.symbol_info_tick(snap.symbol)
-            if not tick:
-                logger.warning(f"CopySyncer: no tick for {snap.symbol}")
-                return
+    def reconcile(self) -> int:
+        """Join master, follower books and both maps; apply the repairs.
 
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": snap.symbol,
-                "volume": volume,
-                "type": mt5.ORDER_TYPE_BUY if side_buy else mt5.ORDER_TYPE_SELL,
-                "price": tick.ask if side_buy else tick.bid,
-                "sl": snap.sl,
-                "tp": snap.tp,
-                "deviation": follower.max_slippage,
-                "magic": settings.magic_number,
-                "comment": f"copy-{snap.ticket}"[:30],
-                "type_time": mt5.ORDER_TIME_GTC,
-            }
+        One broker call for the master and one per follower, then an
+        in-memory join per follower:
 
-            res = mt5.order_send(request)
-            if res and res.retcode == mt5.TRADE_RETCODE_DONE:
-                upsert_copy_map(
-                    snap.ticket, follower.mt5_account,
-                    int(res.order), snap.symbol)
-                logger.info(
-                    f"CopySyncer: opened {snap.symbol} on "
-                    f"{follower.mt5_account} ticket={res.order}")
-            else:
-                data = (res._asdict() if res and hasattr(res, "_asdict")
-                        else mt5.last_error())
-                logger.warning(
-                    f"CopySyncer open failed on {follower.mt5_account}: {data}")
+        * copy live, mapping missing (lost flush) -> re-add the mapping
+        * mapping, copy gone, master still open   -> tombstone (closed by hand)
+        * mapping, copy open without its comment  -> keep the mapping
+        * master open, no mapping and no copy     -> open/place the copy
+        * copy live, master gone                  -> close/remove the copy
+        * follower copy filled (master's may not)  -> move to the position map
 
-        except Exception as exc:
-            logger.error(
-                f"CopySyncer open error for {follower.mt5_account}: {exc}")
+        The first pass also seeds the diff baseline unless one was restored
+        from a checkpoint, so a restart does not treat every open master
+        position as new.  Returns the number of
+        repairs.
+        """
+        master = get_master_user()
+        if not master:
+            return 0
+        t0 = time.perf_counter()
+        fingerprint, current, pending = get_broker().call(
+            master, self._poll_master, None, priority=Priority.COPY)
+        positions = {int(t): current.snap(i)
+                     for i, t in enumerate(current.tickets)}
+        # A copy is legitimate while its master is open in either book
+        master_open = positions.keys() | pending.keys()
+
+        repairs = 0
+        followers = get_follower_users()
+        for follower in followers:
+            acct = follower.mt5_account
+            try:
+                live_pos, live_ord, open_tickets = get_broker().call(
+                    follower, self._copied_on_follower, priority=Priority.COPY)
+            except Exception as exc:
+                logger.warning(f"CopySyncer reconcile skipped {acct}: {exc}")
+                continue
+            # Copies that filled on the follower belong to the position map,
+            # even before (or without) the master's order filling
+            for m_ticket in live_pos:
+                if self.pending_map.entry(m_ticket, acct) is not None:
+                    self.pending_map.remove(m_ticket, acct)
+            copied = live_pos.keys() | live_ord.keys()
+            actions: list[_Action] = []
+            repairs += self._reconcile_book(
+                self.copy_map, acct, live_pos, copied, open_tickets,
+                master_open, positions, actions, "open", "close")
+            repairs += self._reconcile_book(
+                self.pending_map, acct, live_ord, copied, open_tickets,
+                master_open, pending, actions, "place", "remove")
+            if actions:
+                self._apply_batch(master, follower, actions)
+
+        if self._fingerprint is None and not self._restored:
+            self._prev, self._prev_pending = current, pending
+            self._fingerprint = fingerprint
+        self.reconciles += 1
+        if settings.copy_reconcile_sec > 0:
+            self._next_reconcile = (time.monotonic()
+                                    + settings.copy_reconcile_sec)
+        logger.info(
+            f"CopySyncer: reconciled {len(followers)} follower(s), "
+            f"{repairs} repair(s) in {(time.perf_counter() - t0) * 1000:.0f}ms")
+        return repairs
+
+    def _reconcile_book(self, cmap: CopyMap, acct: int,
+                        live: dict[int, tuple[int, str]],
+                        copied: set[int], open_tickets: frozenset[int],
+                        master_open: set[int], master_book: dict,
+                        actions: list[_Action],
+                        open_kind: str, close_kind: str) -> int:
+        """Repair one follower's side of ``cmap``; queue broker actions.
+
+        ``live`` holds this book's copies, ``copied`` the master tickets
+        with a copy in either book, ``master_open`` both master books.
+        """
+        repairs = 0
+        mapped = cmap.for_account(acct)
+        for m_ticket, (f_ticket, symbol) in live.items():
+            if m_ticket not in master_open:
+                actions.append(_Action(
+                    close_kind, m_ticket, f_ticket=f_ticket,
+                    pending_copy=cmap is self.pending_map))
+                repairs += 1
+            elif mapped.get(m_ticket) != f_ticket:
+                cmap.put(m_ticket, acct, f_ticket, symbol)
+                repairs += 1
+        for m_ticket, f_ticket in mapped.items():
+            if m_ticket in live:
+                continue
+            if f_ticket in open_tickets:
+                # Still open, the broker only rewrote the copy comment
+                if m_ticket not in master_open:
+                    actions.append(_Action(
+                        close_kind, m_ticket, f_ticket=f_ticket,
+                        pending_copy=cmap is self.pending_map))
+                    repairs += 1
+                continue
+            if m_ticket not in master_open:
+                cmap.remove(m_ticket, acct)
+                repairs += 1
+            elif f_ticket:
+                cmap.put(m_ticket, acct, 0)
+                repairs += 1
+        for m_ticket, snap in master_book.items():
+            if m_ticket not in copied and self._should_copy(acct, snap):
+                # A late repair, not replication lag
+                if isinstance(snap, _PosSnap):
+                    snap = replace(snap, time_msc=0)
+                actions.append(_Action(open_kind, m_ticket, snap))
+                repairs += 1
+        return repairs
+
+    @staticmethod
+    def _copied_on_follower() -> tuple[dict[int, tuple[int, str]],
+                                       dict[int, tuple[int, str]],
+                                       frozenset[int]]:
+        """master ticket -> (ticket, symbol) of the logged-in follower's
+        copied positions and copied pending orders, plus every open
+        ticket (positions and orders, copy comment or not)."""
+        def copies(rows) -> dict[int, tuple[int, str]]:
+            out: dict[int, tuple[int, str]] = {}
+            for r in rows:
+                comment = getattr(r, "comment", "") or ""
+                if comment.startswith("copy-") and comment[5:].isdigit():
+                    out[int(comment[5:])] = (int(r.ticket), r.symbol)
+            return out
+        positions = mt5.positions_get() or ()
+        orders = mt5.orders_get() or ()
+        return (copies(positions), copies(orders),
+                frozenset(int(r.ticket) for r in (*positions, *orders)))
 
     # ------------------------------------------------------------------
-    # Modify SL/TP
+    # Per-follower batches
     # ------------------------------------------------------------------
 
-    def _modify_sltp_on_followers(self, master_ticket: int,
-                                  snap: _PosSnap) -> None:
-        mappings = get_follower_tickets_for_master(master_ticket)
-        for f_account, f_ticket in mappings:
+    def _plan(self, diff: _Diff, current: _Snapshot,
+              followers: list[UserAccount]) -> dict[int, list[_Action]]:
+        """Turn one master diff into an action list per follower account."""
+        batches: dict[int, list[_Action]] = {
+            f.mt5_account: [] for f in followers}
+
+        def mapped(kind: str, m_ticket: int, **kw) -> None:
+            for acct, f_ticket, pend in self._copies(m_ticket):
+                if acct in batches:
+                    batches[acct].append(_Action(
+                        kind, m_ticket, f_ticket=f_ticket, pending_copy=pend,
+                        **kw))
+
+        for i in diff.opened:
+            snap = current.snap(i)
+            for acct, actions in batches.items():
+                if self._should_copy(acct, snap):
+                    actions.append(_Action("open", snap.ticket, snap))
+        for tk in diff.closed:
+            self._sltp_due.pop(int(tk), None)
+            mapped("close", int(tk))
+        for i in diff.modified:
+            self._coalesce_sltp(current.snap(i))
+        for i, ratio in zip(diff.reduced, diff.reduced_ratio):
+            snap = current.snap(i)
+            mapped("partial", snap.ticket, snap=snap, ratio=float(ratio))
+        self._plan_due_sltp(batches)
+        return batches
+
+    def _copies(self, m_ticket: int) -> list[tuple[int, int, bool]]:
+        """(account, follower ticket, pending_copy) of a master ticket's
+        copies in both maps."""
+        return ([(a, t, False) for a, t in self.copy_map.followers(m_ticket)]
+                + [(a, t, True)
+                   for a, t in self.pending_map.followers(m_ticket)])
+
+    def _should_copy(self, acct: int, snap: _PosSnap | _PendSnap) -> bool:
+        """Not copied yet (e.g. before a restart) and tradable on ``acct``.
+
+        A master ticket maps to one copy across both maps: a pending copy
+        becomes the position copy when it fills.
+        """
+        if (self.copy_map.follower_ticket(snap.ticket, acct) is not None
+                or self.pending_map.follower_ticket(snap.ticket, acct)
+                is not None):
+            return False
+        retry_at = self._no_symbol.get((acct, snap.symbol))
+        return retry_at is None or retry_at <= time.monotonic()
+
+    def _coalesce_sltp(self, snap: _PosSnap) -> None:
+        """Hold a master SL/TP edit for the coalescing window (latest wins)."""
+        entry = self._sltp_due.get(snap.ticket)
+        if entry is not None:
+            entry[1] = snap
+            self.sltp_saved += len(self._copies(snap.ticket))
+            return
+        window = settings.copy_sltp_coalesce_ms / 1000.0
+        self._sltp_due[snap.ticket] = [time.monotonic() + window, snap]
+
+    def _plan_due_sltp(self, batches: dict[int, list[_Action]],
+                       flush: bool = False) -> None:
+        now = time.monotonic()
+        for tk, (due, snap) in list(self._sltp_due.items()):
+            if due > now and not flush:
+                continue
+            del self._sltp_due[tk]
+            for acct, f_ticket, pend in self._copies(tk):
+                if acct in batches:
+                    batches[acct].append(_Action(
+                        "sltp", tk, snap, f_ticket=f_ticket,
+                        pending_copy=pend))
+
+    def _plan_pending(self, pdiff: _PendingDiff, filled: set[int],
+                      batches: dict[int, list[_Action]]) -> None:
+        """Add the pending-order mirror actions to each follower's batch."""
+        for ps in pdiff.placed:
+            for acct, actions in batches.items():
+                if self._should_copy(acct, ps):
+                    actions.append(_Action("place", ps.ticket, ps))
+        for ps in pdiff.modified:
+            for acct, f_ticket in self.pending_map.followers(ps.ticket):
+                if acct in batches:
+                    batches[acct].append(_Action(
+                        "modify", ps.ticket, ps, f_ticket=f_ticket,
+                        pending_copy=True))
+        # Filled pendings keep their copies; the rest were cancelled or
+        # expired on the master (a copy that already filled is closed)
+        for tk in pdiff.gone:
+            if tk in filled:
+                continue
+            for acct, f_ticket, pend in self._copies(tk):
+                if acct in batches:
+                    batches[acct].append(_Action(
+                        "remove", tk, f_ticket=f_ticket, pending_copy=pend))
+
+    def _apply_batch(self, master: UserAccount, follower: UserAccount,
+                     actions: list[_Action]) -> None:
+        """Log into ``follower`` once and apply all of its actions."""
+        acct = follower.mt5_account
+        t0 = time.perf_counter()
+        try:
+            outcomes, fills = get_broker().call(
+                follower, self._run_batch, master, follower, actions,
+                priority=Priority.COPY)
+        except MT5LoginError:
+            logger.warning(f"CopySyncer: login failed for {acct}")
+            return
+        except Exception as exc:
+            logger.error(f"CopySyncer batch error for {acct}: {exc}")
+            return
+        elapsed = time.perf_counter() - t0
+        self.follower_sec.setdefault(acct, RollingStats()).add(elapsed)
+        logger.info(f"CopySyncer: {len(actions)} action(s) on {acct} "
+                    f"in {elapsed * 1000:.0f}ms")
+
+        for action, fill in zip(actions, fills):
+            self._record_lag(acct, action, fill)
+        if time.monotonic() - self._lag_saved_at >= _LAG_PERSIST_SEC:
+            self.save_lag_stats()
+
+        for action, outcome in zip(actions, outcomes):
+            if outcome == _NO_SYMBOL:
+                self._no_symbol[(acct, action.snap.symbol)] = (
+                    time.monotonic() + settings.symbol_cache_ttl_sec)
+            elif action.kind == "open" and outcome:
+                self.copy_map.put(action.master_ticket, acct, outcome,
+                                  action.snap.symbol)
+                cid = tracing.correlation_for(action.master_ticket)
+                if cid:
+                    tracing.record(cid, [("replicate", acct, elapsed)])
+            elif (action.kind in ("close", "remove") and outcome
+                  or action.kind in ("partial", "modify")
+                  and outcome is False):
+                cmap = (self.pending_map if action.pending_copy
+                        else self.copy_map)
+                cmap.remove(action.master_ticket, acct)
+            elif action.kind == "place" and outcome:
+                self.pending_map.put(action.master_ticket, acct, outcome,
+                                     action.snap.symbol)
+
+    def _record_lag(self, acct: int, a: _Action,
+                    fill: tuple[int, float | None] | None) -> None:
+        if fill is None or a.kind not in _LAGGED:
+            return
+        done_msc, price = fill
+        if a.kind in ("open", "sltp"):
+            master_msc = a.snap.time_msc
+            master_price = a.snap.price_open if a.kind == "open" else 0.0
+        else:
+            master_msc, master_price = a.event_msc, a.event_price
+        if not master_msc:              # unknown master time (e.g. repair)
+            return
+        self.lag_ms.setdefault((acct, a.kind), RollingStats()).add(
+            max(done_msc - master_msc, 0))
+        if price and master_price:
+            self.price_diff.setdefault(acct, RollingStats()).add(
+                abs(price - master_price))
+
+    @classmethod
+    def _run_batch(cls, master: UserAccount, follower: UserAccount,
+                   actions: list[_Action]) -> tuple[list, list]:
+        """Apply actions on the logged-in follower; one outcome per action.
+
+        Master symbols are translated to the follower broker's names first.
+        Outcomes: follower ticket or None for "open" and "place" (or
+        ``_NO_SYMBOL`` if the broker does not offer the symbol), whether the
+        copy is gone for "close" and "remove", True once an "sltp" was
+        attempted, the alive flag for "partial" and "modify"; None on error.
+        ``fills`` holds (local epoch ms at TRADE_RETCODE_DONE, fill price or
+        None) per action, or None where nothing was done.
+        """
+        acct = follower.mt5_account
+        resolver = get_resolver(follower.mt5_server)
+        out: list = []
+        fills: list[tuple[int, float | None] | None] = []
+        for a in actions:
+            fill = None
             try:
-                self._login_follower(f_account)
-                request = {
-                    "action": mt5.TRADE_ACTION_SLTP,
-                    "position": f_ticket,
-                    "symbol": snap.symbol,
-                    "sl": snap.sl,
-                    "tp": snap.tp,
-                }
-                res = mt5.order_send(request)
-                if res and res.retcode == mt5.TRADE_RETCODE_DONE:
-                    logger.info(
-                        f"CopySyncer: SL/TP updated on {f_account} "
-                        f"pos={f_ticket}")
+                snap = a.snap
+                if snap is not None:
+                    symbol = resolver.translate(snap.symbol)
+                    if symbol is None and a.kind in ("open", "place"):
+                        out.append(_NO_SYMBOL)
+                        fills.append(None)
+                        continue
+                    if symbol and symbol != snap.symbol:
+                        snap = replace(snap, symbol=symbol)
+                if a.kind == "open":
+                    opened = cls._send_open(master, follower, snap)
+                    out.append(opened[0] if opened else None)
+                    fill = opened and opened[1]
+                elif a.kind in ("close", "remove"):
+                    gone, fill = cls._close_position(a.f_ticket, acct)
+                    out.append(gone)
+                elif a.kind == "sltp":
+                    fill = cls._send_sltp(acct, a.f_ticket, snap,
+                                          a.pending_copy) or None
+                    out.append(True)
+                elif a.kind == "place":
+                    out.append(cls._send_pending(master, follower, snap))
+                elif a.kind == "modify":
+                    out.append(cls._send_pending_modify(
+                        acct, a.f_ticket, snap))
                 else:
-                    data = (res._asdict() if res and hasattr(res, "_asdict")
-                            else mt5.last_error())
-                    logger.warning(
-                        f"CopySyncer SLTP fail {f_account}/{f_ticket}: {data}")
+                    alive, fill = cls._send_partial_close(
+                        acct, a.f_ticket, snap, a.ratio)
+                    out.append(alive)
             except Exception as exc:
-                logger.error(
-                    f"CopySyncer SLTP error {f_account}/{f_ticket}: {exc}")
+                logger.error(f"CopySyncer {a.kind} error "
+                             f"{acct}/{a.f_ticket or a.master_ticket}: {exc}")
+                out.append(None)
+            # sltp reports True (no price); the others a fill price
+            fills.append(None if fill is None else (
+                int(time.time() * 1000),
+                None if fill is True else float(fill)))
+        return out, fills
 
     # ------------------------------------------------------------------
-    # Full close
+    # Open
     # ------------------------------------------------------------------
 
-    def _close_on_followers(self, master_ticket: int) -> None:
-        mappings = get_follower_tickets_for_master(master_ticket)
-        for f_account, f_ticket in mappings:
-            try:
-                self._login_follower(f_account)
-                self._close_position(f_ticket, f_account)
-                delete_copy_map(master_ticket, f_account)
-            except Exception as exc:
-                logger.error(
-                    f"CopySyncer close error {f_account}/{f_ticket}: {exc}")
-        delete_copy_map_by_master(master_ticket)
+    @classmethod
+    def _send_open(cls, master: UserAccount,
+                   follower: UserAccount, snap: _PosSnap
+                   ) -> tuple[int, float] | None:
+        """Open the copy on the logged-in follower; return (ticket, price)."""
+        volume = cls._follower_volume(master, follower, snap.volume,
+                                      snap.symbol)
+        if volume <= 0:
+            return None
+
+        side_buy = snap.pos_type == int(mt5.POSITION_TYPE_BUY)
+        tick = symbol_tick(snap.symbol)
+        if not tick:
+            logger.warning(f"CopySyncer: no tick for {snap.symbol}")
+            return None
+
+        request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": snap.symbol,
+            "volume": volume,
+            "type": mt5.ORDER_TYPE_BUY if side_buy else mt5.ORDER_TYPE_SELL,
+            "price": tick.ask if side_buy else tick.bid,
+            "sl": snap.sl,
+            "tp": snap.tp,
+            "deviation": follower.max_slippage,
+            "magic": settings.magic_number,
+            "comment": f"copy-{snap.ticket}"[:30],
+            "type_time": mt5.ORDER_TIME_GTC,
+        }
+
+        res = mt5.order_send(request)
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: opened {snap.symbol} on "
+                f"{follower.mt5_account} ticket={res.order}")
+            return int(res.order), float(res.price or request["price"])
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer open failed on {follower.mt5_account}: {data}")
+        return None
+
+    # ------------------------------------------------------------------
+    # Pending orders
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _send_pending(cls, master: UserAccount, follower: UserAccount,
+                      ps: _PendSnap) -> int | None:
+        """Place the pending copy on the logged-in follower; return its ticket."""
+        volume = cls._follower_volume(master, follower, ps.volume, ps.symbol)
+        if volume <= 0:
+            return None
+        request = {
+            "action": mt5.TRADE_ACTION_PENDING,
+            "symbol": ps.symbol,
+            "volume": volume,
+            "type": ps.order_type,
+            "price": ps.price,
+            "sl": ps.sl,
+            "tp": ps.tp,
+            "deviation": follower.max_slippage,
+            "magic": settings.magic_number,
+            "comment": f"copy-{ps.ticket}"[:30],
+            "type_time": mt5.ORDER_TIME_GTC,
+        }
+        res = mt5.order_send(request)
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: placed pending {ps.symbol} @ {ps.price} on "
+                f"{follower.mt5_account} ticket={res.order}")
+            return int(res.order)
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer pending failed on {follower.mt5_account}: {data}")
+        return None
+
+    @staticmethod
+    def _send_pending_modify(f_account: int, f_ticket: int,
+                             ps: _PendSnap) -> bool:
+        """Move the follower pending to the master's levels; False if gone.
+
+        A copy that already filled on the follower is left alone (reconcile
+        moves it to the position map).
+        """
+        if not mt5.orders_get(ticket=f_ticket):
+            return bool(mt5.positions_get(ticket=f_ticket))
+        request = {
+            "action": mt5.TRADE_ACTION_MODIFY,
+            "order": f_ticket,
+            "symbol": ps.symbol,
+            "price": ps.price,
+            "sl": ps.sl,
+            "tp": ps.tp,
+            "type_time": mt5.ORDER_TIME_GTC,
+        }
+        res = mt5.order_send(request)
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: pending modified on {f_account} order={f_ticket}")
+        else:
+            data = (res._asdict() if res and hasattr(res, "_asdict")
+                    else mt5.last_error())
+            logger.warning(
+                f"CopySyncer pending modify fail {f_account}/{f_ticket}: {data}")
+        return True
+
+    @staticmethod
+    def _remove_pending(f_ticket: int, f_account: int) -> bool:
+        """Delete the follower pending; True once it is gone."""
+        if not mt5.orders_get(ticket=f_ticket):
+            logger.debug(
+                f"CopySyncer: order {f_ticket} already gone on {f_account}")
+            return True
+        res = mt5.order_send(
+            {"action": mt5.TRADE_ACTION_REMOVE, "order": f_ticket})
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: pending removed on {f_account} order={f_ticket}")
+            return True
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer pending remove fail {f_account}/{f_ticket}: {data}")
+        return False
+
+    # ------------------------------------------------------------------
+    # Modify SL/TP
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _send_sltp(f_account: int, f_ticket: int, snap: _PosSnap,
+                   pending_copy: bool = False) -> bool:
+        orders = mt5.orders_get(ticket=f_ticket) if pending_copy else None
+        if orders:
+            # The copy has not filled yet: move the order's SL/TP instead
+            request = {
+                "action": mt5.TRADE_ACTION_MODIFY,
+                "order": f_ticket,
+                "symbol": snap.symbol,
+                "price": float(orders[0].price_open),
+                "sl": snap.sl,
+                "tp": snap.tp,
+                "type_time": mt5.ORDER_TIME_GTC,
+            }
+        else:
+            request = {
+                "action": mt5.TRADE_ACTION_SLTP,
+                "position": f_ticket,
+                "symbol": snap.symbol,
+                "sl": snap.sl,
+                "tp": snap.tp,
+            }
+        res = mt5.order_send(request)
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: SL/TP updated on {f_account} "
+                f"pos={f_ticket}")
+            return True
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer SLTP fail {f_account}/{f_ticket}: {data}")
+        return False
 
     # ------------------------------------------------------------------
     # Partial close
     # ------------------------------------------------------------------
 
-    def _partial_close_on_followers(self, master_ticket: int,
-                                    snap: _PosSnap,
-                                    close_ratio: float) -> None:
-        mappings = get_follower_tickets_for_master(master_ticket)
-        for f_account, f_ticket in mappings:
-            try:
-                self._login_follower(f_account)
-
-                pos = self._get_position(f_ticket)
-                if not pos:
-                    delete_copy_map(master_ticket, f_account)
-                    continue
-
-                close_vol = self._round_volume(
-                    float(pos.volume) * close_ratio, snap.symbol)
-                if close_vol <= 0:
-                    continue
-
-                side_buy = int(pos.type) == int(mt5.POSITION_TYPE_BUY)
-                tick = mt5.symbol_info_tick(snap.symbol)
-                if not tick:
-                    continue
-
-                request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "position": f_ticket,
-                    "symbol": snap.symbol,
-                    "volume": close_vol,
-                    "type": (mt5.ORDER_TYPE_SELL if side_buy
-                             else mt5.ORDER_TYPE_BUY),
-                    "price": tick.bid if side_buy else tick.ask,
-                    "deviation": 20,
-                    "magic": settings.magic_number,
-                    "comment": "copy-partial"[:30],
-                    "type_time": mt5.ORDER_TIME_GTC,
-                }
-                res = mt5.order_send(request)
-                if res and res.retcode == mt5.TRADE_RETCODE_DONE:
-                    logger.info(
-                        f"CopySyncer: partial close {close_vol} on "
-                        f"{f_account} pos={f_ticket}")
-                else:
-                    data = (res._asdict() if res and hasattr(res, "_asdict")
-                            else mt5.last_error())
-                    logger.warning(
-                        f"CopySyncer partial close fail "
-                        f"{f_account}/{f_ticket}: {data}")
-            except Exception as exc:
-                logger.error(
-                    f"CopySyncer partial close error "
-                    f"{f_account}/{f_ticket}: {exc}")
+    @classmethod
+    def _send_partial_close(cls, f_account: int, f_ticket: int,
+                            snap: _PosSnap, close_ratio: float
+                            ) -> tuple[bool, float | None]:
+        """Close part of the follower copy.
+
+        Returns (copy still exists, fill price or None if nothing was done).
+        A copy that is still an unfilled pending order counts as existing, so
+        the master's later close reaches it.
+        """
+        pos = cls._get_position(f_ticket)
+        if not pos:
+            return bool(mt5.orders_get(ticket=f_ticket)), None
+
+        close_vol = cls._round_volume(
+            float(pos.volume) * close_ratio, snap.symbol)
+        if close_vol <= 0:
+            return True, None
+
+        side_buy = int(pos.type) == int(mt5.POSITION_TYPE_BUY)
+        tick = symbol_tick(snap.symbol)
+        if not tick:
+            return True, None
+
+        request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "position": f_ticket,
+            "symbol": snap.symbol,
+            "volume": close_vol,
+            "type": (mt5.ORDER_TYPE_SELL if side_buy
+                     else mt5.ORDER_TYPE_BUY),
+            "price": tick.bid if side_buy else tick.ask,
+            "deviation": 20,
+            "magic": settings.magic_number,
+            "comment": "copy-partial"[:30],
+            "type_time": mt5.ORDER_TIME_GTC,
+        }
+        res = mt5.order_send(request)
+        if res and res.retcode == mt5.TRADE_RETCODE_DONE:
+            logger.info(
+                f"CopySyncer: partial close {close_vol} on "
+                f"{f_account} pos={f_ticket}")
+            return True, float(res.price or request["price"])
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer partial close fail "
+            f"{f_account}/{f_ticket}: {data}")
+        return True, None
 
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
 
-    def _login_follower(self, follower_account: int) -> None:
-        """Login to a follower by looking up credentials from DB."""
-        followers = get_follower_users()
-        user = next(
-            (f for f in followers if f.mt5_account == follower_account), None)
-        if not user:
-            raise RuntimeError(
-                f"Follower {follower_account} not found in DB")
-        ensure_mt5(user.mt5_path)
-        if not mt5.login(user.mt5_account, user.mt5_password, user.mt5_server):
-            raise RuntimeError(
-                f"Login failed for follower {follower_account}")
-
     @staticmethod
     def _get_position(ticket: int):
         """Retrieve a single open position by ticket, or None."""
@@ -330,16 +1193,22 @@ class CopyTradeSyncer:
             return positions[0]
         return None
 
-    def _close_position(self, ticket: int, account: int) -> None:
-        pos = self._get_position(ticket)
+    @classmethod
+    def _close_position(cls, ticket: int, account: int
+                        ) -> tuple[bool, float | None]:
+        """Close a follower copy, or remove it while it is still a pending.
+
+        Returns (copy gone, fill price or None).
+        """
+        pos = cls._get_position(ticket)
         if not pos:
-            logger.debug(f"CopySyncer: pos {ticket} already closed on {account}")
-            return
+            # A mirrored pending that has not filled on the follower yet
+            return cls._remove_pending(ticket, account), None
 
         side_buy = int(pos.type) == int(mt5.POSITION_TYPE_BUY)
-        tick = mt5.symbol_info_tick(pos.symbol)
+        tick = symbol_tick(pos.symbol)
         if not tick:
-            return
+            return False, None
 
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
@@ -356,22 +1225,32 @@ class CopyTradeSyncer:
         res = mt5.order_send(request)
         if res and res.retcode == mt5.TRADE_RETCODE_DONE:
             logger.info(f"CopySyncer: closed pos {ticket} on {account}")
-        else:
-            data = (res._asdict() if res and hasattr(res, "_asdict")
-                    else mt5.last_error())
-            logger.warning(
-                f"CopySyncer close fail {account}/{ticket}: {data}")
+            return True, float(res.price or request["price"])
+        data = (res._asdict() if res and hasattr(res, "_asdict")
+                else mt5.last_error())
+        logger.warning(
+            f"CopySyncer close fail {account}/{ticket}: {data}")
+        return False, None
+
+    @classmethod
+    def _follower_volume(cls, master: UserAccount, follower: UserAccount,
+                         master_vol: float, symbol: str) -> float:
+        if follower.risk_mode == "fixed_lot":
+            return cls._round_volume(follower.fixed_lot, symbol)
+        return cls._scale_volume(master_vol, symbol, master.risk_per_trade,
+                                 follower.risk_per_trade)
 
-    def _scale_volume(self, master_vol: float, symbol: str,
+    @classmethod
+    def _scale_volume(cls, master_vol: float, symbol: str,
                       master_risk: float, follower_risk: float) -> float:
         if master_risk <= 0:
             return 0.0
         raw = master_vol * (follower_risk / master_risk)
-        return self._round_volume(raw, symbol)
+        return cls._round_volume(raw, symbol)
 
     @staticmethod
     def _round_volume(raw: float, symbol: str) -> float:
-        info = mt5.symbol_info(symbol)
+        info = symbol_info(symbol)
         if not info:
             return 0.0
         step = info.volume_step
@@ -1,7 +1,8 @@
-"""SQLite persistence for user accounts and copy-trade mappings."""
+"""SQLite persistence for user accounts, copy-trade and symbol mappings."""
 
 from __future__ import annotations
 
+import json
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -42,6 +43,57 @@ CREATE TABLE IF NOT EXISTS copy_map (
     UNIQUE(master_ticket, follower_account)
 );
 
+-- Master pending order -> follower pending order (same layout as copy_map)
+CREATE TABLE IF NOT EXISTS pending_map (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    master_ticket    INTEGER NOT NULL,
+    follower_account INTEGER NOT NULL,
+    follower_ticket  INTEGER NOT NULL,
+    symbol           TEXT,
+    created_at       TEXT,
+    UNIQUE(master_ticket, follower_account)
+);
+
+CREATE TABLE IF NOT EXISTS symbol_map (
+    server      TEXT    NOT NULL,
+    base        TEXT    NOT NULL,
+    symbol      TEXT    NOT NULL,
+    updated_at  TEXT,
+    PRIMARY KEY(server, base)
+);
+
+CREATE TABLE IF NOT EXISTS signal_traces (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    correlation_id  TEXT    NOT NULL,
+    stage           TEXT    NOT NULL,
+    account         INTEGER,
+    duration_ms     REAL    NOT NULL,
+    created_at      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_signal_traces_cid
+    ON signal_traces(correlation_id);
+
+-- Rolling copy-trade lag / fill price difference percentiles, one row per
+-- follower and metric (e.g. "open_lag_ms", "price_diff")
+CREATE TABLE IF NOT EXISTS replication_stats (
+    follower_account INTEGER NOT NULL,
+    metric           TEXT    NOT NULL,
+    count            INTEGER NOT NULL,
+    p50              REAL,
+    p95              REAL,
+    p99              REAL,
+    max              REAL,
+    updated_at       TEXT,
+    PRIMARY KEY (follower_account, metric)
+);
+
+-- Warm-restart state of the background services, one JSON document each
+CREATE TABLE IF NOT EXISTS service_checkpoints (
+    service     TEXT PRIMARY KEY,
+    state       TEXT NOT NULL,
+    updated_at  TEXT
+);
+
 CREATE TABLE IF NOT EXISTS traders (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     name        TEXT    NOT NULL UNIQUE,
@@ -246,67 +298,200 @@ def set_master(user_id: int, db_path: str | Path | None = None) -> None:
 # Copy-map CRUD
 # ------------------------------------------------------------------
 
-def upsert_copy_map(master_ticket: int, follower_account: int,
-                    follower_ticket: int, symbol: str = "",
-                    db_path: str | Path | None = None) -> None:
+_MAP_TABLES = ("copy_map", "pending_map")
+
+
+def list_copy_map(db_path: str | Path | None = None,
+                  table: str = "copy_map") -> list[tuple[int, int, int, str]]:
+    """Return every (master_ticket, follower_account, follower_ticket, symbol)
+    of ``copy_map`` or ``pending_map``."""
+    assert table in _MAP_TABLES, table
+    with _conn(db_path) as con:
+        rows = con.execute(
+            f"""SELECT master_ticket, follower_account, follower_ticket, symbol
+               FROM {table}"""
+        ).fetchall()
+    return [(r["master_ticket"], r["follower_account"], r["follower_ticket"],
+             r["symbol"] or "") for r in rows]
+
+
+def apply_copy_map_changes(upserts: list[tuple[int, int, int, str]],
+                           deletes: list[tuple[int, int]],
+                           db_path: str | Path | None = None,
+                           table: str = "copy_map") -> None:
+    """Apply a batch of upserts (master, account, ticket, symbol) and
+    deletes (master, account) in one transaction."""
+    assert table in _MAP_TABLES, table
     now = datetime.now(timezone.utc).isoformat()
     with _conn(db_path) as con:
-        con.execute(
-            """INSERT INTO copy_map
+        con.executemany(
+            f"DELETE FROM {table} WHERE master_ticket=? AND follower_account=?",
+            deletes,
+        )
+        con.executemany(
+            f"""INSERT INTO {table}
                (master_ticket, follower_account, follower_ticket, symbol, created_at)
                VALUES (?,?,?,?,?)
                ON CONFLICT(master_ticket, follower_account)
-               DO UPDATE SET follower_ticket=excluded.follower_ticket""",
-            (master_ticket, follower_account, follower_ticket, symbol, now),
+               DO UPDATE SET follower_ticket=excluded.follower_ticket,
+                             symbol=excluded.symbol""",
+            [(*u, now) for u in upserts],
         )
         con.commit()
 
 
-def get_follower_ticket(master_ticket: int, follower_account: int,
-                        db_path: str | Path | None = None) -> int | None:
+# ------------------------------------------------------------------
+# Symbol map (base symbol -> broker symbol, per server)
+# ------------------------------------------------------------------
+
+def get_symbol_map(server: str,
+                   db_path: str | Path | None = None) -> dict[str, str]:
+    with _conn(db_path) as con:
+        rows = con.execute(
+            "SELECT base, symbol FROM symbol_map WHERE server=?",
+            (server,),
+        ).fetchall()
+    return {r["base"]: r["symbol"] for r in rows}
+
+
+def upsert_symbol_map(server: str, base: str, symbol: str,
+                      db_path: str | Path | None = None) -> None:
+    now = datetime.now(timezone.utc).isoformat()
     with _conn(db_path) as con:
-        row = con.execute(
-            """SELECT follower_ticket FROM copy_map
-               WHERE master_ticket=? AND follower_account=?""",
-            (master_ticket, follower_account),
-        ).fetchone()
-    return int(row["follower_ticket"]) if row else None
+        con.execute(
+            """INSERT INTO symbol_map (server, base, symbol, updated_at)
+               VALUES (?,?,?,?)
+               ON CONFLICT(server, base)
+               DO UPDATE SET symbol=excluded.symbol,
+                             updated_at=excluded.updated_at""",
+            (server, base, symbol, now),
+        )
+        con.commit()
+
+
+def delete_symbol_map(server: str, base: str | None = None,
+                      db_path: str | Path | None = None) -> None:
+    with _conn(db_path) as con:
+        if base is None:
+            con.execute("DELETE FROM symbol_map WHERE server=?", (server,))
+        else:
+            con.execute(
+                "DELETE FROM symbol_map WHERE server=? AND base=?",
+                (server, base),
+            )
+        con.commit()
+
+
+# ------------------------------------------------------------------
+# Signal traces (rolling)
+# ------------------------------------------------------------------
+
+def add_trace_stages(rows: list[tuple[str, str, int | None, float]],
+                     keep: int,
+                     db_path: str | Path | None = None) -> None:
+    """Insert (correlation_id, stage, account, duration_ms) rows and keep
+    only the newest ``keep`` rows."""
+    now = datetime.now(timezone.utc).isoformat()
+    with _conn(db_path) as con:
+        con.executemany(
+            """INSERT INTO signal_traces
+               (correlation_id, stage, account, duration_ms, created_at)
+               VALUES (?,?,?,?,?)""",
+            [(*r, now) for r in rows],
+        )
+        con.execute(
+            """DELETE FROM signal_traces
+               WHERE id <= (SELECT MAX(id) FROM signal_traces) - ?""",
+            (keep,),
+        )
+        con.commit()
 
 
-def get_follower_tickets_for_master(
-        master_ticket: int,
-        db_path: str | Path | None = None,
-) -> list[tuple[int, int]]:
-    """Return list of (follower_account, follower_ticket) for a master ticket."""
+def get_trace_durations(
+        db_path: str | Path | None = None) -> dict[str, list[float]]:
+    """Return stage -> durations (ms) for every stored trace row."""
     with _conn(db_path) as con:
         rows = con.execute(
-            """SELECT follower_account, follower_ticket FROM copy_map
-               WHERE master_ticket=?""",
-            (master_ticket,),
+            "SELECT stage, duration_ms FROM signal_traces ORDER BY id"
         ).fetchall()
-    return [(r["follower_account"], r["follower_ticket"]) for r in rows]
+    out: dict[str, list[float]] = {}
+    for r in rows:
+        out.setdefault(r["stage"], []).append(float(r["duration_ms"]))
+    return out
 
 
-def delete_copy_map(master_ticket: int, follower_account: int,
-                    db_path: str | Path | None = None) -> None:
+def get_trace(correlation_id: str, db_path: str | Path | None = None
+              ) -> list[tuple[str, int | None, float]]:
+    """Return (stage, account, duration_ms) rows for one signal."""
     with _conn(db_path) as con:
-        con.execute(
-            "DELETE FROM copy_map WHERE master_ticket=? AND follower_account=?",
-            (master_ticket, follower_account),
+        rows = con.execute(
+            """SELECT stage, account, duration_ms FROM signal_traces
+               WHERE correlation_id=? ORDER BY id""",
+            (correlation_id,),
+        ).fetchall()
+    return [(r["stage"], r["account"], float(r["duration_ms"])) for r in rows]
+
+
+# ------------------------------------------------------------------
+# Replication stats
+# ------------------------------------------------------------------
+
+def upsert_replication_stats(
+        rows: list[tuple[int, str, int, float, float, float, float]],
+        db_path: str | Path | None = None) -> None:
+    """Store (account, metric, count, p50, p95, p99, max) summaries."""
+    now = datetime.now(timezone.utc).isoformat()
+    with _conn(db_path) as con:
+        con.executemany(
+            """INSERT INTO replication_stats
+               (follower_account, metric, count, p50, p95, p99, max, updated_at)
+               VALUES (?,?,?,?,?,?,?,?)
+               ON CONFLICT(follower_account, metric) DO UPDATE SET
+                 count=excluded.count, p50=excluded.p50, p95=excluded.p95,
+                 p99=excluded.p99, max=excluded.max,
+                 updated_at=excluded.updated_at""",
+            [(*r, now) for r in rows],
         )
         con.commit()
 
 
-def delete_copy_map_by_master(master_ticket: int,
-                              db_path: str | Path | None = None) -> None:
+def list_replication_stats(db_path: str | Path | None = None) -> list[dict]:
+    with _conn(db_path) as con:
+        rows = con.execute(
+            """SELECT * FROM replication_stats
+               ORDER BY follower_account, metric"""
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# ------------------------------------------------------------------
+# Service checkpoints
+# ------------------------------------------------------------------
+
+def put_checkpoint(service: str, state: dict,
+                   db_path: str | Path | None = None) -> None:
+    """Replace ``service``'s checkpoint with ``state`` (JSON-serializable)."""
+    now = datetime.now(timezone.utc).isoformat()
     with _conn(db_path) as con:
         con.execute(
-            "DELETE FROM copy_map WHERE master_ticket=?",
-            (master_ticket,),
+            """INSERT INTO service_checkpoints (service, state, updated_at)
+               VALUES (?,?,?)
+               ON CONFLICT(service) DO UPDATE SET
+                 state=excluded.state, updated_at=excluded.updated_at""",
+            (service, json.dumps(state, separators=(",", ":")), now),
         )
         con.commit()
 
 
+def get_checkpoint(service: str,
+                   db_path: str | Path | None = None) -> dict | None:
+    with _conn(db_path) as con:
+        row = con.execute(
+            "SELECT state FROM service_checkpoints WHERE service=?",
+            (service,)).fetchone()
+    return json.loads(row["state"]) if row else None
+
+
 # ------------------------------------------------------------------
 # Trader CRUD
 # ------------------------------------------------------------------
@@ -1,61 +1,123 @@
 # tradebot\infrastructure\mt5_engine.py
 
-from dataclasses import replace
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Sequence
 
 import MetaTrader5 as mt5
 from loguru import logger
 
+from tradebot.application.sizing import AccountSizing, SymbolSpec, volume_matrix
 from tradebot.domain.models import Order, OrderResult
 from tradebot.domain.ports import TradingEnginePort
-from ._mt5_symbol_resolver import SymbolResolver
+from ._mt5_symbol_resolver import SymbolResolver, get_resolver
 from ._magic import MagicGen
 from config import settings
 from .db import get_enabled_users, get_master_user, UserAccount
-from ._mt5_utils import ensure_mt5
+from ._mt5_utils import MT5LoginError, Priority, get_broker
+from ._mt5_cache import get_tick_cache, symbol_info
+from .tracing import StageTimer
 from .pending_expirer import (
     BOT_PENDING_COMMENT_PREFIX,
     MT5_ORDER_COMMENT_MAX_LEN,
 )
 
 
+@dataclass
+class _AccountBatch:
+    """Account/symbol metadata read once and reused by every leg of a batch."""
+    resolver: SymbolResolver
+    balance: float
+    # base symbol -> (broker symbol, selected ok, symbol_info)
+    symbols: dict[str, tuple[str, bool, Any]] = field(default_factory=dict)
+    # broker symbol -> (tick, its age, monotonic read time); sizing and
+    # pricing of every leg use the same tick
+    ticks: dict[str, tuple[Any, float, float]] = field(default_factory=dict)
+
+    def symbol(self, base: str) -> tuple[str, bool, Any]:
+        if base not in self.symbols:
+            symbol_mt = self.resolver.resolve(base)
+            selected = bool(mt5.symbol_select(symbol_mt, True))
+            if not selected:
+                self.resolver.forget(base)      # stale persisted mapping?
+            info = symbol_info(symbol_mt) if selected else None
+            self.symbols[base] = (symbol_mt, selected, info)
+        return self.symbols[base]
+
+    def tick(self, symbol_mt: str) -> tuple[Any, float]:
+        """``(tick, age in seconds)``, read from the tick cache once."""
+        if symbol_mt not in self.ticks:
+            tick, age = get_tick_cache().get_with_age(symbol_mt)
+            self.ticks[symbol_mt] = (tick, age, time.monotonic())
+        tick, age, read_at = self.ticks[symbol_mt]
+        return tick, age + time.monotonic() - read_at
+
+
 class MetaTraderEngine(TradingEnginePort):
     def __init__(self):
-        pass
+        # Called with (ticket, fill, correlation_id) for every master market
+        # fill, e.g. CopyTradeSyncer.push to replicate without a poll
+        self.on_master_fill: Callable[[int, dict, str], None] | None = None
 
     # ------------------------------------------------------------------
     def execute_order(self, order: Order) -> list[OrderResult]:
-        """Execute order on the master account (CopySyncer handles followers).
+        """Execute one order; thin wrapper around :meth:`execute_orders`."""
+        return self.execute_orders([order])[0]
+
+    def execute_orders(self, orders: Sequence[Order]) -> list[list[OrderResult]]:
+        """Execute all legs of a signal on the master account.
 
-        If no master is configured, falls back to executing on all enabled users.
+        CopySyncer handles followers.  If no master is configured, falls back
+        to executing on all enabled users.  Each account is logged into once
+        for the whole batch; ``result[i]`` holds one OrderResult per account
+        for ``orders[i]``.
         """
+        orders = list(orders)
+        results: list[list[OrderResult]] = [[] for _ in orders]
+        if not orders:
+            return results
+
         master = get_master_user()
         users = [master] if master else get_enabled_users()
-        results: list[OrderResult] = []
         for user in users:
+            logger.info(f"Executing {len(orders)} order(s) on account "
+                        f"{user.mt5_account} (mode={user.risk_mode})")
             try:
-                ensure_mt5(user.mt5_path)
-                if not mt5.login(user.mt5_account, user.mt5_password,
-                                 user.mt5_server):
-                    logger.warning(f"Login failed for account {user.mt5_account}")
-                    results.append(
-                        OrderResult(False, f"Login failed for {user.mt5_account}"))
-                    continue
-
-                if user.risk_mode == "fixed_lot":
-                    scaled = order
-                else:
-                    scaled = self._scale_order_risk(order, user.risk_per_trade)
-                logger.info(f"Executing order on account {user.mt5_account} "
-                            f"(mode={user.risk_mode})")
-                result = self._execute_for_user(scaled, user)
-                results.append(result)
+                per_leg = get_broker().call(
+                    user, self._execute_batch_for_user, orders, user,
+                    priority=Priority.ORDER)
+            except MT5LoginError as e:
+                logger.warning(str(e))
+                per_leg = [OrderResult(
+                    False, f"Login failed for {user.mt5_account}")] * len(orders)
             except Exception as e:
                 logger.error(
-                    f"Error executing order for account {user.mt5_account}: {e}")
-                results.append(
-                    OrderResult(False, f"Error for account {user.mt5_account}: {e}"))
+                    f"Error executing orders for account {user.mt5_account}: {e}")
+                per_leg = [OrderResult(
+                    False, f"Error for account {user.mt5_account}: {e}")] * len(orders)
+            for order, leg_results, res in zip(orders, results, per_leg):
+                leg_results.append(
+                    replace(res, correlation_id=order.correlation_id))
+            if master:
+                self._publish_fills(orders, per_leg)
         return results
 
+    def _publish_fills(self, orders: list[Order],
+                       per_leg: list[OrderResult]) -> None:
+        """Hand every filled master leg to ``on_master_fill``."""
+        if self.on_master_fill is None:
+            return
+        for order, res in zip(orders, per_leg):
+            data = res.data or {}
+            if not (res.success and data.get("fill") and data.get("order")):
+                continue
+            try:
+                self.on_master_fill(
+                    int(data["order"]), data["fill"], order.correlation_id)
+            except Exception as e:
+                logger.error(
+                    f"Replication intent for ticket {data['order']} failed: {e}")
+
     # ------------------------------------------------------------------
     @staticmethod
     def _scale_order_risk(order: Order, user_risk: float) -> Order:
@@ -67,23 +129,105 @@ class MetaTraderEngine(TradingEnginePort):
         return replace(order, risk=round(order.risk * scale, 6))
 
     # ------------------------------------------------------------------
-    def _execute_for_user(self, order: Order, user: UserAccount) -> OrderResult:
-        resolver = SymbolResolver(path=user.mt5_path)
-        symbol_mt = resolver.resolve(order.symbol)
-        if not mt5.symbol_select(symbol_mt, True):
+    @classmethod
+    def _execute_batch_for_user(cls, orders: list[Order],
+                                user: UserAccount) -> list[OrderResult]:
+        """Send every leg for one account; runs on the broker, logged in.
+
+        The first result's ``data["stages_ms"]`` carries the account-level
+        timings (login, resolve, sizing); every leg adds its ``send``.
+        """
+        timer = StageTimer()
+        timer.add("login", get_broker().last_switch_sec)
+        acc = mt5.account_info()
+        batch = _AccountBatch(
+            resolver=get_resolver(user.mt5_server),
+            balance=acc.balance if acc else 0)
+        with timer("resolve"):
+            for base in dict.fromkeys(o.symbol for o in orders):
+                try:
+                    batch.symbol(base)
+                except Exception:
+                    pass                    # reported per leg below
+        with timer("sizing"):
+            volumes = cls._size_batch(orders, user, batch)
+
+        results: list[OrderResult] = []
+        for order, volume in zip(orders, volumes):
+            if user.risk_mode == "fixed_lot":
+                scaled = order
+            else:
+                scaled = cls._scale_order_risk(order, user.risk_per_trade)
+            try:
+                results.append(
+                    cls._execute_for_user(scaled, user, batch, volume))
+            except Exception as e:
+                logger.error(
+                    f"Error executing order for account {user.mt5_account}: {e}")
+                results.append(
+                    OrderResult(False, f"Error for account {user.mt5_account}: {e}"))
+
+        if results:
+            data = dict(results[0].data or {"account_id": user.mt5_account})
+            data["stages_ms"] = {**timer.as_ms(),
+                                 **data.get("stages_ms", {})}
+            results[0] = replace(results[0], data=data)
+        return results
+
+    @classmethod
+    def _size_batch(cls, orders: list[Order], user: UserAccount,
+                    batch: _AccountBatch) -> list[float | None]:
+        """Size every leg with one vectorized pass per symbol.
+
+        ``None`` marks legs left to the scalar path, which also reports
+        their error (unknown symbol, no tick, ...).
+        """
+        volumes: list[float | None] = [None] * len(orders)
+        by_symbol: dict[str, list[int]] = {}
+        for i, order in enumerate(orders):
+            by_symbol.setdefault(order.symbol, []).append(i)
+
+        account = AccountSizing.from_user(user, batch.balance)
+        for base, idx in by_symbol.items():
+            try:
+                symbol_mt, selected, sym_info = batch.symbol(base)
+                if not selected or sym_info is None:
+                    continue
+                legs = [orders[i] for i in idx]
+                tick, _ = batch.tick(symbol_mt)
+                stops = [cls._stop_distance(o, tick) for o in legs]
+                row = volume_matrix(
+                    [account], [o.risk for o in legs], stops,
+                    SymbolSpec.from_info(sym_info), settings.risk_per_trade)[0]
+            except Exception:
+                continue
+            for i, vol in zip(idx, row):
+                volumes[i] = float(vol)
+        return volumes
+
+    @classmethod
+    def _execute_for_user(cls, order: Order, user: UserAccount,
+                          batch: _AccountBatch,
+                          volume: float | None = None) -> OrderResult:
+        symbol_mt, selected, sym_info = batch.symbol(order.symbol)
+        if not selected:
             return OrderResult(False, f"cannot select {symbol_mt}")
 
-        if user.risk_mode == "fixed_lot":
-            volume = self._clamp_volume(user.fixed_lot, symbol_mt)
+        # The tick _size_batch sized with; pricing below reuses it
+        tick, tick_age = batch.tick(symbol_mt)
+
+        # Legs not sized by _size_batch fall back to the scalar formulas
+        if volume is None and user.risk_mode == "fixed_lot":
+            volume = cls._clamp_volume(user.fixed_lot, sym_info)
             logger.debug(f"Fixed lot mode — using {volume} lots for "
                          f"{user.mt5_account}")
-        else:
-            volume = self._calc_volume(order, symbol_mt)
+        elif volume is None:
+            volume = cls._calc_volume(order, tick, batch.balance, sym_info)
 
         if volume <= 0:
             return OrderResult(False, "volume calc returned 0")
 
-        bid, ask = self._current_prices(symbol_mt)
+        bid, ask = cls._current_prices(tick, symbol_mt)
 
         if order.order_type == "limit":
             action = mt5.TRADE_ACTION_PENDING
@@ -136,36 +280,50 @@ class MetaTraderEngine(TradingEnginePort):
         )
         logger.debug(f"Sending MT5 request: {request}")
 
+        t0 = time.perf_counter()
         res = mt5.order_send(request)
+        send_ms = round((time.perf_counter() - t0) * 1000.0, 3)
         data = res._asdict() if res and hasattr(res, "_asdict") else None
         if isinstance(data, dict):
             data["account_id"] = user.mt5_account
+            data["stages_ms"] = {"send": send_ms}
+            data["tick_age_ms"] = round(tick_age * 1000.0, 1)
+            data["tick_time_msc"] = getattr(tick, "time_msc", None)
 
         if res and res.retcode == mt5.TRADE_RETCODE_DONE:
             logger.info(f"Order sent OK — ticket {res.order}")
+            if action == mt5.TRADE_ACTION_DEAL and isinstance(data, dict):
+                # What a follower needs to copy the resulting position
+                data["fill"] = dict(
+                    symbol=symbol_mt,
+                    type=int(mt5.POSITION_TYPE_BUY if order.side == "buy"
+                             else mt5.POSITION_TYPE_SELL),
+                    volume=float(getattr(res, "volume", 0) or volume),
+                    price=float(getattr(res, "price", 0) or price),
+                    sl=float(order.sl or 0), tp=float(order.tp or 0),
+                    time_msc=int(time.time() * 1000))
             return OrderResult(True, "executed", data=data)
 
         logger.error(f"Order failed: {data} | last_error: {mt5.last_error()}")
         return OrderResult(False, "mt5 error", data=data)
 
     # ------------------------------------------------------------------
-    def _current_order_price(self, order: Order, symbol_mt: str) -> float:
-        tick = mt5.symbol_info_tick(symbol_mt)
+    @staticmethod
+    def _current_order_price(order: Order, tick) -> float:
         if not tick:
-            raise RuntimeError(f"No tick for {symbol_mt}")
+            raise RuntimeError(f"No tick for {order.symbol}")
         return tick.ask if order.side == "buy" else tick.bid
 
-    def _current_prices(self, symbol_mt: str) -> tuple[float, float]:
-        tick = mt5.symbol_info_tick(symbol_mt)
+    @staticmethod
+    def _current_prices(tick, symbol_mt: str) -> tuple[float, float]:
         if not tick:
             raise RuntimeError(f"No tick for {symbol_mt}")
         return tick.bid, tick.ask
 
     # ------------------------------------------------------------------
     @staticmethod
-    def _clamp_volume(desired: float, symbol_mt: str) -> float:
+    def _clamp_volume(desired: float, sym_info) -> float:
         """Clamp a raw lot size to the symbol's step/min/max constraints."""
-        sym_info = mt5.symbol_info(symbol_mt)
         if sym_info is None:
             return 0.0
         step = sym_info.volume_step
@@ -174,19 +332,26 @@ class MetaTraderEngine(TradingEnginePort):
         vol = min(vol, sym_info.volume_max)
         return round(vol, 8)
 
+    @classmethod
+    def _stop_distance(cls, order: Order, tick) -> float:
+        """``|entry - sl|`` in price units (0 without SL)."""
+        if not order.sl:
+            return 0.0
+        entry = order.price or cls._current_order_price(order, tick)
+        return abs(entry - order.sl)
+
     # ------------------------------------------------------------------
-    def _calc_volume(self, order: Order, symbol_mt: str) -> float:
+    @classmethod
+    def _calc_volume(cls, order: Order, tick, balance: float,
+                     sym_info) -> float:
         """
         Convert risk (percent of balance) into lots.
         volume = (risk_money) / (monetary_value_per_point * stop_distance_points)
         """
 
-        acc = mt5.account_info()
-        balance = acc.balance if acc else 0
         if balance == 0:
             return 0
 
-        sym_info = mt5.symbol_info(symbol_mt)
         if sym_info is None:
             return 0
 
@@ -195,7 +360,7 @@ class MetaTraderEngine(TradingEnginePort):
 
         if order.sl:
             stop_distance = abs(
-                (order.price or self._current_order_price(order, symbol_mt))
+                (order.price or cls._current_order_price(order, tick))
                 - order.sl
             ) / sym_info.point
         else:
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import sqlite3
 import threading
 import time
 from datetime import datetime
@@ -10,13 +11,20 @@ import MetaTrader5 as mt5
 from loguru import logger
 
 from config import settings
-from .db import get_enabled_users
-from ._mt5_utils import ensure_mt5
+from .db import get_checkpoint, get_enabled_users, put_checkpoint
+from ._cadence import AdaptiveCadence, run_adaptive
+from ._expiring import ExpiringDict
+from ._mt5_utils import MT5LoginError, Priority, get_broker
+from ._mt5_cache import server_now_epoch
 
 # Bot pending orders are tagged so we never cancel manual pendings.
 BOT_PENDING_COMMENT_PREFIX = "TT|"
 MT5_ORDER_COMMENT_MAX_LEN = 31
 
+_FIRST_SEEN_TTL_SEC = 86400.0
+_MAX_FIRST_SEEN = 50_000
+_CHECKPOINT = "pending_expirer"
+
 
 def _pending_types() -> set[int]:
     types = []
@@ -56,33 +64,26 @@ def _order_setup_epoch(ord_) -> float | None:
     return None
 
 
-def _server_now_epoch() -> float | None:
-    """Best-effort current broker/server Unix seconds from MT5 tick stream."""
-    tick = mt5.symbol_info_tick("XAUUSD")
-    if tick:
-        t = getattr(tick, "time", None)
-        if isinstance(t, (int, float)) and float(t) > 0:
-            return float(t)
-        tm = getattr(tick, "time_msc", None)
-        if isinstance(tm, (int, float)) and float(tm) > 0:
-            return float(tm) / 1000.0
-    return None
-
-
 class PendingOrderExpirer:
     """Remove unfilled pending orders older than each user's configured minutes."""
 
-    def __init__(self, interval_sec: int = 30):
-        self.interval_sec = interval_sec
+    def __init__(self, interval_sec: float | None = None):
+        # Idle interval; after activity polls speed up to poll_min_sec
+        self.interval_sec = interval_sec or settings.poll_max_sec
+        self.cadence = AdaptiveCadence(
+            min(settings.poll_min_sec, self.interval_sec), self.interval_sec)
         self._stop = threading.Event()
         self._worker: threading.Thread | None = None
-        # When MT5 omits time_setup, age from first time this process saw the order
-        self._first_seen: dict[tuple[int, int], float] = {}
+        # When MT5 omits time_setup, age from first time this process saw the
+        # order; (account, ticket) -> first seen, stamped when last observed
+        self._first_seen = ExpiringDict(_MAX_FIRST_SEEN, resolution=60.0)
+        self._checkpoint_at = time.monotonic()
 
     def start(self) -> None:
         if self._worker and self._worker.is_alive():
             return
         self._stop.clear()
+        self.restore()
         self._worker = threading.Thread(
             target=self._loop, name="pending-order-expirer", daemon=True)
         self._worker.start()
@@ -90,105 +91,172 @@ class PendingOrderExpirer:
 
     def stop(self) -> None:
         self._stop.set()
+        self.cadence.wake()
         if self._worker and self._worker.is_alive():
             self._worker.join(timeout=max(self.interval_sec, 2))
-        logger.info("Pending order expirer stopped")
+        self.checkpoint()
+        logger.info(f"Pending order expirer stopped — loop stats "
+                    f"{self.cadence.stats()}, first-seen "
+                    f"{self._first_seen.stats()}")
+
+    def poke(self) -> None:
+        """Check pendings promptly (a signal was just executed)."""
+        self.cadence.poke()
 
     def _loop(self) -> None:
-        while not self._stop.is_set():
-            try:
-                self.run_once()
-            except Exception as exc:
-                logger.error(f"Pending expirer loop error: {exc}")
-            self._stop.wait(self.interval_sec)
+        run_adaptive(self.run_once, self.cadence, self._stop,
+                     lambda exc: logger.error(f"Pending expirer loop error: {exc}"))
 
-    def run_once(self) -> None:
+    def run_once(self) -> bool:
+        """Expire once; return True if any pending order was removed."""
         dbp = settings.db_path
         local_now = time.time()
+        removed = 0
+        # Accounts no longer visited (disabled, limit 0) age out here
+        self._first_seen.evict_before(local_now - _FIRST_SEEN_TTL_SEC)
         for user in get_enabled_users(dbp):
             limit_min = int(getattr(user, "pending_expire_minutes", 0) or 0)
             if limit_min <= 0:
                 continue
 
-            max_age_sec = float(limit_min * 60)
-            ensure_mt5(user.mt5_path)
-            if not mt5.login(
-                    user.mt5_account, user.mt5_password, user.mt5_server):
+            acct = int(user.mt5_account)
+            seen = {t: ts for (a, t), ts in self._first_seen.items()
+                    if a == acct}
+            try:
+                seen, n = get_broker().call(
+                    user, self._expire_for_user, user, limit_min, local_now,
+                    seen, priority=Priority.HOUSEKEEPING)
+            except MT5LoginError:
                 logger.warning(
                     f"Pending expirer: login failed for {user.mt5_account}")
                 continue
 
-            server_now = _server_now_epoch()
-            now = server_now if server_now is not None else local_now
-
-            orders = mt5.orders_get() or []
-            live_keys: set[tuple[int, int]] = set()
-            for ord_ in orders:
-                otype = int(getattr(ord_, "type", -1))
-                if otype not in _PENDING_TYPES:
-                    continue
-                comment = (getattr(ord_, "comment", "") or "").strip()
-                if not comment.startswith(BOT_PENDING_COMMENT_PREFIX):
-                    continue
-
-                ticket = int(getattr(ord_, "ticket", 0))
-                acct = int(user.mt5_account)
-                key = (acct, ticket)
-                live_keys.add(key)
-
-                setup_epoch = _order_setup_epoch(ord_)
-                if setup_epoch is not None and setup_epoch > 0:
-                    self._first_seen.pop(key, None)
-                    age = now - setup_epoch
-                    setup_src = "time_setup"
-                else:
-                    if key not in self._first_seen:
-                        self._first_seen[key] = now
-                        logger.debug(
-                            f"Pending expirer: order {ticket} has no usable "
-                            f"time_setup — ageing from first bot observation")
-                    age = now - self._first_seen[key]
-                    setup_src = "first_seen"
+            # Entries for orders that are gone or filled are not returned
+            for k, _ in self._first_seen.items():
+                if k[0] == acct:
+                    self._first_seen.pop(k)
+            for t, ts in seen.items():
+                self._first_seen.put((acct, t), ts, stamp=local_now)
+            removed += n
 
-                logger.debug(
-                    f"Pending expirer: ticket={ticket} account={acct} "
-                    f"comment='{comment}' age_min={age/60:.2f} "
-                    f"limit_min={limit_min} source={setup_src}")
-                if setup_src == "time_setup" and server_now is not None:
-                    skew = server_now - local_now
-                    if abs(skew) > 120:
-                        logger.debug(
-                            f"Pending expirer: using server time due to local skew "
-                            f"{skew/60:.1f} min")
-
-                if age < max_age_sec:
+        if (settings.checkpoint_sec > 0 and time.monotonic()
+                - self._checkpoint_at >= settings.checkpoint_sec):
+            self.checkpoint()
+        return removed > 0
+
+    def checkpoint(self) -> None:
+        """Persist first-seen times so restarts keep ageing those orders."""
+        self._checkpoint_at = time.monotonic()
+        if settings.checkpoint_sec <= 0:
+            return
+        state = {"first_seen": [[a, t, ts] for (a, t), ts
+                                in self._first_seen.items()]}
+        try:
+            put_checkpoint(_CHECKPOINT, state, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"Pending expirer: checkpoint not saved: {e}")
+
+    def restore(self) -> int:
+        """Load first-seen times from the last checkpoint; return the count."""
+        if settings.checkpoint_sec <= 0:
+            return 0
+        try:
+            state = get_checkpoint(_CHECKPOINT, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"Pending expirer: checkpoint not loaded: {e}")
+            return 0
+        rows = (state or {}).get("first_seen", [])
+        now = time.time()
+        for acct, ticket, ts in rows:
+            self._first_seen.put((acct, ticket), ts, stamp=now)
+        if rows:
+            logger.info(f"Pending expirer: resumed {len(rows)} first-seen "
+                        f"order time(s) from checkpoint")
+        return len(rows)
+
+    @staticmethod
+    def _expire_for_user(user, limit_min: int, local_now: float,
+                         first_seen: dict[int, float]
+                         ) -> tuple[dict[int, float], int]:
+        """Remove one account's stale bot pendings; runs on the broker.
+
+        ``first_seen`` maps ticket -> first observation for orders without a
+        usable ``time_setup``; returns the updated map for live orders and
+        the number of orders removed.
+        """
+        first_seen = dict(first_seen)
+        removed = 0
+        max_age_sec = float(limit_min * 60)
+        server_now = server_now_epoch()
+        now = server_now if server_now is not None else local_now
+
+        orders = mt5.orders_get() or []
+        live_keys: set[int] = set()
+        for ord_ in orders:
+            otype = int(getattr(ord_, "type", -1))
+            if otype not in _PENDING_TYPES:
+                continue
+            comment = (getattr(ord_, "comment", "") or "").strip()
+            if not comment.startswith(BOT_PENDING_COMMENT_PREFIX):
+                continue
+
+            ticket = int(getattr(ord_, "ticket", 0))
+            acct = int(user.mt5_account)
+            live_keys.add(ticket)
+
+            setup_epoch = _order_setup_epoch(ord_)
+            if setup_epoch is not None and setup_epoch > 0:
+                first_seen.pop(ticket, None)
+                age = now - setup_epoch
+                setup_src = "time_setup"
+            else:
+                if ticket not in first_seen:
+                    first_seen[ticket] = now
                     logger.debug(
-                        f"Pending expirer: keep order {ticket} "
-                        f"(age {age/60:.2f}m < {limit_min}m)")
-                    continue
-
-                symbol = getattr(ord_, "symbol", "") or ""
-                req = {
-                    "action": mt5.TRADE_ACTION_REMOVE,
-                    "order": ticket,
-                    "symbol": symbol,
-                }
-                res = mt5.order_send(req)
-                if res and int(res.retcode) == int(mt5.TRADE_RETCODE_DONE):
-                    self._first_seen.pop(key, None)
-                    logger.info(
-                        f"Pending expirer: removed order {ticket} {symbol} "
-                        f"(age {age/60:.1f} min ≥ {limit_min} min) "
-                        f"account {acct}")
-                else:
-                    logger.warning(
-                        f"Pending expirer: failed remove {ticket} "
-                        f"account {acct}: "
-                        f"{res._asdict() if res and hasattr(res, '_asdict') else mt5.last_error()}"
-                    )
-
-            # Drop stale first-seen entries (order gone or filled)
-            stale = [k for k in self._first_seen if k[0] == user.mt5_account
-                     and k not in live_keys]
-            for k in stale:
-                self._first_seen.pop(k, None)
+                        f"Pending expirer: order {ticket} has no usable "
+                        f"time_setup — ageing from first bot observation")
+                age = now - first_seen[ticket]
+                setup_src = "first_seen"
+
+            logger.debug(
+                f"Pending expirer: ticket={ticket} account={acct} "
+                f"comment='{comment}' age_min={age/60:.2f} "
+                f"limit_min={limit_min} source={setup_src}")
+            if setup_src == "time_setup" and server_now is not None:
+                skew = server_now - local_now
+                if abs(skew) > 120:
+                    logger.debug(
+                        f"Pending expirer: using server time due to local skew "
+                        f"{skew/60:.1f} min")
+
+            if age < max_age_sec:
+                logger.debug(
+                    f"Pending expirer: keep order {ticket} "
+                    f"(age {age/60:.2f}m < {limit_min}m)")
+                continue
+
+            symbol = getattr(ord_, "symbol", "") or ""
+            req = {
+                "action": mt5.TRADE_ACTION_REMOVE,
+                "order": ticket,
+                "symbol": symbol,
+            }
+            res = mt5.order_send(req)
+            if res and int(res.retcode) == int(mt5.TRADE_RETCODE_DONE):
+                first_seen.pop(ticket, None)
+                removed += 1
+                logger.info(
+                    f"Pending expirer: removed order {ticket} {symbol} "
+                    f"(age {age/60:.1f} min ≥ {limit_min} min) "
+                    f"account {acct}")
+            else:
+                logger.warning(
+                    f"Pending expirer: failed remove {ticket} "
+                    f"account {acct}: "
+                    f"{res._asdict() if res and hasattr(res, '_asdict') else mt5.last_error()}"
+                )
+
+        # Drop stale first-seen entries (order gone or filled)
+        return ({t: ts for t, ts in first_seen.items() if t in live_keys},
+                removed)
+
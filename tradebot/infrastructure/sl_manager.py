@@ -1,33 +1,63 @@
 from __future__ import annotations
 
 import re
+import sqlite3
 import threading
 import time as time_mod
+from bisect import bisect_right
 from datetime import datetime
+from typing import NamedTuple
 
 import MetaTrader5 as mt5
 from loguru import logger
 
 from config import settings
-from .db import get_enabled_users, get_master_user
-from ._mt5_utils import ensure_mt5
+from .db import (
+    get_checkpoint, get_enabled_users, get_master_user, put_checkpoint,
+)
+from ._cadence import AdaptiveCadence, run_adaptive
+from ._expiring import ExpiringDict
+from ._metrics import RollingStats
+from ._mt5_utils import MT5LoginError, Priority, get_broker
+from ._mt5_cache import server_now_epoch, symbol_info, symbol_tick
 
 
 _COMMENT_RX = re.compile(
     r"(?P<prefix>.+?)\s+(?P<idx>\d+)of(?P<total>\d+)", re.I)
 
-
-def _server_now_epoch() -> float | None:
-    """Current broker/server Unix seconds from tick stream, if available."""
-    tick = mt5.symbol_info_tick("XAUUSD")
-    if tick:
-        t = getattr(tick, "time", None)
-        if isinstance(t, (int, float)) and float(t) > 0:
-            return float(t)
-        tm = getattr(tick, "time_msc", None)
-        if isinstance(tm, (int, float)) and float(tm) > 0:
-            return float(tm) / 1000.0
-    return None
+_SCAN_WINDOW_SEC = 86400 * 30
+_MAX_PROCESSED_DEALS = 200_000
+_MAX_LEGS = 100_000
+# history_deals_total is not trusted forever: fetch anyway after this many
+# skipped scans of one account
+_FORCE_FETCH_SCANS = 10
+# TP deals whose SL update keeps failing (e.g. stops level) are retried from
+# a side set this many scans, so the watermark never waits on them
+_TP_RETRY_SCANS = 60
+_MAX_TP_RETRIES = 1_000
+_CHECKPOINT = "sl_manager"
+
+
+class _DealRow(NamedTuple):
+    """The deal fields the SL manager needs (cheap to ship between processes)."""
+    time: int
+    ticket: int
+    entry: int
+    reason: int
+    type: int
+    position_id: int
+    symbol: str
+    price: float
+    profit: float
+    comment: str
+
+    @classmethod
+    def from_deal(cls, d) -> "_DealRow":
+        return cls(int(d.time), int(d.ticket), int(getattr(d, "entry", -1)),
+                   int(getattr(d, "reason", -1)), int(d.type),
+                   int(getattr(d, "position_id", 0) or 0), d.symbol,
+                   float(d.price), float(getattr(d, "profit", 0.0) or 0.0),
+                   getattr(d, "comment", "") or "")
 
 
 class SignalSLManager:
@@ -43,17 +73,39 @@ class SignalSLManager:
     alone.
     """
 
-    def __init__(self, interval_sec: int = 5):
-        self.interval_sec = interval_sec
+    def __init__(self, interval_sec: float | None = None):
+        # Idle interval; after activity scans speed up to poll_min_sec
+        self.interval_sec = interval_sec or settings.sl_poll_max_sec
+        self.cadence = AdaptiveCadence(
+            min(settings.poll_min_sec, self.interval_sec), self.interval_sec)
         self._stop_event = threading.Event()
         self._worker: threading.Thread | None = None
-        self._processed_tp_deals: set[tuple[int, int]] = set()
-        self._bootstrapped_accounts: set[int] = set()
+        # (account, deal ticket) -> deal time of handled TP deals; entries
+        # leave with the 30-day scan window
+        self._processed_tp_deals = ExpiringDict(_MAX_PROCESSED_DEALS)
+        # account -> (deal time, deal ticket, deals seen at that second)
+        self._watermarks: dict[int, tuple[int, int, int]] = {}
+        # account -> scans skipped in a row on an unchanged deal count
+        self._skipped: dict[int, int] = {}
+        # (account, deal ticket) -> (deal, leg, failed scans) of TP deals
+        # behind the watermark whose SL update did not go through yet
+        self._tp_retry = ExpiringDict(_MAX_TP_RETRIES)
+        # account -> {position id -> (prefix, k, N) or None}, learned from
+        # opening deals, open legs and pendings; spares close deals with a
+        # mutated comment a history_deals_get(position=...) each
+        self._legs: dict[int, ExpiringDict] = {}
+        self.scan_deals = RollingStats()      # deals fetched per account scan
+        self._checkpoint_at = time_mod.monotonic()
+        # start() -> first scan done, seconds (warm restarts skip the warm-up)
+        self._started_at: float | None = None
+        self.startup_sec: float | None = None
 
     def start(self) -> None:
         if self._worker and self._worker.is_alive():
             return
         self._stop_event.clear()
+        self._started_at = time_mod.perf_counter()
+        self.restore()
         self._worker = threading.Thread(
             target=self._loop, name="signal-sl-manager", daemon=True)
         self._worker.start()
@@ -61,28 +113,46 @@ class SignalSLManager:
 
     def stop(self) -> None:
         self._stop_event.set()
+        self.cadence.wake()
         if self._worker and self._worker.is_alive():
             self._worker.join(timeout=max(self.interval_sec, 2))
-        logger.info("Signal SL manager stopped")
+        self.checkpoint()
+        logger.info(f"Signal SL manager stopped — loop stats "
+                    f"{self.cadence.stats()}, deals per scan "
+                    f"{self.scan_deals.summary()}, processed deals "
+                    f"{self._processed_tp_deals.stats()}")
+
+    def poke(self) -> None:
+        """Scan promptly (a signal was executed or the master book moved)."""
+        self.cadence.poke()
 
     def _loop(self) -> None:
-        while not self._stop_event.is_set():
-            try:
-                self.run_once()
-            except Exception as exc:
-                logger.error(f"SL manager loop error: {exc}")
-            self._stop_event.wait(self.interval_sec)
+        run_adaptive(self.run_once, self.cadence, self._stop_event,
+                     lambda exc: logger.error(f"SL manager loop error: {exc}"))
 
     # ------------------------------------------------------------------
-    def run_once(self) -> None:
+    def run_once(self) -> bool:
+        """Scan once; return True if fresh TP deals were handled."""
         # MT5 often returns an empty list for timezone-aware UTC datetimes.
         # Integer Unix bounds match the terminal and populate deal history reliably.
+        dbp = settings.db_path
+        master = get_master_user(dbp)
+        users = [master] if master else get_enabled_users(dbp)
+        if not users:
+            return False
+
         local_now = time_mod.time()
-        server_now = _server_now_epoch()
+        try:
+            server_now = get_broker().call(
+                users[0], server_now_epoch, priority=Priority.SL)
+        except MT5LoginError:
+            server_now = None
         to_ts = int(server_now if server_now is not None else local_now)
-        fr_ts = to_ts - 86400 * 30
-        na_to = datetime.fromtimestamp(to_ts)
-        na_fr = datetime.fromtimestamp(fr_ts)
+        floor_ts = to_ts - _SCAN_WINDOW_SEC
+        self._processed_tp_deals.evict_before(floor_ts)
+        self._tp_retry.evict_before(floor_ts)
+        for memo in self._legs.values():
+            memo.evict_before(floor_ts)
         if server_now is not None:
             skew = server_now - local_now
             if abs(skew) > 120:
@@ -90,100 +160,402 @@ class SignalSLManager:
                     f"SL Manager: using server time for history scan due to "
                     f"local skew {skew/60:.1f} min")
 
-        dbp = settings.db_path
-        master = get_master_user(dbp)
-        users = [master] if master else get_enabled_users(dbp)
-
+        active = False
         for user in users:
-            ensure_mt5(user.mt5_path)
-            if not mt5.login(user.mt5_account, user.mt5_password,
-                             user.mt5_server):
+            try:
+                active |= self._scan_account(user, floor_ts, to_ts)
+            except MT5LoginError:
                 logger.warning(
-                    f"SL manager login failed for account {user.mt5_account}")
-                continue
+                    f"SL manager login failed for {user.mt5_account}")
+
+        if self._started_at is not None:
+            self.startup_sec = time_mod.perf_counter() - self._started_at
+            self._started_at = None
+            logger.info(f"SL Manager: first scan done "
+                        f"{self.startup_sec * 1000:.0f}ms after start")
+        if (settings.checkpoint_sec > 0 and time_mod.monotonic()
+                - self._checkpoint_at >= settings.checkpoint_sec):
+            self.checkpoint()
+        return active
+
+    # ------------------------------------------------------------------
+    # Warm restart
+    # ------------------------------------------------------------------
 
-            history_select = getattr(mt5, "history_select", None)
-            if history_select is None:
-                if not SignalSLManager._logged_missing_history_select:
-                    SignalSLManager._logged_missing_history_select = True
-                    logger.info(
-                        "SL Manager: this MetaTrader5 build has no "
-                        "history_select(); using history_deals_get() only. "
-                        "Upgrade the 'MetaTrader5' pip package if deal scans "
-                        "are empty.")
-            elif not history_select(na_fr, na_to):
+    def checkpoint(self) -> None:
+        """Persist watermarks and the processed deals not behind them."""
+        self._checkpoint_at = time_mod.monotonic()
+        if settings.checkpoint_sec <= 0 or not self._watermarks:
+            return
+        marks = dict(self._watermarks)
+        state = {
+            "saved_at": time_mod.time(),
+            "watermarks": {str(a): list(m) for a, m in marks.items()},
+            "processed": [[a, t, when] for (a, t), when
+                          in self._processed_tp_deals.items()
+                          if a in marks and when >= marks[a][0]],
+            "legs": {str(a): list(memo.items())
+                     for a, memo in self._legs.items()},
+            "retry": [[a, list(d), list(leg), n] for (a, _), (d, leg, n)
+                      in self._tp_retry.items()],
+        }
+        try:
+            put_checkpoint(_CHECKPOINT, state, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"SL Manager: checkpoint not saved: {e}")
+
+    def restore(self) -> bool:
+        """Load the last checkpoint; True if the warm-up scan is skipped."""
+        if settings.checkpoint_sec <= 0:
+            return False
+        try:
+            state = get_checkpoint(_CHECKPOINT, settings.db_path)
+        except sqlite3.Error as e:
+            logger.warning(f"SL Manager: checkpoint not loaded: {e}")
+            return False
+        if not state:
+            return False
+        if time_mod.time() - float(state["saved_at"]) > _SCAN_WINDOW_SEC:
+            logger.info("SL Manager: checkpoint older than the scan window "
+                        "— running a full warm-up")
+            return False
+        for acct, mark in state["watermarks"].items():
+            self._watermarks[int(acct)] = tuple(int(v) for v in mark)
+        for acct, ticket, when in state["processed"]:
+            self._processed_tp_deals.put((acct, ticket), when, stamp=when)
+        for acct, rows in state.get("legs", {}).items():
+            memo = self._legs.setdefault(int(acct), ExpiringDict(_MAX_LEGS))
+            for position_id, leg in rows:
+                memo.put(position_id, tuple(leg) if leg else None,
+                         stamp=time_mod.time())
+        for acct, row, leg, attempts in state.get("retry", []):
+            deal = _DealRow(*row)
+            self._tp_retry.put((acct, deal.ticket),
+                               (deal, tuple(leg), attempts), stamp=deal.time)
+        logger.info(
+            f"SL Manager: resumed {len(self._watermarks)} account "
+            f"watermark(s) and {len(state['processed'])} processed deal(s) "
+            f"from checkpoint")
+        return True
+
+    # ------------------------------------------------------------------
+    def _scan_account(self, user, floor_ts: int, to_ts: int) -> bool:
+        """Handle one account's deals after its watermark.
+
+        Dedupe and leg lookups stay here; the broker jobs only fetch the
+        deals past the watermark, query history for unknown legs and send
+        the SL updates.  Return True if fresh TP deals were handled.
+        """
+        acct = user.mt5_account
+        mark = self._watermarks.get(acct)
+        is_bootstrap = mark is None
+        if mark is not None and mark[0] < floor_ts:
+            mark = (floor_ts, 0, 0)
+        fr_ts = mark[0] if mark else floor_ts
+        after = mark[:2] if mark else (-1, -1)
+        memo = self._legs.setdefault(acct, ExpiringDict(_MAX_LEGS))
+
+        skipped = self._skipped.get(acct, 0)
+        seen = (mark[2] if mark and skipped < _FORCE_FETCH_SCANS else None)
+        fresh, fetched = get_broker().call(
+            user, self._fetch_deals, user, fr_ts, to_ts, after, seen,
+            priority=Priority.SL)
+        self.scan_deals.add(fetched)
+        retry = [(d, leg) for (a, _), (d, leg, _n) in self._tp_retry.items()
+                 if a == acct]
+        if fresh is None:               # count unchanged, nothing fetched
+            self._skipped[acct] = skipped + 1
+            if not retry:
+                return False
+            fresh = []
+        else:
+            self._skipped[acct] = 0
+
+        entry_in = int(mt5.DEAL_ENTRY_IN)
+        for d in fresh:
+            if d.comment and d.entry == entry_in:
+                parsed = self._parse_comment(d.comment)
+                if parsed:
+                    memo.put(d.position_id, parsed, stamp=to_ts)
+        missing = sorted({
+            d.position_id for d in fresh
+            if d.position_id > 0 and d.position_id not in memo
+            and self._tp_like_close(d) and not self._parse_comment(d.comment)})
+        if missing:
+            for position_id, leg in get_broker().call(
+                    user, self._legs_from_history, missing,
+                    priority=Priority.SL).items():
+                memo.put(position_id, leg, stamp=to_ts)
+
+        closes = [(d, self._parse_multi_leg_tp_close(d, memo)) for d in fresh]
+        todo = [(d, leg) for d, leg in closes if leg is not None
+                and (acct, d.ticket) not in self._processed_tp_deals]
+        if is_bootstrap:
+            # Cold-start sync: mark historical TP deals as processed so we
+            # only act on fresh events after bot startup.
+            ok = {d.ticket: True for d, _ in todo}
+            logger.info(
+                f"SL Manager: warmup synced {len(todo)} historical TP "
+                f"deal(s) for account {acct}; now tracking new TP events only")
+        elif todo or retry:
+            todo = retry + todo
+            ok, open_legs = get_broker().call(
+                user, self._handle_tp_deals, user, todo, priority=Priority.SL)
+            for position_id, leg in open_legs.items():
+                memo.put(position_id, leg, stamp=to_ts)
+        else:
+            ok = {}
+
+        # The watermark moves past every fetched deal; TP deals still
+        # awaiting work wait in the retry set instead of being refetched
+        done = 0
+        for deal, leg in todo:
+            key = (acct, deal.ticket)
+            if ok.get(deal.ticket):
+                self._processed_tp_deals.put(key, deal.time, stamp=deal.time)
+                self._tp_retry.pop(key)
+                done += 1
+                continue
+            attempts = self._tp_retry.get(key, (None, None, 0))[2] + 1
+            if attempts >= _TP_RETRY_SCANS:
+                self._tp_retry.pop(key)
                 logger.warning(
-                    f"SL Manager: history_select failed for "
-                    f"{user.mt5_account} ({mt5.last_error()}) — "
-                    f"still trying history_deals_get")
-
-            deals = mt5.history_deals_get(fr_ts, to_ts) or []
-            if not deals:
-                deals = mt5.history_deals_get(na_fr, na_to) or []
-            if not deals:
-                try:
-                    deals = mt5.history_deals_get(fr_ts, to_ts, "*") or []
-                except TypeError:
-                    pass
-            if not deals:
-                logger.debug(
-                    f"SL Manager: no deals in selected window for "
-                    f"{user.mt5_account}")
-
-            tp_candidates = 0
-            is_bootstrap = user.mt5_account not in self._bootstrapped_accounts
-            bootstrap_added = 0
-            for deal in deals:
-                parsed_leg = self._parse_multi_leg_tp_close(deal)
-                if parsed_leg is None:
-                    continue
-                tp_candidates += 1
-                prefix, closed_k, total = parsed_leg
-                key = (user.mt5_account, int(deal.ticket))
-                if key in self._processed_tp_deals:
+                    f"SL Manager: giving up on TP deal {deal.ticket} of "
+                    f"account {acct} after {attempts} scans")
+            else:
+                self._tp_retry.put(key, (deal, leg, attempts),
+                                   stamp=deal.time)
+        if fresh:
+            new_time, new_ticket = fresh[-1].time, fresh[-1].ticket
+        else:
+            new_time, new_ticket = mark[:2] if mark else (to_ts, 0)
+        seen = sum(1 for d in fresh if d.time == new_time
+                   and d.ticket <= new_ticket)
+        if mark is not None and new_time == mark[0]:
+            seen += mark[2]
+        self._watermarks[acct] = (new_time, new_ticket, seen)
+
+        logger.debug(
+            f"SL Manager: scan summary account={acct} deals={fetched} "
+            f"new={len(fresh)} "
+            f"tp_candidates={sum(1 for _, leg in closes if leg)} "
+            f"processed={done}")
+        return done > 0 and not is_bootstrap
+
+    @classmethod
+    def _fetch_deals(cls, user, fr_ts: int, to_ts: int,
+                     after: tuple[int, int], seen: int | None
+                     ) -> tuple[list[_DealRow] | None, int]:
+        """Deals past ``after`` = (time, ticket); runs on the broker.
+
+        With ``seen`` (deals at the watermark second already handled) the
+        cheap ``history_deals_total`` may skip the fetch: only a positive
+        count equal to ``seen`` counts as "nothing new", since a zero or
+        short count can be a terminal hiccup.  None means no fetch was
+        needed.  Return (sorted new deals, deals fetched).
+        """
+        if seen:
+            total = mt5.history_deals_total(fr_ts, to_ts)
+            if total is not None and total == seen:
+                return None, 0
+
+        na_fr = datetime.fromtimestamp(fr_ts)
+        na_to = datetime.fromtimestamp(to_ts)
+        history_select = getattr(mt5, "history_select", None)
+        if history_select is None:
+            if not SignalSLManager._logged_missing_history_select:
+                SignalSLManager._logged_missing_history_select = True
+                logger.info(
+                    "SL Manager: this MetaTrader5 build has no "
+                    "history_select(); using history_deals_get() only. "
+                    "Upgrade the 'MetaTrader5' pip package if deal scans "
+                    "are empty.")
+        elif not history_select(na_fr, na_to):
+            logger.warning(
+                f"SL Manager: history_select failed for "
+                f"{user.mt5_account} ({mt5.last_error()}) — "
+                f"still trying history_deals_get")
+
+        deals = mt5.history_deals_get(fr_ts, to_ts) or []
+        if not deals:
+            deals = mt5.history_deals_get(na_fr, na_to) or []
+        if not deals:
+            try:
+                deals = mt5.history_deals_get(fr_ts, to_ts, "*") or []
+            except TypeError:
+                pass
+        if not deals:
+            logger.debug(
+                f"SL Manager: no deals in selected window for "
+                f"{user.mt5_account}")
+
+        rows = sorted(_DealRow.from_deal(d) for d in deals)
+        return [r for r in rows if (r.time, r.ticket) > after], len(rows)
+
+    @classmethod
+    def _legs_from_history(cls, position_ids: list[int]
+                           ) -> dict[int, tuple[str, int, int] | None]:
+        """Leg of each position from its deal history; runs on the broker."""
+        return {pid: cls._parse_leg_from_position_history(pid)
+                for pid in position_ids}
+
+    @classmethod
+    def _handle_tp_deals(cls, user, tp_deals: list
+                         ) -> tuple[dict[int, bool], dict]:
+        """Tighten the siblings of this scan's TP legs, one pass per group.
+
+        ``tp_deals`` holds (deal, (prefix, k, N)).  Open positions and
+        pendings are fetched once and indexed by leg group; each group gets
+        one SL request per sibling leg however many of its legs closed.
+        Runs on the broker.  Return (deal ticket -> True once nothing is
+        left for its group, position id -> leg of every open leg).
+        """
+        groups: dict[tuple, list[tuple]] = {}
+        group_of: dict[int, tuple] = {}
+        for deal, (prefix, closed_k, total) in tp_deals:
+            comment = getattr(deal, "comment", "") or ""
+            logger.info(
+                f"SL Manager: TP leg {closed_k}of… hit — deal {deal.ticket} "
+                f"comment='{comment}' symbol={deal.symbol} "
+                f"price={deal.price} reason={getattr(deal, 'reason', '')}")
+            side = ("buy" if int(deal.type) == int(mt5.DEAL_TYPE_SELL)
+                    else "sell")
+            group = group_of[int(deal.ticket)] = (
+                deal.symbol, prefix, total, side)
+            groups.setdefault(group, []).append((closed_k, float(deal.price)))
+
+        open_legs: dict[int, tuple[str, int, int]] = {}
+        index = cls._index_legs(mt5.positions_get() or (),
+                                mt5.orders_get() or (), open_legs)
+        finished = {
+            group: cls._tighten_group(user.mt5_account, group, closed,
+                                      index.get(group, []))
+            for group, closed in groups.items()}
+        return ({ticket: finished[g] for ticket, g in group_of.items()},
+                open_legs)
+
+    @classmethod
+    def _index_legs(cls, positions, orders,
+                    memo: dict | None = None) -> dict[tuple, list[tuple]]:
+        """Open legs by (symbol, prefix, total, side), sorted by leg index.
+
+        Each leg is ``(k, row, is_pending)``.  A pending order's ticket
+        becomes its position id, so both land in ``memo`` when given.
+        """
+        index: dict[tuple, list[tuple]] = {}
+        for rows, pending in ((positions, False), (orders, True)):
+            for row in rows:
+                parsed = cls._parse_comment(getattr(row, "comment", "") or "")
+                if not parsed:
                     continue
-                if is_bootstrap:
-                    # Cold-start sync: mark historical TP deals as processed so we
-                    # only act on fresh events after bot startup.
-                    self._processed_tp_deals.add(key)
-                    bootstrap_added += 1
+                side = cls._leg_side(row, pending)
+                if side is None:
                     continue
+                if memo is not None:
+                    memo[int(row.ticket)] = parsed
+                prefix, k, total = parsed
+                index.setdefault((row.symbol, prefix, total, side), []).append(
+                    (k, row, pending))
+        for legs in index.values():
+            legs.sort(key=lambda leg: (leg[0], int(leg[1].ticket)))
+        return index
+
+    @classmethod
+    def _tighten_group(cls, account_id: int, group: tuple,
+                       closed: list[tuple[int, float]],
+                       legs: list[tuple]) -> bool:
+        """Move SL on every leg above a closed one toward the best TP fill.
+
+        ``closed`` holds (k, fill price) of the group's TP legs in this scan;
+        a leg ``j`` is anchored at the tightest fill among legs ``k < j``.
+        Return True once no SL update is left pending.
+        """
+        symbol, prefix, total, side = group
+        better = max if side == "buy" else min
+        logger.debug(
+            f"SL Manager: siblings for '{prefix}' side={side} total={total} "
+            f"(closed legs {sorted(k for k, _ in closed)}) — {len(legs)} open "
+            f"{symbol} leg(s)")
+
+        keys = [leg[0] for leg in legs]
+        anchors: dict[int, float] = {}          # position in legs -> anchor
+        for closed_k, price in closed:
+            for i in range(bisect_right(keys, closed_k), len(legs)):
+                anchors[i] = (better(anchors[i], price) if i in anchors
+                              else price)
+        if not anchors:
+            logger.info(
+                f"SL Manager: no open legs with index > "
+                f"{min(k for k, _ in closed)} for this signal on account "
+                f"{account_id}")
+            return True
 
-                comment = getattr(deal, "comment", "") or ""
-                logger.info(
-                    f"SL Manager: TP leg {closed_k}of… hit — deal {deal.ticket} "
-                    f"comment='{comment}' symbol={deal.symbol} "
-                    f"price={deal.price} reason={getattr(deal, 'reason', '')}")
-
-                changed, work_left, saw_sibs = self._move_open_siblings_sl(
-                    user.mt5_account, deal, prefix, total, closed_k)
-                if not saw_sibs:
-                    logger.info(
-                        f"SL Manager: no open legs with index > {closed_k} "
-                        f"for this signal on account {user.mt5_account}")
-                    self._processed_tp_deals.add(key)
-                elif work_left == 0:
-                    if changed:
-                        logger.info(
-                            f"SL Manager: SL moved toward TP fill for {changed} "
-                            f"leg(s) on account {user.mt5_account}")
-                    self._processed_tp_deals.add(key)
-                else:
-                    logger.warning(
-                        f"SL Manager: SL adjust still pending for {work_left} "
-                        f"leg(s) (ok {changed}) — retrying "
-                        f"(account {user.mt5_account})")
-
-            if is_bootstrap:
-                self._bootstrapped_accounts.add(user.mt5_account)
+        changed = 0
+        work_remaining = 0
+        for i, anchor in sorted(anchors.items()):
+            _, row, pending = legs[i]
+            comment = getattr(row, "comment", "") or ""
+            current_sl = float(getattr(row, "sl", 0.0) or 0.0)
+            if not cls._should_update_sl(side, current_sl, anchor):
+                logger.debug(
+                    f"SL Manager: {'order' if pending else 'pos'} "
+                    f"{row.ticket} ({comment}) SL already at {current_sl}, "
+                    f"skip")
+                continue
+
+            work_remaining += 1
+            new_sl = cls._clamp_sl_to_symbol_rules(
+                row.symbol, side, anchor, current_sl)
+            if new_sl is None:
+                continue
+
+            if pending:
+                request = {
+                    "action": mt5.TRADE_ACTION_MODIFY,
+                    "order": int(row.ticket),
+                    "symbol": row.symbol,
+                    "price": float(getattr(row, "price_open", 0.0) or 0.0),
+                    "sl": new_sl,
+                    "tp": float(getattr(row, "tp", 0.0) or 0.0),
+                    "type_time": int(getattr(row, "type_time",
+                                             mt5.ORDER_TIME_GTC)),
+                }
+            else:
+                request = {
+                    "action": mt5.TRADE_ACTION_SLTP,
+                    "position": row.ticket,
+                    "symbol": row.symbol,
+                    "sl": new_sl,
+                    "tp": float(getattr(row, "tp", 0.0) or 0.0),
+                }
+            res = mt5.order_send(request)
+            if res and int(res.retcode) == int(mt5.TRADE_RETCODE_DONE):
+                changed += 1
+                work_remaining -= 1
                 logger.info(
-                    f"SL Manager: warmup synced {bootstrap_added} historical TP "
-                    f"deal(s) for account {user.mt5_account}; now tracking new TP events only")
+                    f"SL Manager: moved {'pending ' if pending else ''}SL on "
+                    f"{'order' if pending else 'pos'} {row.ticket} "
+                    f"({comment}) from {current_sl} to {new_sl} "
+                    f"(anchor TP fill {anchor})")
+                continue
 
-            logger.debug(
-                f"SL Manager: scan summary account={user.mt5_account} "
-                f"deals={len(deals)} tp_candidates={tp_candidates} "
-                f"processed={len(self._processed_tp_deals)}")
+            logger.warning(
+                f"SL Manager: failed {'pending ' if pending else ''}SL update "
+                f"on {'order' if pending else 'pos'} {row.ticket} "
+                f"account {account_id}: "
+                f"{res._asdict() if res and hasattr(res, '_asdict') else mt5.last_error()}"
+            )
+
+        if work_remaining:
+            logger.warning(
+                f"SL Manager: SL adjust still pending for {work_remaining} "
+                f"leg(s) (ok {changed}) — retrying (account {account_id})")
+            return False
+        if changed:
+            logger.info(
+                f"SL Manager: SL moved toward TP fill for {changed} "
+                f"leg(s) on account {account_id}")
+        return True
 
     # ------------------------------------------------------------------
     @staticmethod
@@ -201,22 +573,36 @@ class SignalSLManager:
                 ok.add(int(v))
         return int(reason) in ok
 
-    def _parse_multi_leg_tp_close(self, deal) -> tuple[str, int, int] | None:
-        """If deal is TP-like close of ``k of N``, return (prefix, k, N)."""
+    @classmethod
+    def _tp_like_close(cls, deal) -> bool:
         if int(getattr(deal, "entry", -1)) != int(mt5.DEAL_ENTRY_OUT):
-            return None
+            return False
         reason = int(getattr(deal, "reason", -1))
-        if not self._tp_close_reason(reason):
-            # Some brokers don't mark TP in reason on close; if profit is positive
-            # we still consider it a TP-like close for multi-leg protection.
-            profit = float(getattr(deal, "profit", 0.0) or 0.0)
-            if profit <= 0:
-                return None
+        if cls._tp_close_reason(reason):
+            return True
+        # Some brokers don't mark TP in reason on close; if profit is positive
+        # we still consider it a TP-like close for multi-leg protection.
+        return float(getattr(deal, "profit", 0.0) or 0.0) > 0
+
+    @classmethod
+    def _parse_multi_leg_tp_close(cls, deal, memo: dict | None = None
+                                  ) -> tuple[str, int, int] | None:
+        """If deal is TP-like close of ``k of N``, return (prefix, k, N).
+
+        A close deal without a leg comment is resolved through ``memo``
+        (position id -> leg, anything with ``.get``) when given, otherwise
+        through the position's history.
+        """
+        if not cls._tp_like_close(deal):
+            return None
 
-        parsed = self._parse_comment(getattr(deal, "comment", "") or "")
+        parsed = cls._parse_comment(getattr(deal, "comment", "") or "")
         if not parsed:
-            parsed = self._parse_leg_from_position_history(
-                int(getattr(deal, "position_id", 0) or 0))
+            position_id = int(getattr(deal, "position_id", 0) or 0)
+            if memo is not None:
+                parsed = memo.get(position_id)
+            else:
+                parsed = cls._parse_leg_from_position_history(position_id)
         if not parsed:
             return None
         _, k, n = parsed
@@ -224,8 +610,9 @@ class SignalSLManager:
             return None
         return parsed[0], k, n
 
+    @classmethod
     def _parse_leg_from_position_history(
-            self, position_id: int) -> tuple[str, int, int] | None:
+            cls, position_id: int) -> tuple[str, int, int] | None:
         """Recover original leg comment when close deal comment is empty/mutated."""
         if position_id <= 0:
             return None
@@ -234,142 +621,11 @@ class SignalSLManager:
         except TypeError:
             return None
         for d in deals:
-            parsed = self._parse_comment(getattr(d, "comment", "") or "")
+            parsed = cls._parse_comment(getattr(d, "comment", "") or "")
             if parsed:
                 return parsed
         return None
 
-    def _move_open_siblings_sl(
-            self,
-            account_id: int,
-            tp_deal,
-            prefix: str,
-            total: int,
-            closed_leg_idx: int,
-    ) -> tuple[int, int, bool]:
-        """After leg ``closed_leg_idx`` closed at TP, tighten SL on legs j > idx.
-
-        Return (success_count, work_remaining, saw_sibling_rows).
-        """
-        symbol = tp_deal.symbol
-        anchor = float(tp_deal.price)
-        side = ("buy" if int(tp_deal.type) == int(mt5.DEAL_TYPE_SELL)
-                else "sell")
-
-        positions = mt5.positions_get(symbol=symbol) or []
-        logger.debug(
-            f"SL Manager: siblings for '{prefix}' side={side} total={total} "
-            f"(closed leg {closed_leg_idx}) — {len(positions)} open {symbol} "
-            f"position(s)")
-
-        changed = 0
-        work_remaining = 0
-        saw_sibling_rows = False
-        for pos in positions:
-            pos_comment = getattr(pos, "comment", "") or ""
-            p = self._parse_comment(pos_comment)
-            if not p:
-                continue
-            p_prefix, p_idx, p_total = p
-
-            if p_prefix != prefix or p_total != total:
-                continue
-            if p_idx <= closed_leg_idx:
-                continue
-
-            if not self._same_side(pos, side):
-                continue
-
-            saw_sibling_rows = True
-            current_sl = float(getattr(pos, "sl", 0.0) or 0.0)
-            if not self._should_update_sl(side, current_sl, anchor):
-                logger.debug(
-                    f"SL Manager: pos {pos.ticket} ({pos_comment}) "
-                    f"SL already at {current_sl}, skip")
-                continue
-
-            work_remaining += 1
-            new_sl = self._clamp_sl_to_symbol_rules(
-                pos.symbol, side, anchor, current_sl)
-            if new_sl is None:
-                continue
-
-            logger.info(
-                f"SL Manager: moving SL on pos {pos.ticket} "
-                f"({pos_comment}) from {current_sl} to {new_sl} "
-                f"(anchor TP fill {anchor})")
-
-            request = {
-                "action": mt5.TRADE_ACTION_SLTP,
-                "position": pos.ticket,
-                "symbol": pos.symbol,
-                "sl": new_sl,
-                "tp": float(getattr(pos, "tp", 0.0) or 0.0),
-            }
-            res = mt5.order_send(request)
-            if res and int(res.retcode) == int(mt5.TRADE_RETCODE_DONE):
-                changed += 1
-                work_remaining -= 1
-                continue
-
-            logger.warning(
-                f"SL Manager: failed SL update on pos {pos.ticket} "
-                f"account {account_id}: "
-                f"{res._asdict() if res and hasattr(res, '_asdict') else mt5.last_error()}"
-            )
-
-        # Also protect sibling legs that are still pending (not filled yet).
-        orders = mt5.orders_get(symbol=symbol) or []
-        for ord_ in orders:
-            ord_comment = getattr(ord_, "comment", "") or ""
-            p = self._parse_comment(ord_comment)
-            if not p:
-                continue
-            p_prefix, p_idx, p_total = p
-            if p_prefix != prefix or p_total != total:
-                continue
-            if p_idx <= closed_leg_idx:
-                continue
-            if not self._pending_same_side(ord_, side):
-                continue
-
-            current_sl = float(getattr(ord_, "sl", 0.0) or 0.0)
-            if not self._should_update_sl(side, current_sl, anchor):
-                continue
-
-            work_remaining += 1
-            new_sl = self._clamp_sl_to_symbol_rules(
-                getattr(ord_, "symbol", symbol), side, anchor, current_sl)
-            if new_sl is None:
-                continue
-
-            req = {
-                "action": mt5.TRADE_ACTION_MODIFY,
-                "order": int(getattr(ord_, "ticket", 0)),
-                "symbol": getattr(ord_, "symbol", symbol),
-                "price": float(getattr(ord_, "price_open", 0.0) or 0.0),
-                "sl": new_sl,
-                "tp": float(getattr(ord_, "tp", 0.0) or 0.0),
-                "type_time": int(getattr(ord_, "type_time", mt5.ORDER_TIME_GTC)),
-            }
-            res = mt5.order_send(req)
-            if res and int(res.retcode) == int(mt5.TRADE_RETCODE_DONE):
-                changed += 1
-                work_remaining -= 1
-                logger.info(
-                    f"SL Manager: moved pending SL on order "
-                    f"{int(getattr(ord_, 'ticket', 0))} from {current_sl} "
-                    f"to {new_sl} ({ord_comment})")
-                continue
-
-            logger.warning(
-                f"SL Manager: failed pending SL update on order "
-                f"{int(getattr(ord_, 'ticket', 0))} account {account_id}: "
-                f"{res._asdict() if res and hasattr(res, '_asdict') else mt5.last_error()}"
-            )
-
-        return changed, work_remaining, saw_sibling_rows
-
     # ------------------------------------------------------------------
     @staticmethod
     def _clamp_sl_to_symbol_rules(
@@ -382,8 +638,8 @@ class SignalSLManager:
 
         For **sells**, SL must stay **above** the current Ask (plus stops level).
         """
-        info = mt5.symbol_info(symbol)
-        tick = mt5.symbol_info_tick(symbol)
+        info = symbol_info(symbol)
+        tick = symbol_tick(symbol)
         if not info or not tick:
             d = int(getattr(info, "digits", 5) or 5) if info else 5
             return round(float(anchor_price), d)
@@ -433,16 +689,15 @@ class SignalSLManager:
         return prefix, idx, total
 
     @staticmethod
-    def _same_side(pos, side: str) -> bool:
-        p_type = int(getattr(pos, "type", -1))
-        return ((side == "buy"
-                 and p_type == int(mt5.POSITION_TYPE_BUY))
-                or (side == "sell"
-                    and p_type == int(mt5.POSITION_TYPE_SELL)))
-
-    @staticmethod
-    def _pending_same_side(ord_, side: str) -> bool:
-        otype = int(getattr(ord_, "type", -1))
+    def _leg_side(row, pending: bool) -> str | None:
+        """"buy"/"sell" for a position or pending order, None otherwise."""
+        otype = int(getattr(row, "type", -1))
+        if not pending:
+            if otype == int(mt5.POSITION_TYPE_BUY):
+                return "buy"
+            if otype == int(mt5.POSITION_TYPE_SELL):
+                return "sell"
+            return None
         buy_types = (
             int(getattr(mt5, "ORDER_TYPE_BUY_LIMIT", -1001)),
             int(getattr(mt5, "ORDER_TYPE_BUY_STOP", -1002)),
@@ -453,7 +708,11 @@ class SignalSLManager:
             int(getattr(mt5, "ORDER_TYPE_SELL_STOP", -2002)),
             int(getattr(mt5, "ORDER_TYPE_SELL_STOP_LIMIT", -2003)),
         )
-        return (otype in buy_types) if side == "buy" else (otype in sell_types)
+        if otype in buy_types:
+            return "buy"
+        if otype in sell_types:
+            return "sell"
+        return None
 
     @staticmethod
     def _should_update_sl(side: str, current_sl: float,
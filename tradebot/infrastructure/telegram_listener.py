@@ -1,6 +1,9 @@
 # tradebot/infrastructure/telegram_listener.py
 
 """Telegram gateway that turns raw messages into MT5 orders."""
+import asyncio
+from dataclasses import replace
+
 from loguru import logger
 from telegram.ext import (
     ApplicationBuilder, ContextTypes, MessageHandler, filters
@@ -11,6 +14,7 @@ from config import settings
 from tradebot.domain.ports import (
     SignalParserPort, 
     TradingEnginePort,
+    AsyncTradingEnginePort,
     OrderPort,
     NotificationPort,
 )
@@ -19,6 +23,10 @@ from tradebot.infrastructure.sl_manager import SignalSLManager
 from tradebot.infrastructure.copy_syncer import CopyTradeSyncer
 from tradebot.infrastructure.pending_expirer import PendingOrderExpirer
 from tradebot.infrastructure.db import upsert_trader, is_trader_allowed
+from tradebot.infrastructure._mt5_utils import get_broker
+from tradebot.infrastructure._mt5_cache import log_cache_stats
+from tradebot.infrastructure.async_engine import ExecutorTradingEngine
+from tradebot.infrastructure.tracing import SignalTrace, link_ticket
 
 
 class TelegramSignalListener:
@@ -35,19 +43,27 @@ class TelegramSignalListener:
             pending_expirer: PendingOrderExpirer | None = None,
             startup_message: str = "",
             shutdown_message: str = "",
+            async_engine: AsyncTradingEnginePort | None = None,
     ):
         self.parser = parser
         self.engine = engine
+        # Orders run on worker threads so the event loop keeps serving updates
+        self.async_engine = async_engine or ExecutorTradingEngine(
+            engine, max_workers=settings.order_workers)
         self.generator = order_generator
         self.notifier = notifier
         self.sl_manager = sl_manager
         self.copy_syncer = copy_syncer
         self.pending_expirer = pending_expirer
         self._startup_msg = startup_message
+        if copy_syncer and sl_manager:
+            # A master-side change (fill, TP close) wakes the SL manager
+            copy_syncer.on_change = sl_manager.poke
         self._shutdown_msg = shutdown_message
 
         self.app = (ApplicationBuilder()
                     .token(settings.telegram_token)
+                    .concurrent_updates(True)
                     .build())
 
         # Restrict to the configured channel only
@@ -59,17 +75,22 @@ class TelegramSignalListener:
     async def _handle(self, upd: Update, ctx: ContextTypes.DEFAULT_TYPE):
         text = upd.effective_message.text or ""
         logger.debug("incoming text: {}", text.replace("\n", " ")[:100])
+        trace = SignalTrace()
 
-        sig: Signal | None = self.parser.parse(text)
+        with trace.stage("parse"):
+            sig: Signal | None = self.parser.parse(text)
         if sig is None:
             logger.info("parser returned None")
             return
+        sig = replace(sig, correlation_id=trace.correlation_id)
 
         trader_name = sig.comment.strip() if sig.comment else ""
 
         if trader_name:
-            upsert_trader(trader_name)
-            if not is_trader_allowed(trader_name):
+            with trace.stage("trader_check"):
+                upsert_trader(trader_name)
+                allowed = is_trader_allowed(trader_name)
+            if not allowed:
                 logger.info(f"Signal from trader '{trader_name}' — not enabled, skipping")
                 return
         else:
@@ -77,19 +98,31 @@ class TelegramSignalListener:
             return
 
         logger.info(f"Processing signal from trader '{trader_name}': "
-                     f"{sig.side.upper()} {sig.symbol}")
+                     f"{sig.side.upper()} {sig.symbol} [{trace.correlation_id}]")
 
-        orders: list[Order] = self.generator.generate_orders(sig)
+        with trace.stage("orders"):
+            orders: list[Order] = self.generator.generate_orders(sig)
         if not orders:
             await upd.effective_message.reply_text("Signal parsed but generated no orders.")
             return
 
         responses: list[str] = []
-        for order in orders:
-            results: list[OrderResult] = self.engine.execute_order(order)
-            logger.debug(f"Executing order: {order}")
-
+        # Background loops wait until every leg of this signal is sent.
+        with get_broker().order_burst():
+            logger.debug(f"Executing orders: {orders}")
+            batch: list[list[OrderResult]] = await self.async_engine.execute_orders(
+                orders, lane=(trader_name, sig.symbol))
+
+        # Fresh positions/pendings: background loops switch to fast polling
+        for loop in (self.copy_syncer, self.sl_manager, self.pending_expirer):
+            if loop is not None:
+                loop.poke()
+
+        for order, results in zip(orders, batch):
             for res in results:
+                trace.add_result(res)
+                if res.success and res.data and res.data.get("order"):
+                    link_ticket(res.data["order"], trace.correlation_id)
                 status = "OK" if res.success else f"FAIL ({res.message})"
                 acc_id = res.data.get("account_id", "N/A") if res.data else "N/A"
                 responses.append(
@@ -97,7 +130,11 @@ class TelegramSignalListener:
                     f"{order.symbol} -> TP {order.tp} : {status}"
                 )
 
+        responses.append(trace.summary())
+        # SQLite write on a worker thread, overlapping the reply
+        saved = asyncio.create_task(asyncio.to_thread(trace.save))
         await upd.effective_message.reply_text("\n".join(responses))
+        await saved
 
     # ------------------------------------------------------------------
     async def _error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
@@ -154,9 +191,13 @@ class TelegramSignalListener:
         try:
             self.app.run_polling(drop_pending_updates=True)
         finally:
+            if isinstance(self.async_engine, ExecutorTradingEngine):
+                self.async_engine.close()
             if self.pending_expirer:
                 self.pending_expirer.stop()
             if self.copy_syncer:
                 self.copy_syncer.stop()
             if self.sl_manager:
                 self.sl_manager.stop()
+            log_cache_stats()
+            get_broker().stop()
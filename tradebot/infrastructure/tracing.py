@@ -0,0 +1,154 @@
+# tradebot/infrastructure/tracing.py
+
+"""
+End-to-end signal latency tracing.
+
+Every Telegram signal gets a correlation ID that travels on ``Signal``,
+``Order`` and ``OrderResult``.  Stages are timed as the signal moves through
+the bot (parse, trader check, order generation, then per account: login,
+symbol resolve, sizing, ``order_send``) and later copy-trade replication per
+follower.  Rows go to the rolling ``signal_traces`` table; see
+:func:`stage_percentiles`.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from loguru import logger
+
+from config import settings
+from .db import add_trace_stages, get_trace_durations
+from ._metrics import _nearest_rank
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class StageTimer:
+    """
+    Accumulates wall time per stage name:
+
+        timer = StageTimer()
+        with timer("resolve"):
+            ...
+        timer.stages    # {"resolve": 0.0021}
+    """
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+
+    @contextmanager
+    def __call__(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_ms(self) -> dict[str, float]:
+        return {k: round(v * 1000.0, 3) for k, v in self.stages.items()}
+
+
+class SignalTrace:
+    """Stage timings of one signal, keyed by its correlation ID."""
+
+    def __init__(self, correlation_id: str | None = None):
+        self.correlation_id = correlation_id or new_correlation_id()
+        self.started = time.perf_counter()
+        # (stage, account or None, seconds)
+        self.rows: list[tuple[str, int | None, float]] = []
+
+    @contextmanager
+    def stage(self, name: str, account: int | None = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, account)
+
+    def add(self, name: str, seconds: float,
+            account: int | None = None) -> None:
+        self.rows.append((name, account, seconds))
+
+    def add_result(self, res) -> None:
+        """Pick up per-account stages reported in ``OrderResult.data``."""
+        data = res.data or {}
+        for name, ms in (data.get("stages_ms") or {}).items():
+            self.add(name, ms / 1000.0, data.get("account_id"))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        """One line for the Telegram reply, stage totals in ms."""
+        totals: dict[str, float] = {}
+        for name, _, sec in self.rows:
+            totals[name] = totals.get(name, 0.0) + sec
+        parts = " · ".join(f"{k} {v * 1000:.0f}" for k, v in totals.items())
+        return (f"⏱ {self.correlation_id} total {self.elapsed() * 1000:.0f}ms"
+                f" | {parts}")
+
+    def save(self) -> None:
+        self.rows.append(("total", None, self.elapsed()))
+        record(self.correlation_id, self.rows)
+
+
+def record(correlation_id: str,
+           rows: list[tuple[str, int | None, float]]) -> None:
+    """Persist (stage, account, seconds) rows; failures are only logged."""
+    if settings.trace_max_rows <= 0 or not rows:
+        return
+    try:
+        add_trace_stages(
+            [(correlation_id, name, account, round(sec * 1000.0, 3))
+             for name, account, sec in rows],
+            keep=settings.trace_max_rows,
+            db_path=settings.db_path)
+    except sqlite3.Error as e:
+        logger.warning(f"Trace {correlation_id} not saved: {e}")
+
+
+def stage_percentiles() -> dict[str, dict]:
+    """Return stage -> {count, p50, p95, p99} (ms) over the rolling table."""
+    out: dict[str, dict] = {}
+    for stage, durations in get_trace_durations(settings.db_path).items():
+        data = sorted(durations)
+        out[stage] = {
+            "count": len(data),
+            "p50": _nearest_rank(data, 50),
+            "p95": _nearest_rank(data, 95),
+            "p99": _nearest_rank(data, 99),
+        }
+    return out
+
+
+# ----------------------------------------------------------------------
+# Master ticket -> correlation ID, so copy-trade replication joins the trace
+# ----------------------------------------------------------------------
+
+_tickets: OrderedDict[int, str] = OrderedDict()
+_tickets_lock = threading.Lock()
+_MAX_TICKETS = 4096
+
+
+def link_ticket(ticket: int, correlation_id: str) -> None:
+    with _tickets_lock:
+        _tickets[int(ticket)] = correlation_id
+        _tickets.move_to_end(int(ticket))
+        while len(_tickets) > _MAX_TICKETS:
+            _tickets.popitem(last=False)
+
+
+def correlation_for(ticket: int) -> str | None:
+    with _tickets_lock:
+        return _tickets.get(int(ticket))